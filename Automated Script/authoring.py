@@ -0,0 +1,222 @@
+"""
+Non-interactive authoring: turns flat question rows (CSV or JSON Lines)
+into the nested Branch -> Subject -> Test -> Questions file read by
+import_nested_questions, in bounded memory.
+
+Each row names its branch, subject and test next to the question fields:
+
+    branch,subject,test,text,option1,option2,option3,option4,correct_option,solution
+
+Optional columns: branch_description, subject_description,
+duration_minutes, total_marks (taken from the first row of a test).
+"""
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+
+QUESTION_FIELDS = ["text", "option1", "option2", "option3", "option4", "correct_option", "solution"]
+REQUIRED_FIELDS = ["branch", "subject", "test", "text", "option1", "option2", "option3", "option4", "correct_option"]
+INSERT_BATCH_SIZE = 5000
+
+
+def read_rows(path, input_format=None):
+    """Yields ``(line_number, row)`` from a CSV or JSON Lines file, one row at a time."""
+    input_format = input_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if input_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        yield line_number, None
+
+
+def row_problem(row):
+    if not isinstance(row, dict):
+        return "not a JSON object"
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    try:
+        if int(row["correct_option"]) not in (1, 2, 3, 4):
+            raise ValueError
+    except (TypeError, ValueError):
+        return "correct_option must be 1, 2, 3 or 4"
+    return None
+
+
+def question_from_row(row):
+    question = {field: row.get(field) or "" for field in QUESTION_FIELDS}
+    question["correct_option"] = int(row["correct_option"])
+    return question
+
+
+def _int_or(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class NestedWriter:
+    """
+    Writes the importer's nested JSON incrementally. Rows must arrive
+    grouped by branch, then subject, then test; a change of any of them
+    closes the open containers. Only the current names are kept in memory.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.branch = self.subject = self.test = None
+        self.counts = {"branches": 0, "subjects": 0, "tests": 0, "questions": 0}
+
+    def _close_test(self):
+        if self.test is not None:
+            self.f.write("\n          ]\n        }")
+            self.test = None
+
+    def _close_subject(self):
+        self._close_test()
+        if self.subject is not None:
+            self.f.write("\n      ]\n    }")
+            self.subject = None
+
+    def _close_branch(self):
+        self._close_subject()
+        if self.branch is not None:
+            self.f.write("\n  ]\n  }")
+            self.branch = None
+
+    def write(self, row, question):
+        dumps = json.dumps
+        if row["branch"] != self.branch:
+            self._close_branch()
+            self.f.write("[\n  {" if not self.counts["branches"] else ",\n  {")
+            self.f.write(f'"name": {dumps(row["branch"])}, "description": {dumps(row.get("branch_description") or "")},')
+            self.f.write('\n  "subjects": [')
+            self.branch = row["branch"]
+            self.counts["branches"] += 1
+            first_subject = True
+        else:
+            first_subject = False
+        if row["subject"] != self.subject:
+            self._close_subject()
+            self.f.write("\n    {" if first_subject else ",\n    {")
+            self.f.write(f'"name": {dumps(row["subject"])}, "description": {dumps(row.get("subject_description") or "")},')
+            self.f.write('\n      "tests": [')
+            self.subject = row["subject"]
+            self.counts["subjects"] += 1
+            first_test = True
+        else:
+            first_test = False
+        if row["test"] != self.test:
+            self._close_test()
+            self.f.write("\n        {" if first_test else ",\n        {")
+            self.f.write(
+                f'"name": {dumps(row["test"])}, '
+                f'"duration_minutes": {_int_or(row.get("duration_minutes"), 60)}, '
+                f'"total_marks": {_int_or(row.get("total_marks"), 100)},'
+            )
+            self.f.write('\n          "questions": [')
+            self.test = row["test"]
+            self.counts["tests"] += 1
+            separator = "\n            "
+        else:
+            separator = ",\n            "
+        self.f.write(separator + dumps(question, ensure_ascii=False))
+        self.counts["questions"] += 1
+
+    def close(self):
+        self._close_branch()
+        self.f.write("\n]\n" if self.counts["branches"] else "[]\n")
+
+
+def _grouped_from_spill(rows, on_skip):
+    """
+    Groups unsorted rows through a temporary SQLite file: rows are spilled
+    to disk as they are read and come back ordered by the first appearance
+    of their branch, subject and test. Only the name -> id maps stay in memory.
+    """
+    handle, path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(handle)
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE groups (id INTEGER PRIMARY KEY, branch_id INTEGER, subject_id INTEGER, header TEXT);
+            CREATE TABLE questions (seq INTEGER PRIMARY KEY, group_id INTEGER, question TEXT);
+        """)
+        branch_ids, subject_ids, group_ids = {}, {}, {}
+        batch = []
+        for line_number, row in rows:
+            problem = row_problem(row)
+            if problem:
+                on_skip(line_number, problem)
+                continue
+            branch_id = branch_ids.setdefault(row["branch"], len(branch_ids))
+            subject_id = subject_ids.setdefault((row["branch"], row["subject"]), len(subject_ids))
+            key = (row["branch"], row["subject"], row["test"])
+            group_id = group_ids.get(key)
+            if group_id is None:
+                group_id = group_ids[key] = len(group_ids)
+                header = {field: row.get(field) for field in (
+                    "branch", "branch_description", "subject", "subject_description", "test", "duration_minutes", "total_marks"
+                )}
+                connection.execute("INSERT INTO groups VALUES (?, ?, ?, ?)", (group_id, branch_id, subject_id, json.dumps(header)))
+            batch.append((group_id, json.dumps(question_from_row(row), ensure_ascii=False)))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                connection.executemany("INSERT INTO questions (group_id, question) VALUES (?, ?)", batch)
+                batch = []
+        if batch:
+            connection.executemany("INSERT INTO questions (group_id, question) VALUES (?, ?)", batch)
+        connection.execute("CREATE INDEX questions_group ON questions (group_id, seq)")
+        del branch_ids, subject_ids, group_ids
+
+        cursor = connection.execute("""
+            SELECT g.header, q.question FROM groups g JOIN questions q ON q.group_id = g.id
+            ORDER BY g.branch_id, g.subject_id, g.id, q.seq
+        """)
+        header_text, header = None, None
+        for header_json, question_json in cursor:
+            if header_json != header_text:
+                header_text, header = header_json, json.loads(header_json)
+            yield header, json.loads(question_json)
+    finally:
+        connection.close()
+        os.remove(path)
+
+
+def _grouped_presorted(rows, on_skip):
+    for line_number, row in rows:
+        problem = row_problem(row)
+        if problem:
+            on_skip(line_number, problem)
+            continue
+        yield row, question_from_row(row)
+
+
+def convert(input_path, output_path, input_format=None, presorted=False, on_skip=None):
+    """
+    Converts a CSV/JSONL question file to the importer's nested format and
+    returns the counts written. With ``presorted`` the rows must already be
+    grouped by branch, subject and test and are streamed straight through;
+    otherwise they are grouped on disk first. Bad rows are passed to
+    ``on_skip(line_number, problem)`` and left out.
+    """
+    on_skip = on_skip or (lambda line_number, problem: None)
+    rows = read_rows(input_path, input_format)
+    grouped = _grouped_presorted(rows, on_skip) if presorted else _grouped_from_spill(rows, on_skip)
+    with open(output_path, "w", encoding="utf-8") as f:
+        writer = NestedWriter(f)
+        for row, question in grouped:
+            writer.write(row, question)
+        writer.close()
+    return writer.counts
@@ -0,0 +1,164 @@
+"""
+Text generation for the Automated Script: pluggable backends, an on-disk
+prompt -> response cache, retries with backoff and a bounded thread pool
+for generating many fields at once.
+"""
+import hashlib
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "Key")
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
+)
+CACHE_PATH = os.getenv("GENERATION_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".generation_cache.sqlite3"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GenerationError(Exception):
+    """Raised when a backend could not produce text for a prompt."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class GeminiBackend:
+    """Calls the Gemini generateContent endpoint (or anything speaking its format, like stub_server.py)."""
+
+    def __init__(self, api_key=GEMINI_API_KEY, api_url=GEMINI_API_URL, timeout=60):
+        self.name = f"gemini:{api_url}"
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def generate(self, prompt):
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        try:
+            response = self.session.post(self.api_url, params={"key": self.api_key}, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GenerationError(str(e)) from e
+        if response.status_code >= 400:
+            raise GenerationError(
+                f"HTTP {response.status_code}: {response.text[:200]}", retryable=response.status_code in RETRY_STATUSES
+            )
+        try:
+            return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError) as e:
+            raise GenerationError(f"Unexpected response: {e}", retryable=False) from e
+
+
+class StubBackend:
+    """Offline backend returning a deterministic placeholder, for dry runs and tests."""
+
+    name = "stub"
+
+    def __init__(self, api_url=None):
+        pass
+
+    def generate(self, prompt):
+        return f"[stub] {prompt[:80]}"
+
+
+BACKENDS = {"gemini": GeminiBackend, "stub": StubBackend}
+
+
+class ResponseCache:
+    """
+    Prompt -> response cache in a SQLite file, keyed by backend name and the
+    SHA-256 of the prompt, so a re-run never pays for the same prompt twice.
+    Only used from the thread that owns it.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def key(backend, prompt):
+        return hashlib.sha256(f"{backend.name}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, backend, prompt):
+        row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (self.key(backend, prompt),)).fetchone()
+        return row[0] if row else None
+
+    def set(self, backend, prompt, response):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+            (self.key(backend, prompt), response, time.time()),
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def generate_with_retry(backend, prompt, retries=4, base_delay=1.0, max_delay=30.0):
+    """Exponential backoff with jitter on retryable errors: ~1s, 2s, 4s, ... capped at max_delay."""
+    for attempt in range(retries + 1):
+        try:
+            return backend.generate(prompt)
+        except GenerationError as e:
+            if not e.retryable or attempt == retries:
+                raise
+            delay = min(base_delay * 2 ** attempt, max_delay)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def generate(backend, cache, prompt, refresh=False, **retry_options):
+    """Generates one prompt through the cache; ``refresh`` asks the backend again and replaces the entry."""
+    if not refresh:
+        cached = cache.get(backend, prompt)
+        if cached is not None:
+            return cached
+    response = generate_with_retry(backend, prompt, **retry_options)
+    cache.set(backend, prompt, response)
+    return response
+
+
+def generate_many(backend, cache, prompts, concurrency=8, on_result=None, **retry_options):
+    """
+    Generates every distinct prompt of ``prompts`` with at most
+    ``concurrency`` requests in flight. Cached prompts are answered without a
+    request and fresh responses are cached as they arrive, so an interrupted
+    run loses nothing. Returns ``(responses, errors)``, both keyed by prompt
+    in the order the prompts were given, whatever order they finished in.
+    ``on_result(prompt, response, cached)`` is called for each result.
+    """
+    distinct = list(dict.fromkeys(prompts))
+    responses, errors, pending = {}, {}, []
+    for prompt in distinct:
+        cached = cache.get(backend, prompt)
+        if cached is None:
+            pending.append(prompt)
+        else:
+            responses[prompt] = cached
+            if on_result:
+                on_result(prompt, cached, True)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(generate_with_retry, backend, prompt, **retry_options): prompt for prompt in pending}
+        for future in as_completed(futures):
+            prompt = futures[future]
+            try:
+                response = future.result()
+            except GenerationError as e:
+                errors[prompt] = str(e)
+                continue
+            cache.set(backend, prompt, response)  # Written from this thread only
+            responses[prompt] = response
+            if on_result:
+                on_result(prompt, response, False)
+    return (
+        {prompt: responses[prompt] for prompt in distinct if prompt in responses},
+        {prompt: errors[prompt] for prompt in distinct if prompt in errors},
+    )
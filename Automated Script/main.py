@@ -1,25 +1,35 @@
+import argparse
 import json
-import requests
+import time
 
-GEMINI_API_KEY = "Key"
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={GEMINI_API_KEY}"
+from authoring import convert
+from generation import BACKENDS, CACHE_PATH, GEMINI_API_URL, GenerationError, ResponseCache, generate, generate_many
 
-def gemini_generate(prompt):
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}]
-    }
+# Set up in main(); interactive and batch mode share the backend and the response cache
+backend = None
+cache = None
+
+def branch_description_prompt(branch_name):
+    return f"Write a short description for the branch named '{branch_name}'."
+
+def subject_description_prompt(subject_name, branch_name):
+    return f"Write a short description for the subject named '{subject_name}' in branch '{branch_name}'."
+
+def solution_prompt(question_text, options, correct_option):
+    return f"Write a solution for the following question: '{question_text}' with options: {options}. The correct option is {correct_option}."
+
+def gemini_generate(prompt, refresh=False):
     try:
-        response = requests.post(GEMINI_API_URL, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        return data["candidates"][0]["content"]["parts"][0]["text"]
-    except Exception as e:
+        return generate(backend, cache, prompt, refresh=refresh)
+    except GenerationError as e:
         print(f"Gemini API error: {e}")
         return ""
 
 def get_verified_field(prompt, field_name):
+    refresh = False
     while True:
-        generated = gemini_generate(prompt)
+        generated = gemini_generate(prompt, refresh=refresh)
+        refresh = True  # A retry asks for a new answer instead of the cached one
         print(f"Gemini generated {field_name}:\n{generated}")
         user_action = input(f"Accept this {field_name}? (y to accept, n to retry, m to manually enter): ").strip().lower()
         if user_action == "y":
@@ -28,7 +38,7 @@ def get_verified_field(prompt, field_name):
             return input(f"Enter {field_name} manually: ")
         # else retry
 
-def collect_input():
+def collect_input(output_path="structured_data.json"):
     """
     This function collects hierarchical data for:
     - Branch -> Subject -> Test -> Question
@@ -40,7 +50,7 @@ def collect_input():
     num_branches = int(input("Enter number of branches (int): "))
     for _ in range(num_branches):
         branch_name = input("Branch name (str): ")
-        branch_desc = get_verified_field(f"Write a short description for the branch named '{branch_name}'.", "branch description")
+        branch_desc = get_verified_field(branch_description_prompt(branch_name), "branch description")
         branch = {
             "name": branch_name,
             "description": branch_desc,
@@ -51,7 +61,7 @@ def collect_input():
         num_subjects = int(input(f"Enter number of subjects for {branch_name} (int): "))
         for _ in range(num_subjects):
             subject_name = input("  Subject name (str): ")
-            subject_desc = get_verified_field(f"Write a short description for the subject named '{subject_name}' in branch '{branch_name}'.", "subject description")
+            subject_desc = get_verified_field(subject_description_prompt(subject_name, branch_name), "subject description")
             subject = {
                 "name": subject_name,
                 "description": subject_desc,
@@ -78,10 +88,7 @@ def collect_input():
                     question_text = input("        Question text (str): ")
                     options = [input(f"        Option {i} (str): ") for i in range(1, 5)]
                     correct_option = int(input("        Correct option (int, 1-4): "))
-                    solution = get_verified_field(
-                        f"Write a solution for the following question: '{question_text}' with options: {options}. The correct option is {correct_option}.",
-                        "solution"
-                    )
+                    solution = get_verified_field(solution_prompt(question_text, options, correct_option), "solution")
                     question = {
                         "text": question_text,
                         "option1": options[0],
@@ -97,10 +104,107 @@ def collect_input():
         data.append(branch)
 
     # Save to file
-    with open("structured_data.json", "w", encoding="utf-8") as f:
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"\n✅ DONE: Data written to '{output_path}'")
+
+def fill_missing_fields(data, concurrency, retries):
+    """
+    Batch mode: generates every empty branch/subject description and
+    question solution of an importer-format structure at once, without
+    prompts. Fields whose generation failed are left empty and reported.
+    """
+    targets = []  # (object, field, prompt)
+    for branch in data:
+        if not branch.get("description"):
+            targets.append((branch, "description", branch_description_prompt(branch["name"])))
+        for subject in branch.get("subjects", []):
+            if not subject.get("description"):
+                targets.append((subject, "description", subject_description_prompt(subject["name"], branch["name"])))
+            for test in subject.get("tests", []):
+                for question in test.get("questions", []):
+                    if not question.get("solution"):
+                        options = [question.get(f"option{i}", "") for i in range(1, 5)]
+                        prompt = solution_prompt(question["text"], options, question["correct_option"])
+                        targets.append((question, "solution", prompt))
+
+    prompts = [prompt for _, _, prompt in targets]
+    total = len(set(prompts))
+    done = {"count": 0, "cached": 0}
+    started = time.perf_counter()
+
+    def progress(prompt, response, cached):
+        done["count"] += 1
+        done["cached"] += cached
+        if done["count"] % 50 == 0 or done["count"] == total:
+            print(f"  {done['count']}/{total} generated ({done['cached']} from cache)")
+
+    print(f"⚙️  Generating {total} field(s) with up to {concurrency} request(s) in flight...")
+    responses, errors = generate_many(backend, cache, prompts, concurrency=concurrency, on_result=progress, retries=retries)
+    for obj, field, prompt in targets:
+        if prompt in responses:
+            obj[field] = responses[prompt]
+
+    elapsed = time.perf_counter() - started
+    print(f"  {len(responses)} done, {len(errors)} failed in {elapsed:.1f}s ({len(responses) / elapsed if elapsed else 0:.1f} fields/sec)")
+    for prompt, error in list(errors.items())[:10]:
+        print(f"  ❌ {error} for: {prompt[:80]}")
+    return not errors
+
+def batch_mode(input_path, output_path, concurrency, retries):
+    with open(input_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    complete = fill_missing_fields(data, concurrency, retries)
+    with open(output_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
-    print("\n✅ DONE: Data written to 'structured_data.json'")
+    print(f"\n✅ DONE: Data written to '{output_path}'" + ("" if complete else " (re-run to retry the failed fields)"))
+
+def rows_mode(input_path, output_path, input_format, presorted):
+    started = time.perf_counter()
+    skipped = []
+
+    def on_skip(line_number, problem):
+        skipped.append(line_number)
+        if len(skipped) <= 20:
+            print(f"  ⚠️  Line {line_number} skipped: {problem}")
+
+    counts = convert(input_path, output_path, input_format=input_format, presorted=presorted, on_skip=on_skip)
+    elapsed = time.perf_counter() - started
+    print(
+        f"\n✅ DONE: {counts['questions']} questions in {counts['tests']} tests, {counts['subjects']} subjects and "
+        f"{counts['branches']} branches written to '{output_path}' in {elapsed:.1f}s"
+        + (f" ({len(skipped)} rows skipped)" if skipped else "")
+    )
+
+def main():
+    global backend, cache
+    parser = argparse.ArgumentParser(description="Build question files for import_nested_questions.")
+    parser.add_argument("--batch", metavar="INPUT", help="Fill missing descriptions and solutions of an importer-format JSON file without prompting")
+    parser.add_argument("--from-rows", metavar="INPUT", help="Convert a CSV or JSON Lines file of question rows to the importer format")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Format of --from-rows input (default: from the file extension)")
+    parser.add_argument("--presorted", action="store_true", help="--from-rows input is already grouped by branch, subject and test")
+    parser.add_argument("-o", "--output", default="structured_data.json", help="Output file (default: structured_data.json)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="gemini", help="Text generator to use (default: gemini)")
+    parser.add_argument("--api-url", default=GEMINI_API_URL, help="generateContent endpoint, e.g. the one of stub_server.py")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight in batch mode (default: 8)")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per prompt on rate limits and server errors (default: 4)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Prompt -> response cache file")
+    args = parser.parse_args()
+
+    if args.from_rows:
+        rows_mode(args.from_rows, args.output, args.format, args.presorted)
+        return
+
+    backend = BACKENDS[args.backend](api_url=args.api_url)
+    cache = ResponseCache(args.cache)
+    try:
+        if args.batch:
+            batch_mode(args.batch, args.output, args.concurrency, args.retries)
+        else:
+            collect_input(args.output)
+    finally:
+        cache.close()
 
 # Run the script
 if __name__ == "__main__":
-    collect_input()
+    main()
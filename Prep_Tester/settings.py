@@ -70,6 +70,19 @@ ROOT_URLCONF = 'Prep_Tester.urls'
 # User agents cache configuration
 USER_AGENTS_CACHE = 'default'
 
+# Cache configuration
+# Local memory by default. With several worker processes use a shared backend so catalog
+# invalidations reach every process, e.g. file based:
+#   DJANGO_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+#   DJANGO_CACHE_LOCATION=/var/tmp/prep_tester_cache
+# or django.core.cache.backends.redis.RedisCache with a redis:// location.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'prep-tester'),
+    }
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -80,6 +93,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'Test_Interface.context_processors.current_branch',
             ],
         },
     },
@@ -123,7 +137,9 @@ WSGI_APPLICATION = 'Prep_Tester.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv("DATABASE_URL"),
-        conn_max_age=600,
+        # Set to 0 under ASGI: each request runs its queries in a thread of its own, so kept-open
+        # connections would pile up instead of being reused
+        conn_max_age=int(os.getenv('DJANGO_CONN_MAX_AGE', 600)),
         ssl_require=True
     )
 }
@@ -182,5 +198,18 @@ LOGOUT_REDIRECT_URL = 'login'    # Name of the URL pattern for login
 # Messages framework settings
 MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 
+# Profile pictures kept by LocalStubBackend (tests / local development)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Backend used by the upload worker to host profile pictures.
+# Test_Interface.uploads.LocalStubBackend keeps them in MEDIA_ROOT instead (tests / local development).
+PROFILE_UPLOAD_BACKEND = os.getenv('PROFILE_UPLOAD_BACKEND', 'Test_Interface.uploads.ImgbbBackend')
+PROFILE_UPLOAD_TIMEOUT = int(os.getenv('PROFILE_UPLOAD_TIMEOUT', '20'))  # Seconds per upload request
+
+# Profile pictures are re-encoded to these bounding-box sizes (px); pages show the smallest
+PROFILE_PICTURE_SIZES = (128, 512)
+PROFILE_PICTURE_FORMAT = os.getenv('PROFILE_PICTURE_FORMAT', 'WEBP')  # WEBP or JPEG
+
 # ImgBB API Key for profile picture uploads
 IMGBB_API_KEY = os.getenv('IMGBB_API_KEY', '98ba5d05a2a2466c7c96fa96fb873c3b')  # Replace with your actual API key
\ No newline at end of file
@@ -1,7 +1,82 @@
 # Test_Interface/admin.py
 
 from django.contrib import admin
-from .models import Branch, Subject, Test, Question, UserAttempt, UserProfile
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from .pagination import EstimatedCountPaginator
+from .search import filter_matching
+from .models import Branch, Subject, Test, Question, ImportCheckpoint, ItemAnalysisRun, QuestionStats, TestResult, TestSession, UploadJob, UserAttempt, UserProfile, UserStats
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filters on the foreign key at ``field_path`` through the admin's
+    autocomplete view, so the sidebar never lists every related object.
+    The related model's admin needs search_fields. Build one with
+    autocomplete_filter(); the changelist must be a LargeTableAdmin.
+    """
+    template = 'admin/Test_Interface/autocomplete_filter.html'
+    field_path = None
+
+    def __init__(self, request, params, model, model_admin):
+        field = get_fields_from_path(model, self.field_path)[-1]
+        self.related_model = field.related_model
+        self.app_label, self.model_name, self.field_name = field.model._meta.app_label, field.model._meta.model_name, field.name
+        super().__init__(request, params, model, model_admin)
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            return queryset.filter(**{self.parameter_name: self.value()})
+        except (ValueError, ValidationError) as e:
+            raise IncorrectLookupParameters(e)
+
+    def choices(self, changelist):
+        selected = None
+        if self.value() is not None and str(self.value()).isdigit():
+            selected = self.related_model._default_manager.filter(pk=self.value()).first() # The only query this filter runs
+        yield {
+            'selected': selected is not None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': str(selected) if selected else '',
+        }
+
+def autocomplete_filter(field_path, title):
+    return type(f'{field_path.title().replace("__", "")}AutocompleteFilter', (AutocompleteFilter,), {
+        'field_path': field_path, 'title': title, 'parameter_name': field_path,
+    })
+
+class ProjectedChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.only(*self.model_admin.list_only) if self.model_admin.list_only else queryset
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base for changelists over millions of rows: approximate counts instead
+    of full-table COUNT(*)s, only the ``list_only`` columns loaded on list
+    pages, and the scripts AutocompleteFilter needs.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_only = None
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, self.admin_site).media
 
 # Inline for Questions within Test Admin
 class QuestionInline(admin.TabularInline):
@@ -30,18 +105,136 @@ class TestAdmin(admin.ModelAdmin):
     inlines = [QuestionInline] # Add questions directly when creating/editing a test
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(LargeTableAdmin):
     list_display = ('text', 'test', 'correct_option')
-    list_filter = ('test__subject__branch', 'test__subject', 'test')
-    search_fields = ('text', 'test__name')
+    list_filter = ('test__subject__branch', autocomplete_filter('test__subject', 'subject'), autocomplete_filter('test', 'test'))
+    list_select_related = ('test__subject',) # Test.__str__ shows the subject
+    list_only = ('text', 'correct_option', 'test__name', 'test__subject__name')
+    search_fields = ('text',) # Shows the search box; get_search_results goes through the full-text index instead
+    search_help_text = 'Every word must occur in the text, an option or the solution.'
     raw_id_fields = ('test',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
+class ItemQualityFilter(admin.SimpleListFilter):
+    """Flags questions with enough answers that look too easy, too hard or badly written."""
+    title = 'quality'
+    parameter_name = 'quality'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('easy', 'Too easy'),
+            ('hard', 'Too hard'),
+            ('low_discrimination', 'Low discrimination'),
+            ('weak_distractor', 'Weak distractor'),
+        ]
+
+    def queryset(self, request, queryset):
+        from .item_analysis import (EASY_DIFFICULTY, HARD_DIFFICULTY, LOW_DISCRIMINATION, MIN_RESPONSES,
+                                    WEAK_DISTRACTOR_SHARE)
+        if self.value() is None:
+            return queryset
+        queryset = queryset.filter(responses__gte=MIN_RESPONSES)
+        if self.value() == 'easy':
+            return queryset.filter(difficulty__gt=EASY_DIFFICULTY)
+        if self.value() == 'hard':
+            return queryset.filter(difficulty__lt=HARD_DIFFICULTY)
+        if self.value() == 'low_discrimination':
+            return queryset.filter(discrimination__lt=LOW_DISCRIMINATION)
+        # A wrong option hardly anybody picks
+        weak = Q()
+        for option in range(1, 5):
+            weak |= ~Q(question__correct_option=option) & Q(**{
+                f'option{option}_count__lt': F('responses') * WEAK_DISTRACTOR_SHARE
+            })
+        return queryset.filter(weak)
+
+@admin.register(QuestionStats)
+class QuestionStatsAdmin(LargeTableAdmin):
+    list_display = ('question', 'test', 'responses', 'difficulty', 'discrimination', 'option_shares', 'updated_at')
+    list_filter = (ItemQualityFilter, 'question__test__subject__branch', autocomplete_filter('question__test', 'test'))
+    list_select_related = ('question__test',)
+    search_fields = ('question__text', 'question__test__name')
+    ordering = ('discrimination',) # Worst discriminating questions first
+    raw_id_fields = ('question',)
+    readonly_fields = [field.name for field in QuestionStats._meta.fields if field.name != 'id'] # Maintained by analyze_items
+
+    @admin.display(ordering='question__test__name')
+    def test(self, obj):
+        return obj.question.test.name
+
+    @admin.display(description='Option shares (* correct)')
+    def option_shares(self, obj):
+        if not obj.responses:
+            return '-'
+        return ' / '.join(
+            f"{round(100 * count / obj.responses)}%{'*' if option == obj.question.correct_option else ''}"
+            for option, count in enumerate(obj.option_counts, 1)
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(ItemAnalysisRun)
+class ItemAnalysisRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_until', 'is_full', 'sessions', 'answers', 'questions', 'seconds')
+    list_filter = ('is_full',)
+    readonly_fields = ('started_at', 'finished_until', 'is_full', 'sessions', 'answers', 'questions', 'seconds')
+
+@admin.register(TestSession)
+class TestSessionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'test', 'started_at', 'finished_at', 'answered', 'correct', 'reviewed')
+    list_filter = ('test__subject__branch', 'test')
+    search_fields = ('user__username', 'test__name')
+    raw_id_fields = ('user', 'test')
+    readonly_fields = ('total_questions', 'answered', 'correct', 'reviewed') # Maintained by answer writes
+
+@admin.register(TestResult)
+class TestResultAdmin(admin.ModelAdmin):
+    list_display = ('test', 'user', 'score', 'achieved_at')
+    list_filter = ('test__subject__branch', 'test')
+    search_fields = ('user__username', 'test__name')
+    raw_id_fields = ('test', 'user', 'session')
+    readonly_fields = ('score', 'session', 'achieved_at') # Maintained with the score buckets; see rebuild_rankings
+
 @admin.register(UserAttempt)
-class UserAttemptAdmin(admin.ModelAdmin):
-    list_display = ('user', 'question', 'selected_option', 'is_correct', 'attempted_at')
-    list_filter = ('user', 'is_correct', 'question__test__subject__branch', 'question__test')
-    search_fields = ('user__username', 'question__text')
-    raw_id_fields = ('user', 'question')
+class UserAttemptAdmin(LargeTableAdmin):
+    list_display = ('user', 'question', 'test_name', 'selected_option', 'is_correct', 'attempted_at')
+    list_filter = (autocomplete_filter('user', 'user'), 'is_correct', 'test__subject__branch', autocomplete_filter('test', 'test'))
+    list_select_related = ('user', 'question', 'test')
+    list_only = ('user__username', 'question__text', 'test__name', 'selected_option', 'is_correct', 'attempted_at')
+    date_hierarchy = 'attempted_at' # Drilling down narrows every query to a range of attempt_time_idx
+    ordering = ('-attempted_at', '-id') # Read backwards from attempt_time_idx, no sort
+    search_fields = ('=user__username',) # Exact match on the unique username index, not a scan of every attempt
+    raw_id_fields = ('user', 'question', 'test', 'session')
+
+    @admin.display(description='test', ordering='test__name')
+    def test_name(self, obj): # Just the name; Test.__str__ would also load the subject
+        return obj.test.name
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'mocks_attempted', 'total_attempted', 'total_correct', 'reviewed_count', 'last_activity')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+
+@admin.register(ImportCheckpoint)
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'position', 'is_complete', 'started_at', 'updated_at')
+    list_filter = ('is_complete',)
+    search_fields = ('file_name', 'file_hash')
+    readonly_fields = ('file_hash', 'position', 'counts') # Maintained by import_nested_questions
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('attempts', 'last_error', 'result_url') # Maintained by the upload worker
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -0,0 +1,40 @@
+# Test_Interface/cache_stats.py
+
+from django.core.cache import cache
+
+# Caches whose hit rate is tracked; reported by the cache_stats management command
+CACHE_NAMES = ['sidebar']
+
+
+def stats_key(name, outcome):
+    return f"cache_stats:{name}:{outcome}"
+
+
+def record(name, hit):
+    """
+    Counts a hit or miss of the named fragment/render cache. Counters live in
+    the cache itself, so they are shared between processes whenever the
+    cache backend is.
+    """
+    key = stats_key(name, 'hits' if hit else 'misses')
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_stats(name):
+    """Returns ``{'hits', 'misses', 'hit_rate'}`` for the named cache."""
+    hits = cache.get(stats_key(name, 'hits'), 0)
+    misses = cache.get(stats_key(name, 'misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round((hits / total) * 100, 1) if total else 0,
+    }
+
+
+def reset_stats(name):
+    cache.delete_many([stats_key(name, 'hits'), stats_key(name, 'misses')])
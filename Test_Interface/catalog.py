@@ -0,0 +1,87 @@
+# Test_Interface/catalog.py
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import Http404
+from .models import Branch, Subject, Test
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_TIMEOUT = 60 * 60 * 24  # Old versions simply age out
+
+
+def get_catalog_version():
+    """
+    Returns the current catalog version. Every cached catalog entry has the
+    version in its key, so bumping it invalidates all of them at once.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing (evicted or never set): any new value will do
+        cache.set(CATALOG_VERSION_KEY, 2, None)
+
+
+def catalog_key(name, version=None):
+    return f"catalog:{version or get_catalog_version()}:{name}"
+
+
+def cached_catalog(name, build):
+    key = catalog_key(name)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, CATALOG_TIMEOUT)
+    return value
+
+
+def get_branches():
+    """All branches ordered by name."""
+    return cached_catalog('branches', lambda: list(Branch.objects.all().order_by('name')))
+
+
+def get_branch(branch_id):
+    """Returns the branch with ``branch_id``, or None."""
+    if not branch_id:
+        return None
+    return next((branch for branch in get_branches() if branch.id == branch_id), None)
+
+
+def get_branch_tree(branch_id):
+    """
+    Returns the subjects of a branch ordered by name, each as
+    ``{'subject': subject, 'tests': [test, ...]}``.
+    """
+    def build():
+        subjects = Subject.objects.filter(branch_id=branch_id).select_related('branch') \
+            .prefetch_related('tests').order_by('name')
+        return [{'subject': subject, 'tests': list(subject.tests.all())} for subject in subjects]
+    return cached_catalog(f"branch_tree:{branch_id}", build)
+
+
+def get_test(test_id):
+    """
+    Returns the test with its subject and branch loaded, raising Http404
+    when it does not exist.
+    """
+    def build():
+        # Cache misses for unknown ids as 0 so they do not hit the database every time
+        return Test.objects.select_related('subject__branch').filter(id=test_id).first() or 0
+    test = cached_catalog(f"test:{test_id}", build)
+    if not test:
+        raise Http404("No Test matches the given query.")
+    return test
+
+
+# For async views: a cache hit costs one thread hop, a miss runs its queries in the same thread
+aget_branches = sync_to_async(get_branches)
+aget_branch = sync_to_async(get_branch)
+aget_branch_tree = sync_to_async(get_branch_tree)
+aget_test = sync_to_async(get_test)
@@ -0,0 +1,14 @@
+# Test_Interface/context_processors.py
+
+from .catalog import get_branch
+
+
+def current_branch(request):
+    """
+    Exposes the logged-in user's branch as ``current_branch``, read from the
+    catalog cache instead of following user.profile.branch in templates.
+    """
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return {}
+    return {'current_branch': get_branch(user.profile.branch_id)}
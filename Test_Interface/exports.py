@@ -0,0 +1,104 @@
+# Test_Interface/exports.py
+
+import csv
+import io
+import json
+from itertools import islice
+from datetime import datetime, time, timedelta
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from .models import UserAttempt
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# (column, lookup) of every exported field, attempts joined with user, question, test, subject and branch
+EXPORT_COLUMNS = [
+    ('attempt_id', 'id'),
+    ('attempted_at', 'attempted_at'),
+    ('session_id', 'session_id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('branch', 'test__subject__branch__name'),
+    ('subject', 'test__subject__name'),
+    ('test_id', 'test_id'),
+    ('test', 'test__name'),
+    ('question_id', 'question_id'),
+    ('question', 'question__text'),
+    ('selected_option', 'selected_option'),
+    ('correct_option', 'question__correct_option'),
+    ('is_correct', 'is_correct'),
+    ('reviewed', 'reviewed'),
+]
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_attempts(branch_id=None, subject_id=None, test_id=None, since=None, until=None):
+    """
+    Attempts matching the filters as tuples in EXPORT_COLUMNS order, oldest
+    first. ``since`` and ``until`` are dates and both days are included.
+    """
+    attempts = UserAttempt.objects.all()
+    if branch_id:
+        attempts = attempts.filter(test__subject__branch_id=branch_id)
+    if subject_id:
+        attempts = attempts.filter(test__subject_id=subject_id)
+    if test_id:
+        attempts = attempts.filter(test_id=test_id)
+    # Day bounds as datetimes, so an index on attempted_at stays usable
+    if since:
+        attempts = attempts.filter(attempted_at__gte=_day_start(since))
+    if until:
+        attempts = attempts.filter(attempted_at__lt=_day_start(until + timedelta(days=1)))
+    return attempts.order_by('id').values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+
+
+def iter_export(rows, export_format, chunk_size=EXPORT_CHUNK_SIZE, on_chunk=None):
+    """
+    Encodes ``rows`` as CSV (with a header line) or NDJSON and yields the
+    text in pieces of ``chunk_size`` rows. Rows are read with a database
+    iterator of the same size, so memory stays flat whatever the row count.
+    ``on_chunk(rows)`` is called with the number of rows in each piece.
+    """
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        write_rows = writer.writerows
+    else:
+        dumps = json.JSONEncoder(ensure_ascii=False, default=lambda value: value.isoformat()).encode
+        write_rows = lambda chunk: buffer.write(''.join([dumps(dict(zip(columns, row))) + '\n' for row in chunk]))
+
+    iterator = rows.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(iterator, chunk_size)):
+        write_rows(chunk)
+        if on_chunk:
+            on_chunk(len(chunk))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell(): # Header of an empty CSV export
+        yield buffer.getvalue()
+
+
+async def aiter_export(rows, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    iter_export() for ASGI responses. Django's ASGI handler would list() a
+    sync iterator before sending it, so each piece is produced separately in
+    the sync thread, on the same database connection, and sent before the next.
+    """
+    pieces = iter_export(rows, export_format, chunk_size)
+    next_piece = sync_to_async(lambda: next(pieces, None))
+    try:
+        while (piece := await next_piece()) is not None:
+            yield piece
+    finally:
+        await sync_to_async(pieces.close)()
+
+
+def export_file_name(export_format):
+    return f"attempts-{timezone.localtime():%Y%m%d-%H%M%S}.{export_format}"
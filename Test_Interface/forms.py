@@ -3,9 +3,18 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from .models import UserProfile, Branch # Import UserProfile and Branch
+from .catalog import get_branches
+from .search import SEARCH_MAX_LIMIT
 
 User = get_user_model()
 
+def use_cached_branch_choices(field):
+    """
+    Renders a Branch ModelChoiceField from the catalog cache instead of
+    querying Branch on every render. Validation still uses the queryset.
+    """
+    field.choices = [('', field.empty_label)] + [(branch.pk, branch.name) for branch in get_branches()]
+
 class BranchSelectionForm(forms.Form):
     """
     Form for users to select their engineering branch.
@@ -17,6 +26,10 @@ class BranchSelectionForm(forms.Form):
         label="Your Branch"
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        use_cached_branch_choices(self.fields['branch'])
+
 class UserProfileForm(forms.ModelForm):
     # Example for choices if you want dropdowns
     BRANCH_CHOICES = [
@@ -59,6 +72,7 @@ class UserProfileForm(forms.ModelForm):
         # Pass the User instance to the form for initial data and saving User fields
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
+        use_cached_branch_choices(self.fields['branch'])
 
         # Initialize fields from the User model and UserProfile
         if self.user:
@@ -132,3 +146,27 @@ class AccountSettingsForm(forms.ModelForm):
             raise forms.ValidationError("This email is already in use by another account.")
         return email
 
+
+class AttemptExportForm(forms.Form):
+    """Query-string filters of the attempt export; every field is optional."""
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], required=False)
+    branch = forms.IntegerField(min_value=1, required=False)
+    subject = forms.IntegerField(min_value=1, required=False)
+    test = forms.IntegerField(min_value=1, required=False)
+    since = forms.DateField(required=False, help_text="First day included (YYYY-MM-DD)")
+    until = forms.DateField(required=False, help_text="Last day included (YYYY-MM-DD)")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since, until = cleaned_data.get('since'), cleaned_data.get('until')
+        if since and until and since > until:
+            raise forms.ValidationError("The date range ends before it starts.")
+        return cleaned_data
+
+
+class QuestionSearchForm(forms.Form):
+    """Query string of the question search; only ``q`` is required."""
+    q = forms.CharField(max_length=200, strip=True)
+    branch = forms.IntegerField(min_value=1, required=False)
+    subject = forms.IntegerField(min_value=1, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=SEARCH_MAX_LIMIT, required=False)
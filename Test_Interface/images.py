@@ -0,0 +1,46 @@
+# Test_Interface/images.py
+
+from tempfile import SpooledTemporaryFile
+from PIL import Image, ImageOps
+
+SPOOL_MAX_SIZE = 1024 * 1024  # Encoded variants larger than this spill to a temp file
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+class InvalidImage(Exception):
+    """Raised when an upload cannot be decoded as an image."""
+
+
+def variant_name(name, size, image_format):
+    stem = name.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    return f"{stem}_{size}.{EXTENSIONS[image_format]}"
+
+
+def iter_variants(file, sizes, image_format='WEBP'):
+    """
+    Decodes ``file`` once, applies its EXIF orientation and yields
+    ``(size, encoded_file)`` for each size, largest first, each scaled to fit
+    a ``size`` x ``size`` box. Only one decoded image and one encoded variant
+    are alive at a time; the caller closes each yielded file.
+    """
+    sizes = sorted(sizes, reverse=True)
+    try:
+        with Image.open(file) as image:
+            # JPEGs are decoded straight at a reduced scale instead of full resolution
+            image.draft('RGB', (sizes[0], sizes[0]))
+            image = ImageOps.exif_transpose(image)
+            keep_alpha = image_format == 'WEBP' and image.mode in ('RGBA', 'LA', 'P')
+            image = image.convert('RGBA' if keep_alpha else 'RGB')
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:  # Not an image, truncated or too large
+        raise InvalidImage(str(e)) from e
+
+    for size in sizes:
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)  # In place; each size shrinks the previous one
+        encoded = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        image.save(encoded, format=image_format, **SAVE_OPTIONS[image_format])
+        encoded.seek(0)
+        yield size, encoded
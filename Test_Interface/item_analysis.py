@@ -0,0 +1,148 @@
+# Test_Interface/item_analysis.py
+
+import time
+from datetime import timedelta
+import numpy as np
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import ItemAnalysisRun, QuestionStats, TestSession, UserAttempt
+
+CHUNK_SIZE = 100_000
+WRITE_BATCH_SIZE = 1000
+SETTLE_DELAY = timedelta(minutes=1)  # A session finishing right now may not be committed yet
+
+# Report thresholds, used by the admin's quality filter
+MIN_RESPONSES = 30
+EASY_DIFFICULTY = 0.9
+HARD_DIFFICULTY = 0.3
+LOW_DISCRIMINATION = 0.2
+WEAK_DISTRACTOR_SHARE = 0.05
+
+
+def iter_answer_chunks(since, until, chunk_size=CHUNK_SIZE):
+    """
+    Yields the answers of sessions finished in ``(since, until]`` as int64
+    arrays of ``chunk_size`` rows: question id, selected option, correct
+    (0/1) and the sitting's score. Rows go from the cursor straight into
+    NumPy, without building model instances or dicts. The cursor is the
+    one QuerySet.iterator() uses, server-side on PostgreSQL, so only one
+    chunk is held in memory.
+    """
+    answers = UserAttempt.objects.filter(session__finished_at__lte=until, selected_option__isnull=False)
+    if since is not None:
+        answers = answers.filter(session__finished_at__gt=since)
+    answers = answers.order_by().values_list('question_id', 'selected_option', 'is_correct', 'session__correct')
+    sql, params = answers.query.sql_with_params()
+    with connections[answers.db].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield np.array(rows, dtype=np.int64)
+
+
+def group_sums(keys, values):
+    """Sums the rows of ``values`` that share a key. Returns ``(sorted unique keys, sums)``."""
+    if not len(keys):
+        return keys, values
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(values, starts, axis=0)
+
+
+def chunk_sums(answers):
+    """Per-question sums of one answer chunk, in QuestionStats.COUNT_FIELDS order."""
+    question_ids, options, correct, score = answers.T
+    rest = score - correct
+    values = np.column_stack([
+        np.ones_like(correct),
+        correct,
+        options[:, None] == np.arange(1, 5),
+        rest,
+        rest * rest,
+        correct * rest,
+    ]).astype(np.int64)
+    return group_sums(question_ids, values)
+
+
+def item_metrics(sums):
+    """
+    Difficulty (share correct) and point-biserial discrimination of each
+    row of sums. Items nobody or everybody got right, or whose takers all
+    had the same rest score, have no discrimination (NaN).
+    """
+    n, x, _, _, _, _, y, yy, xy = sums.T.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        difficulty = np.where(n > 0, x / n, np.nan)
+        spread = (n * x - x * x) * (n * yy - y * y)
+        discrimination = np.where(spread > 0, (n * xy - x * y) / np.sqrt(spread), np.nan)
+    return difficulty, discrimination
+
+
+def _or_none(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def _write_stats(question_ids, sums, add_existing, batch_size):
+    fields = QuestionStats.COUNT_FIELDS
+    for start in range(0, len(question_ids), batch_size):
+        ids, batch = question_ids[start:start + batch_size], sums[start:start + batch_size]
+        if add_existing:
+            existing = dict((row[0], row[1:]) for row in QuestionStats.objects.filter(
+                question_id__in=ids.tolist()
+            ).values_list('question_id', *fields))
+            batch = batch + np.array([existing.get(int(i), (0,) * len(fields)) for i in ids], dtype=np.int64)
+        difficulty, discrimination = item_metrics(batch)
+        QuestionStats.objects.bulk_create([
+            QuestionStats(
+                question_id=int(question_id),
+                difficulty=_or_none(difficulty[row]),
+                discrimination=_or_none(discrimination[row]),
+                **dict(zip(fields, map(int, batch[row]))),
+            )
+            for row, question_id in enumerate(ids)
+        ], update_conflicts=True, unique_fields=['question'], update_fields=[*fields, 'difficulty', 'discrimination', 'updated_at'])
+
+
+def analyze_items(full=False, until=None, chunk_size=CHUNK_SIZE, batch_size=WRITE_BATCH_SIZE):
+    """
+    Folds the answers of sessions finished since the last run into the
+    QuestionStats rows, or recomputes every row from scratch with ``full``.
+    Answers are read in chunks and reduced to per-question sums with NumPy,
+    so memory is bounded by the chunk size and the number of questions.
+    Returns the ItemAnalysisRun recorded.
+    """
+    started = time.perf_counter()
+    until = until or timezone.now() - SETTLE_DELAY
+    last = None if full else ItemAnalysisRun.objects.order_by('-finished_until').first()
+    since = last.finished_until if last else None
+    if since is not None:
+        until = max(until, since)
+
+    question_ids = np.empty(0, dtype=np.int64)
+    sums = np.empty((0, len(QuestionStats.COUNT_FIELDS)), dtype=np.int64)
+    answers = 0
+    if since is None or until > since:
+        for chunk in iter_answer_chunks(since, until, chunk_size):
+            answers += len(chunk)
+            chunk_ids, chunk_totals = chunk_sums(chunk)
+            question_ids, sums = group_sums(np.concatenate([question_ids, chunk_ids]), np.vstack([sums, chunk_totals]))
+
+    sessions = TestSession.objects.filter(finished_at__lte=until, answered__gt=0)
+    if since is not None:
+        sessions = sessions.filter(finished_at__gt=since)
+
+    with transaction.atomic():
+        if last is None:
+            QuestionStats.objects.all().delete()
+        _write_stats(question_ids, sums, add_existing=last is not None, batch_size=batch_size)
+        return ItemAnalysisRun.objects.create(
+            finished_until=until,
+            is_full=last is None,
+            sessions=sessions.count() if answers else 0,
+            answers=answers,
+            questions=len(question_ids),
+            seconds=round(time.perf_counter() - started, 3),
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from Test_Interface.item_analysis import analyze_items, CHUNK_SIZE, WRITE_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = ('Update question difficulty, discrimination and option shares (QuestionStats) '
+            'from the answers of sessions finished since the last run')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every question from all finished sessions, e.g. after questions were edited',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Number of answers loaded into memory at a time',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=WRITE_BATCH_SIZE,
+            help='Number of stats rows written per bulk upsert',
+        )
+
+    def handle(self, *args, **options):
+        run = analyze_items(full=options['full'], chunk_size=options['chunk_size'], batch_size=options['batch_size'])
+        rate = f" ({run.answers / run.seconds:,.0f} answers/s)" if run.answers and run.seconds else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Analysed {run.answers} answer(s) from {run.sessions} session(s) in {run.seconds:.2f}s{rate}; "
+            f"updated {run.questions} question(s)."
+        ))
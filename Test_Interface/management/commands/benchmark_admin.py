@@ -0,0 +1,95 @@
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from Test_Interface.models import Branch, Subject, Test, Question, UserAttempt
+
+class LegacyUserAttemptAdmin(admin.ModelAdmin):
+    # The changelist as it was configured before LargeTableAdmin
+    list_display = ('user', 'question', 'selected_option', 'is_correct', 'attempted_at')
+    list_filter = ('user', 'is_correct', 'question__test__subject__branch', 'question__test')
+    search_fields = ('user__username', 'question__text')
+    raw_id_fields = ('user', 'question', 'session')
+
+class Command(BaseCommand):
+    help = 'Benchmark the UserAttempt admin changelist on a synthetic dataset (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=1_000_000, help='Number of synthetic attempts (default: 1000000)')
+        parser.add_argument('--users', type=int, default=20_000, help='Number of synthetic users (default: 20000)')
+        parser.add_argument('--tests', type=int, default=200, help='Number of synthetic tests of 50 questions (default: 200)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            superuser, user_id, test_id, year, month = self.build_dataset(options['attempts'], options['users'], options['tests'])
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(UserAttempt._meta.db_table)}')
+
+            # (label, legacy filter parameters, parameters of the autocomplete filters)
+            scenarios = [
+                ('First page', {}, {}),
+                ('Filtered by user', {'user__id__exact': user_id}, {'user': user_id}),
+                ('Filtered by test', {'question__test__id__exact': test_id}, {'test': test_id}),
+                ('Year drill-down', {'attempted_at__year': year}, {'attempted_at__year': year}),
+                ('Month drill-down', {'attempted_at__year': year, 'attempted_at__month': month},
+                 {'attempted_at__year': year, 'attempted_at__month': month}),
+            ]
+            admins = [LegacyUserAttemptAdmin(UserAttempt, admin.site), admin.site.get_model_admin(UserAttempt)]
+            self.stdout.write(f'{options["attempts"]} attempts, {options["users"]} users, {options["tests"]} tests')
+            self.stdout.write(f'{"":20} {"before":>22} {"after":>22}')
+            for label, *params in scenarios:
+                cells = []
+                for model_admin, admin_params in zip(admins, params):
+                    seconds, queries, size = self.render(model_admin, superuser, admin_params)
+                    cells.append(f'{seconds * 1000:9.1f} ms {queries:3} q {size // 1024:4} KB')
+                self.stdout.write(f'{label:20} {cells[0]:>22} {cells[1]:>22}')
+            transaction.set_rollback(True)
+
+    def render(self, model_admin, user, params):
+        request = RequestFactory().get('/admin/Test_Interface/userattempt/', params)
+        request.user = user
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = model_admin.changelist_view(request)
+            response.render()
+            seconds = time.perf_counter() - start
+        return seconds, len(queries), len(response.content)
+
+    def build_dataset(self, attempts, users, tests):
+        prefix = f'adminbench-{time.time_ns()}'
+        superuser = User.objects.create_superuser(username=f'{prefix}-admin', password='!')
+        User.objects.bulk_create([User(username=f'{prefix}-{i}', password='!') for i in range(users)], batch_size=5000)
+        user_ids = list(User.objects.filter(username__startswith=f'{prefix}-').exclude(pk=superuser.pk).values_list('id', flat=True))
+
+        branch = Branch.objects.create(name=prefix)
+        subject = Subject.objects.create(name=prefix, branch=branch)
+        Test.objects.bulk_create([Test(name=f'{prefix}-{i}', subject=subject) for i in range(tests)])
+        Question.objects.bulk_create([
+            Question(test=test, text=f'Question {i} of {test.name}', option1='a', option2='b', option3='c', option4='d', correct_option=1)
+            for test in Test.objects.filter(subject=subject) for i in range(50)
+        ], batch_size=5000)
+        questions = list(Question.objects.filter(test__subject=subject).values_list('id', 'test_id'))
+
+        # Two years of attempts; attempted_at is auto_now_add, which would overwrite the spread
+        now = timezone.now()
+        field = UserAttempt._meta.get_field('attempted_at')
+        with mock.patch.object(field, 'auto_now_add', False):
+            for start in range(0, attempts, 10_000):
+                UserAttempt.objects.bulk_create([
+                    UserAttempt(
+                        user_id=random.choice(user_ids), question_id=question_id, test_id=test_id,
+                        selected_option=random.randint(1, 4), is_correct=random.random() < 0.5,
+                        attempted_at=now - timedelta(minutes=random.randint(0, 2 * 365 * 24 * 60)),
+                    )
+                    for question_id, test_id in random.choices(questions, k=min(10_000, attempts - start))
+                ])
+        sample = UserAttempt.objects.filter(test__subject=subject).only('user_id', 'test_id', 'attempted_at').first()
+        local = timezone.localtime(sample.attempted_at)
+        return superuser, sample.user_id, sample.test_id, local.year, local.month
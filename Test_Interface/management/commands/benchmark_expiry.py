@@ -0,0 +1,78 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from Test_Interface.models import Branch, Subject, Test, TestResult, TestScoreBucket, TestSession
+from Test_Interface.sessions import EXPIRE_BATCH_SIZE, expire_sessions, finish_session
+
+class Command(BaseCommand):
+    help = 'Benchmark finishing sessions that expire in the same minute (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=5000, help='Sessions expiring together (default: 5000)')
+        parser.add_argument('--open', type=int, default=50_000, help='Open sessions not yet expired (default: 50000)')
+        parser.add_argument('--tests', type=int, default=20, help='Number of tests they belong to (default: 20)')
+        parser.add_argument('--batch-size', type=int, default=EXPIRE_BATCH_SIZE,
+                            help=f'Sessions per sweep batch (default: {EXPIRE_BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        count = options['sessions']
+        with transaction.atomic():
+            users, tests = self.build_dataset(count, options['tests'])
+            now = timezone.now()
+            self.add_sessions(users, tests, options['open'], now + timedelta(minutes=30)) # Still running
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            # Each session finished on its own, as a request reaching the result page would
+            legacy = self.add_sessions(users, tests, count, now - timedelta(seconds=30))
+            one_by_one = self.measure(lambda: [finish_session(session) for session in TestSession.objects.filter(id__in=legacy)])
+            TestSession.objects.filter(id__in=legacy).delete()
+            TestResult.objects.filter(test__in=tests).delete()
+            TestScoreBucket.objects.filter(test__in=tests).delete()
+
+            self.add_sessions(users, tests, count, now - timedelta(seconds=30))
+            expired = TestSession.objects.filter(finished_at__isnull=True, deadline__lt=now).count()
+            swept = self.measure(lambda: expire_sessions(options['batch_size']))
+            idle = self.measure(lambda: expire_sessions(options['batch_size']))
+
+            self.stdout.write(f'{count} sessions expiring together, {options["open"]} still open, {options["tests"]} tests')
+            for label, (seconds, queries) in [('finish_session per session', one_by_one),
+                                              (f'expire_sessions ({expired} finished)', swept),
+                                              ('expire_sessions, nothing due', idle)]:
+                self.stdout.write(f'{label + ":":36} {seconds * 1000:10.1f} ms {queries:7} queries')
+            self.stdout.write(self.style.SUCCESS(f'{count / swept[0]:,.0f} sessions/s swept'))
+            transaction.set_rollback(True)
+
+    def measure(self, work):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            work()
+            return time.perf_counter() - start, queries
+
+    def build_dataset(self, count, tests):
+        prefix = f'expirybench-{time.time_ns()}'
+        User.objects.bulk_create([User(username=f'{prefix}-{i}', password='!') for i in range(count)], batch_size=5000)
+        users = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+        subject = Subject.objects.create(name=prefix, branch=Branch.objects.create(name=prefix))
+        Test.objects.bulk_create([Test(name=f'{prefix}-{i}', subject=subject) for i in range(tests)])
+        return users, list(Test.objects.filter(subject=subject))
+
+    def add_sessions(self, users, tests, count, deadline):
+        sessions = TestSession.objects.bulk_create([
+            TestSession(user_id=users[i % len(users)], test=tests[i % len(tests)], deadline=deadline,
+                        total_questions=50, answered=(answered := random.randint(0, 50)),
+                        correct=random.randint(0, answered))
+            for i in range(count)
+        ], batch_size=5000)
+        return [session.pk for session in sessions]
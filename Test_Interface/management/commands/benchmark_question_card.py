@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from Test_Interface.catalog import get_test
+from Test_Interface.models import Question
+
+class Command(BaseCommand):
+    help = 'Benchmark rendering of the question_card partial with and without its render cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test-id', type=int, help='Test whose questions are rendered (default: the first test with questions)')
+        parser.add_argument('--iterations', type=int, default=2000, help='Number of cards rendered per run')
+
+    def handle(self, *args, **options):
+        question_filter = {'test_id': options['test_id']} if options['test_id'] else {}
+        questions = list(Question.objects.filter(**question_filter).order_by('id')[:200])
+        if not questions:
+            raise CommandError('No questions found to render.')
+        test = get_test(questions[0].test_id)
+        questions = [question for question in questions if question.test_id == test.id]
+        request = RequestFactory().get('/')
+        iterations = options['iterations']
+
+        def run():
+            start = time.perf_counter()
+            for i in range(iterations):
+                question = questions[i % len(questions)]
+                render_to_string('Test_Interface/partials/question_card.html', {
+                    'test': test,
+                    'question': question,
+                    'q_index': i % len(questions),
+                    'total': len(questions),
+                    'submitted': i % 2 == 0,
+                    'is_correct': i % 4 == 0,
+                    'solution': question.solution,
+                    'selected': 1,
+                }, request=request)
+            return (time.perf_counter() - start) / iterations * 1_000_000
+
+        with override_settings(QUESTION_CARD_CACHE=False):
+            before = run()
+        after = run()
+
+        self.stdout.write(f'Rendered {iterations} cards over {len(questions)} questions of "{test.name}"')
+        self.stdout.write(f'Without render cache: {before:.1f} us/card')
+        self.stdout.write(f'With render cache:    {after:.1f} us/card')
+        self.stdout.write(self.style.SUCCESS(f'Speed-up: {before / after:.2f}x'))
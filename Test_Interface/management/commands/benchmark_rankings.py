@@ -0,0 +1,101 @@
+import bisect
+import random
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from Test_Interface.models import Branch, Subject, Test, TestResult, TestScoreBucket, TestSession
+from Test_Interface.rankings import get_ranking, ranking_key, record_result
+
+class Command(BaseCommand):
+    help = 'Benchmark rank and percentile lookups on a synthetic test (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--takers', type=int, default=100_000, help='Number of synthetic takers (default: 100000)')
+        parser.add_argument('--questions', type=int, default=100, help='Questions in the synthetic test (default: 100)')
+        parser.add_argument('--lookups', type=int, default=10_000, help='Rank/percentile lookups per run (default: 10000)')
+
+    def handle(self, *args, **options):
+        takers, questions, lookups = options['takers'], options['questions'], options['lookups']
+        with transaction.atomic():
+            test = self.build_dataset(takers, questions)
+            probes = [random.randint(0, questions) for _ in range(lookups)]
+
+            def naive(score):
+                # What the page would do without rankings: load and sort every taker's score
+                scores = sorted(TestResult.objects.filter(test=test).values_list('score', flat=True))
+                below = bisect.bisect_left(scores, score)
+                return len(scores) - bisect.bisect_right(scores, score) + 1, 100 * below / len(scores)
+
+            def counted(score):
+                # Indexed COUNT queries per lookup
+                results = TestResult.objects.filter(test=test)
+                return results.filter(score__gt=score).count() + 1, results.filter(score__lt=score).count()
+
+            def ranked(score):
+                ranking = get_ranking(test.id)
+                return ranking.rank(score), ranking.percentile(score)
+
+            naive_runs = max(1, min(lookups, 20))
+            timings = [
+                ('Sort all scores per lookup', self.time(naive, probes[:naive_runs])),
+                ('Indexed COUNT queries', self.time(counted, probes[:min(lookups, 500)])),
+            ]
+            from django.core.cache import cache
+            cache.delete(ranking_key(test.id))
+            start = time.perf_counter()
+            get_ranking(test.id)
+            cold = (time.perf_counter() - start) * 1_000_000
+            timings.append(('Precomputed ranking', self.time(ranked, probes)))
+
+            sessions = self.finish_sessions(test, min(1000, takers), questions)
+            start = time.perf_counter()
+            for session in sessions:
+                record_result(session)
+            update = (time.perf_counter() - start) / len(sessions) * 1_000_000
+
+            self.stdout.write(f'{takers} takers, {questions + 1} possible scores')
+            for label, per_lookup in timings:
+                self.stdout.write(f'{label + ":":30} {per_lookup:12.1f} us/lookup')
+            self.stdout.write(f'{"Ranking rebuild from buckets:":30} {cold:12.1f} us')
+            self.stdout.write(f'{"Incremental update per finish:":30} {update:12.1f} us')
+            self.stdout.write(self.style.SUCCESS(f'Speed-up over sorting: {timings[0][1] / timings[-1][1]:.0f}x'))
+            transaction.set_rollback(True)
+
+    def time(self, lookup, probes):
+        start = time.perf_counter()
+        for score in probes:
+            lookup(score)
+        return (time.perf_counter() - start) / len(probes) * 1_000_000
+
+    def build_dataset(self, takers, questions):
+        branch = Branch.objects.create(name='Ranking benchmark')
+        subject = Subject.objects.create(name='Ranking benchmark', branch=branch)
+        test = Test.objects.create(name='Ranking benchmark', subject=subject)
+        prefix = f'rankbench-{time.time_ns()}'
+        User.objects.bulk_create(
+            [User(username=f'{prefix}-{i}', password='!') for i in range(takers)], batch_size=5000
+        )
+        users = User.objects.filter(username__startswith=prefix).values_list('id', flat=True)
+        now = timezone.now()
+        TestResult.objects.bulk_create([
+            TestResult(test=test, user_id=user_id, score=min(questions, max(0, int(random.gauss(questions * 0.6, questions * 0.15)))), achieved_at=now)
+            for user_id in users.iterator(chunk_size=5000)
+        ], batch_size=5000)
+        TestScoreBucket.objects.bulk_create([
+            TestScoreBucket(test=test, **row)
+            for row in TestResult.objects.filter(test=test).values('score').annotate(takers=Count('id')).order_by()
+        ])
+        return test
+
+    def finish_sessions(self, test, count, questions):
+        now = timezone.now()
+        user_ids = TestResult.objects.filter(test=test).values_list('user_id', flat=True)[:count]
+        TestSession.objects.bulk_create([
+            TestSession(user_id=user_id, test=test, deadline=now, finished_at=now, total_questions=questions,
+                        answered=questions, correct=random.randint(0, questions))
+            for user_id in user_ids
+        ])
+        return list(TestSession.objects.filter(test=test))
@@ -0,0 +1,80 @@
+import itertools
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from Test_Interface.models import Branch, Subject, Test, Question
+from Test_Interface.search import search_questions
+
+class Command(BaseCommand):
+    help = 'Benchmark question search on a synthetic question bank (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=1_000_000, help='Number of synthetic questions (default: 1000000)')
+        parser.add_argument('--words', type=int, default=20_000, help='Vocabulary size (default: 20000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query (default: 20)')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        # Made-up words with a Zipf-like frequency, like real text: a few very common, most rare
+        vocabulary = [f'w{rank}x' for rank in range(options['words'])]
+        weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(options['words'])))
+        with transaction.atomic():
+            start = time.perf_counter()
+            branch = self.build_dataset(options['questions'], vocabulary, weights)
+            self.stdout.write(f'{options["questions"]} questions inserted and indexed in {time.perf_counter() - start:.1f}s')
+
+            common, frequent, medium, rare = vocabulary[0], vocabulary[10], vocabulary[500], vocabulary[-1]
+            scenarios = [
+                ('Common word', common, {}),
+                ('Frequent word', frequent, {}),
+                ('Medium word', medium, {}),
+                ('Rare word', rare, {}),
+                ('Two words', f'{frequent} {medium}', {}),
+                ('Medium word, branch', medium, {'branch_id': branch.id}),
+            ]
+            self.stdout.write(f'{"":20} {"substring (p50/p95)":>24} {"full-text (p50/p95)":>24} {"text hits":>9}')
+            for label, query, filters in scenarios:
+                legacy = self.measure(lambda: self.substring_search(query, **filters), options['repeat'])
+                indexed = self.measure(lambda: search_questions(query, **filters), options['repeat'])
+                matches = self.substring_search(query, count=True, **filters)
+                self.stdout.write(f'{label:20} {legacy:>24} {indexed:>24} {matches:>9}')
+            transaction.set_rollback(True)
+
+    def substring_search(self, query, branch_id=None, count=False):
+        # What QuestionAdmin's search did before: one ILIKE '%word%' per word, no ranking
+        questions = Question.objects.all()
+        if branch_id:
+            questions = questions.filter(test__subject__branch_id=branch_id)
+        for word in query.split():
+            questions = questions.filter(text__icontains=word)
+        return questions.count() if count else list(questions.order_by('id')[:20])
+
+    def measure(self, search, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            search()
+            timings.append((time.perf_counter() - start) * 1000)
+        p95 = statistics.quantiles(timings, n=20)[-1] if repeat > 1 else timings[0]
+        return f'{statistics.median(timings):8.2f} / {p95:8.2f} ms'
+
+    def build_dataset(self, count, vocabulary, weights):
+        prefix = f'searchbench-{time.time_ns()}'
+        branches = [Branch.objects.create(name=f'{prefix}-{i}') for i in range(4)]
+        subjects = [Subject.objects.create(name=f'{prefix}-{i}', branch=branches[i % 4]) for i in range(20)]
+        tests = Test.objects.bulk_create([Test(name=f'{prefix}-{i}', subject=subjects[i % 20]) for i in range(count // 50 or 1)])
+
+        def words(n):
+            return ' '.join(random.choices(vocabulary, cum_weights=weights, k=n))
+
+        for start in range(0, count, 5000):
+            Question.objects.bulk_create([
+                Question(test=tests[i % len(tests)], text=words(15), option1=words(2), option2=words(2), option3=words(2),
+                         option4=words(2), correct_option=1, solution=words(25))
+                for i in range(start, min(start + 5000, count))
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return branches[0]
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from importlib import import_module
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+
+# The servers import this module for their application before Django is set up,
+# so models are only imported inside the command's methods.
+SERVERS = {
+    'WSGI (gunicorn, 2 threads)': [
+        '-m', 'gunicorn', f'{__name__}:wsgi_application()', '--workers', '1', '--threads', '2',
+        '--bind', '127.0.0.1:{port}',
+    ],
+    'ASGI (uvicorn)': [
+        '-m', 'uvicorn', f'{__name__}:asgi_application', '--factory', '--workers', '1',
+        '--port', '{port}', '--no-access-log', '--log-level', 'warning',
+    ],
+}
+
+
+def delay_query(execute, sql, params, many, context):
+    # Every query waits out a network round trip, as it would against a database on another host
+    time.sleep(float(os.environ.get('BENCHMARK_QUERY_LATENCY_MS', 0)) / 1000)
+    return execute(sql, params, many, context)
+
+
+def add_query_latency(sender, connection, **kwargs):
+    # Fired on every reconnect of the thread's connection wrapper, so only add the delay once
+    if delay_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(delay_query)
+
+
+def wsgi_application():
+    from django.core.wsgi import get_wsgi_application
+    connection_created.connect(add_query_latency)
+    return get_wsgi_application()
+
+
+def asgi_application():
+    from django.core.asgi import get_asgi_application
+    connection_created.connect(add_query_latency)
+    return get_asgi_application()
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput of the test-taking pages served by WSGI and ASGI servers on this database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per server and page (default: 2000)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Simultaneous clients (default: 50)')
+        parser.add_argument('--latency', type=float, default=2.0,
+                            help='Milliseconds added to every query, as to a remote database (default: 2)')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers listen on (default: 8765)')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['NAME'] == ':memory:':
+            raise CommandError('The servers run in their own processes and need a database they can share')
+
+        user, session, pages = self.build_dataset()
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+        try:
+            self.stdout.write(f'{options["concurrency"]} clients, {options["requests"]} requests per page, '
+                              f'{options["latency"]:g} ms per query')
+            self.stdout.write(f'{"":28} {"page":10} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+            for server, args in SERVERS.items():
+                with self.serve(args, options['port'], options['latency']):
+                    for page, path in pages.items():
+                        # Untimed first round fills the server's template, catalog and manifest caches
+                        asyncio.run(self.load(options['port'], path, cookie, options['concurrency'], options['concurrency']))
+                        rate, p50, p95, errors = asyncio.run(
+                            self.load(options['port'], path, cookie, options['requests'], options['concurrency'])
+                        )
+                        self.stdout.write(f'{server:28} {page:10} {rate:8.0f} {p50:8.1f} {p95:8.1f} {errors:7}')
+        finally:
+            session.delete()
+            user.delete()
+
+    def build_dataset(self):
+        from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+        from django.contrib.auth.models import User
+        from django.urls import reverse
+        from Test_Interface.models import Test
+        from Test_Interface.sessions import finish_session, start_session
+
+        # Two existing tests: one the user is sitting, one they finished
+        tests = list(Test.objects.filter(questions__isnull=False).distinct().order_by('id')[:2])
+        if len(tests) < 2:
+            raise CommandError('Needs at least two tests with questions')
+        sitting, finished = tests
+        user = User.objects.create_user(username=f'serverbench-{time.time_ns()}')
+        user.profile.branch_id = sitting.subject.branch_id
+        user.profile.save()
+        start_session(user, sitting)
+        result = finish_session(start_session(user, finished))
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session.update({
+            SESSION_KEY: str(user.pk),
+            BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend',
+            HASH_SESSION_KEY: user.get_session_auth_hash(),
+        })
+        session.create()
+        pages = {
+            'dashboard': reverse('dashboard'),
+            'question': reverse('question_view', args=[sitting.id, 0]),
+            'partial': reverse('question_partial', args=[sitting.id, 0]),
+            'result': f"{reverse('display_test_result', args=[finished.id])}?session={result.id}",
+        }
+        return user, session, pages
+
+    @contextmanager
+    def serve(self, args, port, latency):
+        process = subprocess.Popen(
+            [sys.executable] + [arg.format(port=port) for arg in args],
+            cwd=settings.BASE_DIR, env={**os.environ, 'BENCHMARK_QUERY_LATENCY_MS': str(latency)},
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise CommandError(f'{args[1]} did not start listening on port {port}')
+                    time.sleep(0.2)
+            yield
+        finally:
+            process.terminate()
+            process.wait()
+
+    async def load(self, port, path, cookie, total, concurrency):
+        request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n\r\n'.encode()
+        remaining = total
+        timings = []
+        errors = 0
+
+        async def client():
+            nonlocal remaining, errors
+            writer = None
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                    writer.write(request)
+                    status, keep_alive = await self.read_response(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    errors += 1
+                    writer = None
+                    continue
+                timings.append(time.perf_counter() - start)
+                errors += status != 200
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            if writer:
+                writer.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        return total / elapsed, statistics.median(timings) * 1000, p95 * 1000, errors
+
+    async def read_response(self, reader):
+        head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(':') for line in head[1:] if line)}
+        if 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while size := int((await reader.readline()).split(b';')[0], 16):
+                await reader.readexactly(size + 2)
+            await reader.readline()
+        return int(head[0].split()[1]), headers.get('connection', '').lower() != 'close'
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from Test_Interface.cache_stats import CACHE_NAMES, get_stats, reset_stats
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters and hit rate of the fragment and render caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f'Cache names to report (default: {", ".join(CACHE_NAMES)})')
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after reporting them',
+        )
+
+    def handle(self, *args, **options):
+        for name in options['names'] or CACHE_NAMES:
+            stats = get_stats(name)
+            self.stdout.write(f"{name}: {stats['hits']} hits, {stats['misses']} misses, {stats['hit_rate']}% hit rate")
+            if options['reset']:
+                reset_stats(name)
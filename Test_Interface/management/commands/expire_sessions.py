@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from Test_Interface.sessions import expire_sessions, EXPIRE_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Finish test sessions whose deadline has passed and fold their scores into the rankings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Finish the sessions that are currently expired and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EXPIRE_BATCH_SIZE,
+            help=f'Number of sessions finished per transaction (default: {EXPIRE_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=15.0,
+            help='Seconds between sweeps (default: 15)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            expired = expire_sessions(options['batch_size'])
+            if expired:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Finished {expired} expired session(s) in {time.perf_counter() - start:.2f}s."
+                ))
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,50 @@
+import sys
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from Test_Interface.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_attempts, iter_export
+
+class Command(BaseCommand):
+    help = 'Stream UserAttempt rows, joined with user, question, test and subject, to CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', help='Output format')
+        parser.add_argument('--output', help='File to write to (default: standard output)')
+        parser.add_argument('--branch', type=int, help='Only attempts on tests of this branch id')
+        parser.add_argument('--subject', type=int, help='Only attempts on tests of this subject id')
+        parser.add_argument('--test', type=int, help='Only attempts on this test id')
+        parser.add_argument('--since', type=date.fromisoformat, help='First day included (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day included (YYYY-MM-DD)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Number of rows fetched from the database and written at a time',
+        )
+
+    def handle(self, *args, **options):
+        if options['since'] and options['until'] and options['since'] > options['until']:
+            raise CommandError('--until must not be before --since')
+        rows = export_attempts(
+            branch_id=options['branch'], subject_id=options['subject'], test_id=options['test'],
+            since=options['since'], until=options['until'],
+        )
+
+        started = time.perf_counter()
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        exported = 0
+
+        def count(rows_written):
+            nonlocal exported
+            exported += rows_written
+
+        try:
+            for piece in iter_export(rows, options['format'], chunk_size=options['chunk_size'], on_chunk=count):
+                out.write(piece)
+        finally:
+            if options['output']:
+                out.close()
+
+        seconds = time.perf_counter() - started
+        rate = f" ({exported / seconds:,.0f} rows/s)" if exported and seconds else ''
+        self.stderr.write(self.style.SUCCESS(f"Exported {exported} attempt(s) in {seconds:.2f}s{rate}."))
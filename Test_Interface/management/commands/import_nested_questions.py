@@ -1,6 +1,10 @@
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from Test_Interface.models import Branch, Subject, Test, Question
+from django.utils import timezone
+from Test_Interface.models import ImportCheckpoint
+from Test_Interface.question_import import (
+    IMPORT_BATCH_SIZE, IMPORT_CHUNK_SIZE, QuestionImporter, iter_nested_records, validate_records,
+)
+import hashlib
 import json
 import os
 
@@ -14,125 +18,133 @@ class Command(BaseCommand):
             action='store_true',
             help='Update existing questions if they already exist',
         )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='Delete questions of the imported tests that are no longer in the file',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be created, updated and deleted without writing anything',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Number of questions written per bulk query (default: {IMPORT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help=f'Number of questions committed per transaction (default: {IMPORT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue an interrupted import of the same file from its last checkpoint',
+        )
+        parser.add_argument(
+            '--validate-only',
+            action='store_true',
+            help='Only check the file and report every malformed record',
+        )
 
     def handle(self, *args, **options):
         json_file_path = options['json_file']
-        update_existing = options['update_existing']
+        verbosity = options['verbosity']
 
         if not os.path.exists(json_file_path):
             self.stderr.write(self.style.ERROR(f'File not found: {json_file_path}'))
             return
 
+        # Validation pre-pass: report every problem before anything is written
+        try:
+            with open(json_file_path, 'r', encoding='utf-8') as file:
+                problems = list(validate_records(iter_nested_records(file)))
+        except (OSError, UnicodeDecodeError) as e:
+            self.stderr.write(self.style.ERROR(f'Error reading file: {str(e)}'))
+            return
+        for problem in problems:
+            self.stderr.write(self.style.ERROR(problem))
+        if problems:
+            self.stderr.write(self.style.ERROR(f'{len(problems)} problem(s) found, nothing was imported.'))
+            return
+        if options['validate_only']:
+            self.stdout.write(self.style.SUCCESS('File is valid.'))
+            return
+
+        checkpoint = None
+        if not options['dry_run']:
+            checkpoint = self.get_checkpoint(json_file_path, options['resume'])
+            if checkpoint is None:
+                return
+
+        def log(message, level=1):
+            # Per-question lines only with -v 2; they dominate the run time on large files
+            if verbosity >= level:
+                self.stdout.write(message)
+
+        importer = QuestionImporter(
+            update_existing=options['update_existing'],
+            delete_missing=options['delete_missing'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+            log=log,
+            warn=lambda message: self.stderr.write(self.style.WARNING(message)),
+            diff=self.stdout.write,
+        )
         try:
             with open(json_file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-        except json.JSONDecodeError as e:
+                # Streamed: the file is never loaded whole
+                counts = importer.run(iter_nested_records(file), options['chunk_size'], checkpoint)
+        except (json.JSONDecodeError, ValueError) as e:
             self.stderr.write(self.style.ERROR(f'Invalid JSON file: {str(e)}'))
             return
-        except Exception as e:
+        except OSError as e:
             self.stderr.write(self.style.ERROR(f'Error reading file: {str(e)}'))
             return
 
-        self.import_data(data, update_existing)
-
-    @transaction.atomic
-    def import_data(self, data, update_existing):
-        total_questions = 0
-        updated_questions = 0
-        new_questions = 0
-
-        for branch_data in data:
-            branch_name = branch_data.get('name')
-            if not branch_name:
-                self.stderr.write(self.style.WARNING('Skipping branch with no name'))
-                continue
-
-            branch, _ = Branch.objects.get_or_create(
-                name=branch_name,
-                defaults={'description': branch_data.get('description', '')}
-            )
-            self.stdout.write(f'Processing branch: {branch.name}')
-
-            for subject_data in branch_data.get('subjects', []):
-                subject_name = subject_data.get('name')
-                if not subject_name:
-                    self.stderr.write(self.style.WARNING(f'Skipping subject with no name in branch {branch.name}'))
-                    continue
-
-                subject, _ = Subject.objects.get_or_create(
-                    name=subject_name,
-                    branch=branch,
-                    defaults={'description': subject_data.get('description', '')}
-                )
-                self.stdout.write(f'  Processing subject: {subject.name}')
-
-                for test_data in subject_data.get('tests', []):
-                    test_name = test_data.get('name')
-                    if not test_name:
-                        self.stderr.write(self.style.WARNING(f'Skipping test with no name in subject {subject.name}'))
-                        continue
-
-                    test, _ = Test.objects.get_or_create(
-                        name=test_name,
-                        subject=subject,
-                        defaults={
-                            'duration_minutes': test_data.get('duration_minutes', 60),
-                            'total_marks': test_data.get('total_marks', 100)
-                        }
-                    )
-                    self.stdout.write(f'    Processing test: {test.name}')
-
-                    for question_data in test_data.get('questions', []):
-                        total_questions += 1
-                        try:
-                            # Validate required fields
-                            required_fields = ['text', 'option1', 'option2', 'option3', 'option4', 'correct_option']
-                            if not all(question_data.get(field) for field in required_fields):
-                                self.stderr.write(
-                                    self.style.WARNING(f'Skipping question with missing required fields in test {test.name}')
-                                )
-                                continue
-
-                            # Try to find existing question
-                            existing_question = Question.objects.filter(
-                                test=test,
-                                text=question_data['text']
-                            ).first()
-
-                            if existing_question and not update_existing:
-                                self.stdout.write(f'      Skipping existing question: {question_data["text"][:50]}...')
-                                continue
-
-                            question_fields = {
-                                'text': question_data['text'],
-                                'option1': question_data['option1'],
-                                'option2': question_data['option2'],
-                                'option3': question_data['option3'],
-                                'option4': question_data['option4'],
-                                'correct_option': int(question_data['correct_option']),
-                                'solution': question_data.get('solution', '')
-                            }
-
-                            if existing_question and update_existing:
-                                for key, value in question_fields.items():
-                                    setattr(existing_question, key, value)
-                                existing_question.save()
-                                updated_questions += 1
-                                self.stdout.write(f'      Updated question: {question_data["text"][:50]}...')
-                            else:
-                                Question.objects.create(test=test, **question_fields)
-                                new_questions += 1
-                                self.stdout.write(f'      Created new question: {question_data["text"][:50]}...')
-
-                        except Exception as e:
-                            self.stderr.write(
-                                self.style.ERROR(f'Error processing question in test {test.name}: {str(e)}')
-                            )
-
         # Print summary
+        resumed = f'Resumed after question {importer.resume_from}\n' if importer.resume_from else ''
         self.stdout.write(self.style.SUCCESS(f'''
-Import completed:
-Total questions processed: {total_questions}
-New questions added: {new_questions}
-Questions updated: {updated_questions}
+{'Dry run completed, nothing was written' if options['dry_run'] else 'Import completed'}:
+{resumed}Total questions processed: {counts['processed']}
+New questions added: {counts['created']}
+Questions updated: {counts['updated']}
+Questions unchanged: {counts['unchanged']}
+Existing questions skipped: {counts['skipped']}
+Questions deleted: {counts['deleted']}
+Time taken: {importer.elapsed:.2f}s ({importer.questions_per_second:.0f} questions/sec)
         '''))
+
+    def get_checkpoint(self, json_file_path, resume):
+        """
+        Returns the checkpoint to import with: the stored one when resuming,
+        otherwise a checkpoint reset to the start of the file.
+        """
+        digest = hashlib.sha256()
+        with open(json_file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+
+        checkpoint, created = ImportCheckpoint.objects.get_or_create(
+            file_hash=digest.hexdigest(), defaults={'file_name': os.path.basename(json_file_path)}
+        )
+        if resume and not created:
+            if checkpoint.is_complete:
+                self.stdout.write(self.style.SUCCESS(f'Nothing to resume: {checkpoint.file_name} was already imported.'))
+                return None
+            self.stdout.write(f'Resuming {checkpoint.file_name} after question {checkpoint.position}')
+            return checkpoint
+        if resume:
+            self.stdout.write('No checkpoint found for this file, starting from the beginning.')
+
+        checkpoint.file_name = os.path.basename(json_file_path)
+        checkpoint.position = 0
+        checkpoint.counts = {}
+        checkpoint.is_complete = False
+        checkpoint.started_at = timezone.now()
+        checkpoint.save()
+        return checkpoint
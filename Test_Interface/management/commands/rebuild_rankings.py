@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from Test_Interface.rankings import rebuild_rankings, REBUILD_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Rebuild the best results and score buckets behind test rankings from finished sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--test',
+            type=int,
+            action='append',
+            dest='test_ids',
+            help='Only rebuild the rankings of this test id (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help='Number of result rows written per bulk insert',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_rankings(test_ids=options['test_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rankings from {written} best result(s).'))
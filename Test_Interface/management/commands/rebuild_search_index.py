@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from Test_Interface.search import create_search_index
+
+class Command(BaseCommand):
+    help = ('Recreate the question search index and refill it from the question table, '
+            'e.g. after a migration rebuilt the table on SQLite and dropped its triggers')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias (default: default)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic(using=options['database']):
+            create_search_index(connections[options['database']])
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt in {time.perf_counter() - start:.2f}s."))
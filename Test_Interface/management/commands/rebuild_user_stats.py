@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Test_Interface.user_stats import rebuild_user_stats, REBUILD_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user statistics rows (UserStats) from scratch using UserAttempt records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild the stats of this user id (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help='Number of stats rows written per bulk upsert',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+
+        with transaction.atomic():
+            written = rebuild_user_stats(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} user(s).'))
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from Test_Interface.uploads import claim_jobs, get_upload_backend, run_job
+
+class Command(BaseCommand):
+    help = 'Process queued profile picture uploads, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs that are currently due and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Number of jobs claimed per poll (default: 10)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds to wait when no job is due (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_upload_backend()
+        while True:
+            jobs = claim_jobs(options['batch_size'])
+            for job in jobs:
+                if run_job(job, backend):
+                    self.stdout.write(self.style.SUCCESS(f"Job {job.id}: uploaded {job.result_url}"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"Job {job.id}: {job.status} after attempt {job.attempts} ({job.last_error})"))
+
+            if options['once'] and not jobs:
+                break
+            if not jobs:
+                time.sleep(options['sleep'])
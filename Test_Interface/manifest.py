@@ -0,0 +1,85 @@
+# Test_Interface/manifest.py
+
+from array import array
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from .models import Question
+
+MANIFEST_TIMEOUT = 60 * 60 * 24  # Rebuilt on question save/delete anyway
+
+
+def manifest_key(test_id):
+    return f"test_manifest:{test_id}"
+
+
+def answer_key_key(test_id):
+    return f"test_answer_key:{test_id}"
+
+
+def get_question_ids(test_id):
+    """
+    Returns the ordered question IDs of a test as a compact array.
+    The array is cached and rebuilt only after a question of the test is
+    saved or deleted, so navigating by q_index never loads question rows.
+    """
+    key = manifest_key(test_id)
+    question_ids = cache.get(key)
+    if question_ids is None:
+        question_ids = array('q', Question.objects.filter(test_id=test_id).order_by('id').values_list('id', flat=True))
+        cache.set(key, question_ids, MANIFEST_TIMEOUT)
+    return question_ids
+
+
+def get_answer_key(test_id):
+    """
+    Returns a dict of question ID -> correct option for a test, cached and
+    invalidated together with the question-ID manifest.
+    """
+    key = answer_key_key(test_id)
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = dict(Question.objects.filter(test_id=test_id).values_list('id', 'correct_option'))
+        cache.set(key, answer_key, MANIFEST_TIMEOUT)
+    return answer_key
+
+
+aget_question_ids = sync_to_async(get_question_ids)
+
+
+def bundle_key(test_id, updated_at):
+    return f"test_bundle:{test_id}:{updated_at.timestamp()}"
+
+
+def get_test_bundle(test):
+    """
+    Returns every question of a test with its options as one serializable
+    payload, without correct options or solutions. Keyed on
+    ``test.updated_at`` so an edited test never serves a stale bundle.
+    """
+    key = bundle_key(test.id, test.updated_at)
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = {
+            'test': {
+                'id': test.id,
+                'name': test.name,
+                'subject': test.subject.name,
+                'duration_minutes': test.duration_minutes,
+                'total_marks': test.total_marks,
+            },
+            'questions': [
+                {'id': question_id, 'text': text, 'options': [option1, option2, option3, option4]}
+                for question_id, text, option1, option2, option3, option4 in Question.objects.filter(test_id=test.id)
+                .order_by('id')
+                .values_list('id', 'text', 'option1', 'option2', 'option3', 'option4')
+            ],
+        }
+        cache.set(key, bundle, MANIFEST_TIMEOUT)
+    return bundle
+
+
+def invalidate_question_ids(*test_ids):
+    keys = []
+    for test_id in test_ids:
+        keys += [manifest_key(test_id), answer_key_key(test_id)]
+    cache.delete_many(keys)
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def backfill_sessions(apps, schema_editor):
+    """
+    Groups the existing (one attempt per user and question) rows into one
+    session per user and test, with counters matching the attempts.
+    """
+    Test = apps.get_model('Test_Interface', 'Test')
+    TestSession = apps.get_model('Test_Interface', 'TestSession')
+    UserAttempt = apps.get_model('Test_Interface', 'UserAttempt')
+
+    question_totals = dict(
+        Test.objects.annotate(total=Count('questions')).values_list('id', 'total')
+    )
+    duration_minutes = dict(Test.objects.values_list('id', 'duration_minutes'))
+    groups = (
+        UserAttempt.objects.filter(session__isnull=True)
+        .values('user_id', 'question__test_id')
+        .annotate(
+            first_attempt=Min('attempted_at'),
+            last_attempt=Max('attempted_at'),
+            answered=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+            reviewed=Count('id', filter=Q(reviewed=True)),
+        )
+    )
+    for group in groups.iterator():
+        test_id = group['question__test_id']
+        total = question_totals.get(test_id, 0)
+        session = TestSession.objects.create(
+            user_id=group['user_id'],
+            test_id=test_id,
+            started_at=group['first_attempt'],
+            deadline=group['first_attempt'] + timedelta(minutes=duration_minutes[test_id]),
+            finished_at=group['last_attempt'] if group['answered'] >= total else None,
+            updated_at=group['last_attempt'],
+            total_questions=total,
+            answered=group['answered'],
+            correct=group['correct'],
+            reviewed=group['reviewed'],
+        )
+        UserAttempt.objects.filter(
+            user_id=group['user_id'], question__test_id=test_id, session__isnull=True
+        ).update(session=session)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0005_rename_year_userprofile_academic_year'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userattempt',
+            name='selected_option',
+            field=models.IntegerField(blank=True, choices=[(1, 'Option 1'), (2, 'Option 2'), (3, 'Option 3'), (4, 'Option 4')], null=True),
+        ),
+        migrations.CreateModel(
+            name='TestSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('deadline', models.DateTimeField(help_text='Time after which no more answers are accepted')),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Time of the latest answer')),
+                ('total_questions', models.PositiveIntegerField(default=0, help_text='Number of questions in the test when the session started')),
+                ('answered', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('reviewed', models.PositiveIntegerField(default=0)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='Test_Interface.test')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='userattempt',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='userattempt',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='Test_Interface.testsession'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userattempt',
+            unique_together={('session', 'question')},
+        ),
+        migrations.RunPython(backfill_sessions, migrations.RunPython.noop),
+    ]
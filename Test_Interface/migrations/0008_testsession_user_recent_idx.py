@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0007_userstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testsession',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='session_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0009_uploadjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='URLs of the resized profile picture, keyed by size in pixels.'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:49
+
+import hashlib
+import json
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_content_hashes(apps, schema_editor):
+    """
+    Hashes existing questions in batches. A frozen copy of
+    Question.hash_content, since historical models have no custom methods.
+    """
+    Question = apps.get_model('Test_Interface', 'Question')
+    fields = ['text', 'option1', 'option2', 'option3', 'option4', 'correct_option', 'solution']
+    batch = []
+    for question in Question.objects.only('id', *fields).order_by('id').iterator(chunk_size=BATCH_SIZE):
+        content = [getattr(question, field) for field in fields]
+        content[5] = int(content[5])
+        content[6] = content[6] or ''
+        question.content_hash = hashlib.sha256(json.dumps(content, ensure_ascii=False).encode('utf-8')).hexdigest()
+        batch.append(question)
+        if len(batch) >= BATCH_SIZE:
+            Question.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0010_userprofile_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the content fields, lets imports skip unchanged questions', max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def backfill_rankings(apps, schema_editor):
+    """Best finished score per (test, user), reached earliest, and the score buckets built from them."""
+    TestSession = apps.get_model('Test_Interface', 'TestSession')
+    TestResult = apps.get_model('Test_Interface', 'TestResult')
+    TestScoreBucket = apps.get_model('Test_Interface', 'TestScoreBucket')
+
+    rows = TestSession.objects.filter(finished_at__isnull=False, answered__gt=0) \
+        .order_by('test_id', 'user_id', '-correct', 'finished_at') \
+        .values_list('test_id', 'user_id', 'correct', 'id', 'finished_at')
+    batch = []
+    last = None
+    for test_id, user_id, correct, session_id, finished_at in rows.iterator(chunk_size=BATCH_SIZE):
+        if (test_id, user_id) == last:
+            continue
+        last = (test_id, user_id)
+        batch.append(TestResult(
+            test_id=test_id, user_id=user_id, score=correct, session_id=session_id, achieved_at=finished_at
+        ))
+        if len(batch) >= BATCH_SIZE:
+            TestResult.objects.bulk_create(batch)
+            batch = []
+    TestResult.objects.bulk_create(batch)
+
+    TestScoreBucket.objects.bulk_create([
+        TestScoreBucket(**row)
+        for row in TestResult.objects.values('test_id', 'score').annotate(takers=Count('id')).order_by()
+    ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0012_importcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(help_text="Correct answers in the user's best finished session")),
+                ('achieved_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Test_Interface.testsession')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='Test_Interface.test')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['test', '-score', 'achieved_at'], name='result_leaderboard_idx')],
+                'unique_together': {('test', 'user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TestScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField()),
+                ('takers', models.PositiveIntegerField(default=0)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='Test_Interface.test')),
+            ],
+            options={
+                'unique_together': {('test', 'score')},
+            },
+        ),
+        migrations.RunPython(backfill_rankings, migrations.RunPython.noop),
+    ]
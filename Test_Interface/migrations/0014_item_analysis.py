@@ -0,0 +1,63 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0013_test_rankings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemAnalysisRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_until', models.DateTimeField(help_text='Sessions finished up to this time are included')),
+                ('is_full', models.BooleanField(default=False, help_text='Recomputed from every finished session')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('answers', models.PositiveBigIntegerField(default=0)),
+                ('questions', models.PositiveIntegerField(default=0, help_text='Questions whose stats changed')),
+                ('seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('option1_count', models.PositiveIntegerField(default=0)),
+                ('option2_count', models.PositiveIntegerField(default=0)),
+                ('option3_count', models.PositiveIntegerField(default=0)),
+                ('option4_count', models.PositiveIntegerField(default=0)),
+                ('rest_sum', models.BigIntegerField(default=0)),
+                ('rest_squares', models.BigIntegerField(default=0)),
+                ('correct_rest_sum', models.BigIntegerField(default=0, help_text='Sum of rest scores of the correct answers')),
+                ('difficulty', models.FloatField(blank=True, help_text='Share of correct answers (p-value)', null=True)),
+                ('discrimination', models.FloatField(blank=True, help_text='Point-biserial correlation with the rest score', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Question stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='testsession',
+            index=models.Index(fields=['finished_at'], name='session_finished_idx'),
+        ),
+        migrations.AddField(
+            model_name='questionstats',
+            name='question',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_stats', to='Test_Interface.question'),
+        ),
+    ]
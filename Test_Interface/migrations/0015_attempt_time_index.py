@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0014_item_analysis'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['attempted_at', 'id'], name='attempt_time_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+
+BATCH_SIZE = 10000
+
+
+def backfill_attempt_tests(apps, schema_editor):
+    """
+    Copies question.test onto every attempt, one committed range of ids at
+    a time, so the table is never locked as a whole and an interrupted run
+    continues where it stopped.
+    """
+    Question = apps.get_model('Test_Interface', 'Question')
+    UserAttempt = apps.get_model('Test_Interface', 'UserAttempt')
+    missing = UserAttempt.objects.using(schema_editor.connection.alias).filter(test__isnull=True)
+    bounds = missing.aggregate(first=Min('id'), last=Max('id'))
+    if bounds['first'] is None:
+        return
+    question_test = Subquery(Question.objects.filter(pk=OuterRef('question_id')).values('test_id')[:1])
+    for start in range(bounds['first'], bounds['last'] + 1, BATCH_SIZE):
+        with transaction.atomic(using=schema_editor.connection.alias):
+            missing.filter(id__gte=start, id__lt=start + BATCH_SIZE).update(test_id=question_test)
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('Test_Interface', '0015_attempt_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userattempt',
+            name='test',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='Test_Interface.test'),
+        ),
+        migrations.RunPython(backfill_attempt_tests, migrations.RunPython.noop),
+    ]
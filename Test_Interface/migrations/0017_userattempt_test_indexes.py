@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0016_userattempt_test'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userattempt',
+            name='test',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='Test_Interface.test'),
+        ),
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['user', 'test'], name='attempt_user_test_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='attempt_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userattempt',
+            index=models.Index(fields=['test', 'is_correct'], name='attempt_test_correct_idx'),
+        ),
+    ]
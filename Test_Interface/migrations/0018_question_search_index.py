@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# The SQL as of this migration, frozen here: Test_Interface.search builds the same statements for
+# rebuild_search_index, but later edits to it must not change what this migration does.
+SQLITE_CREATE = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "Test_Interface_question_fts" USING fts5('
+    "text, option1, option2, option3, option4, solution, "
+    "content='Test_Interface_question', content_rowid='id', tokenize='porter unicode61')",
+
+    'CREATE TRIGGER IF NOT EXISTS question_fts_insert AFTER INSERT ON "Test_Interface_question" BEGIN '
+    'INSERT INTO "Test_Interface_question_fts"(rowid, text, option1, option2, option3, option4, solution) '
+    'VALUES (new.id, new.text, new.option1, new.option2, new.option3, new.option4, new.solution); END',
+
+    'CREATE TRIGGER IF NOT EXISTS question_fts_delete AFTER DELETE ON "Test_Interface_question" BEGIN '
+    'INSERT INTO "Test_Interface_question_fts"("Test_Interface_question_fts", rowid, text, option1, option2, option3, option4, solution) '
+    "VALUES ('delete', old.id, old.text, old.option1, old.option2, old.option3, old.option4, old.solution); END",
+
+    'CREATE TRIGGER IF NOT EXISTS question_fts_update AFTER UPDATE OF text, option1, option2, option3, option4, solution '
+    'ON "Test_Interface_question" BEGIN '
+    'INSERT INTO "Test_Interface_question_fts"("Test_Interface_question_fts", rowid, text, option1, option2, option3, option4, solution) '
+    "VALUES ('delete', old.id, old.text, old.option1, old.option2, old.option3, old.option4, old.solution); "
+    'INSERT INTO "Test_Interface_question_fts"(rowid, text, option1, option2, option3, option4, solution) '
+    'VALUES (new.id, new.text, new.option1, new.option2, new.option3, new.option4, new.solution); END',
+
+    """INSERT INTO "Test_Interface_question_fts"("Test_Interface_question_fts") VALUES ('rebuild')""",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS question_fts_insert',
+    'DROP TRIGGER IF EXISTS question_fts_delete',
+    'DROP TRIGGER IF EXISTS question_fts_update',
+    'DROP TABLE IF EXISTS "Test_Interface_question_fts"',
+]
+
+POSTGRESQL_CREATE = [
+    'ALTER TABLE "Test_Interface_question" ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ('
+    "setweight(to_tsvector('english', coalesce(text, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(option1, '') || ' ' || coalesce(option2, '') || ' ' || "
+    "coalesce(option3, '') || ' ' || coalesce(option4, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(solution, '')), 'C')) STORED",
+
+    'CREATE INDEX IF NOT EXISTS question_search_idx ON "Test_Interface_question" USING gin (search_vector)',
+]
+
+POSTGRESQL_DROP = [
+    'ALTER TABLE "Test_Interface_question" DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor in statements:
+            for statement in statements[vendor]:
+                schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0017_userattempt_test_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}),
+            run_statements({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0018_question_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='testsession',
+            name='session_finished_idx',
+        ),
+        migrations.AddIndex(
+            model_name='testsession',
+            index=models.Index(fields=['finished_at', 'deadline'], name='session_finished_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testsession',
+            index=models.Index(fields=['user', 'test', 'finished_at'], name='session_open_idx'),
+        ),
+    ]
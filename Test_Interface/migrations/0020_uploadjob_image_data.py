@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+def move_images_into_jobs(apps, schema_editor):
+    # Jobs still waiting for the worker carry their file along; it is deleted from MEDIA_ROOT once copied
+    UploadJob = apps.get_model('Test_Interface', 'UploadJob')
+    for job in UploadJob.objects.exclude(image='').iterator():
+        try:
+            with job.image.open('rb') as image_file:
+                job.image_data = image_file.read()
+        except OSError:
+            continue
+        job.image_name = job.image.name.rsplit('/', 1)[-1]
+        job.save(update_fields=['image_name', 'image_data'])
+        job.image.delete(save=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0019_session_deadline_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='image_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='uploadjob',
+            name='image_data',
+            field=models.BinaryField(blank=True, default=b'', help_text="Uploaded file, kept until the worker has shipped it"),
+        ),
+        migrations.RunPython(move_images_into_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='uploadjob',
+            name='image',
+        ),
+    ]
@@ -0,0 +1,23 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Attempts saved without a session since 0006 are grouped into sessions the same way 0006 did
+backfill_sessions = import_module('Test_Interface.migrations.0006_testsession').backfill_sessions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Test_Interface', '0020_uploadjob_image_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sessions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userattempt',
+            name='session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='Test_Interface.testsession'),
+        ),
+    ]
@@ -2,8 +2,11 @@
 
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+import hashlib
+import json
 
 class Branch(models.Model):
     """
@@ -66,6 +69,10 @@ class Question(models.Model):
         choices=[(1, 'Option 1'), (2, 'Option 2'), (3, 'Option 3'), (4, 'Option 4')]
     )
     solution = models.TextField(blank=True, null=True, help_text="Detailed explanation for the correct answer")
+    content_hash = models.CharField(max_length=64, blank=True, editable=False,
+                                    help_text="SHA-256 of the content fields, lets imports skip unchanged questions")
+
+    CONTENT_FIELDS = ['text', 'option1', 'option2', 'option3', 'option4', 'correct_option', 'solution']
 
     class Meta:
         ordering = ['id'] # Order questions by their creation order (default ID)
@@ -73,29 +80,233 @@ class Question(models.Model):
     def __str__(self):
         return f"Q{self.id}: {self.text[:50]}..." # Show first 50 chars of question text
 
+    @staticmethod
+    def hash_content(text, option1, option2, option3, option4, correct_option, solution):
+        """Stable hash of a question's content; a missing solution hashes like an empty one."""
+        content = [text, option1, option2, option3, option4, int(correct_option), solution or '']
+        return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def compute_content_hash(self):
+        return self.hash_content(**{field: getattr(self, field) for field in self.CONTENT_FIELDS})
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'content_hash'}
+        super().save(*args, **kwargs)
+
+class TestSession(models.Model):
+    """
+    One sitting of a test by a user. A user may take the same test many times;
+    each sitting gets its own session and its own set of UserAttempt rows.
+    The answered/correct/reviewed counters are kept in step with the attempts
+    (see Test_Interface/sessions.py) so scores never need to be recounted.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_sessions')
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='sessions')
+    started_at = models.DateTimeField(default=timezone.now)
+    deadline = models.DateTimeField(help_text="Time after which no more answers are accepted")
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(default=timezone.now, help_text="Time of the latest answer")
+    total_questions = models.PositiveIntegerField(default=0, help_text="Number of questions in the test when the session started")
+    answered = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    reviewed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            # Keyset pagination of a user's history by latest activity
+            models.Index(fields=['user', '-updated_at', '-id'], name='session_user_recent_idx'),
+            # Item analysis reads the sessions finished since its last run; expire_sessions
+            # reads the open ones (finished_at IS NULL) in deadline order
+            models.Index(fields=['finished_at', 'deadline'], name='session_finished_idx'),
+            # The user's open session of a test, looked up on every request of a sitting
+            models.Index(fields=['user', 'test', 'finished_at'], name='session_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.test.name} ({self.started_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def is_finished(self):
+        return self.finished_at is not None
+
+    @property
+    def is_expired(self):
+        return self.finished_at is None and timezone.now() >= self.deadline
+
+    @property
+    def is_completed(self):
+        return self.is_finished or (self.total_questions > 0 and self.answered >= self.total_questions)
+
+    @property
+    def score_percent(self):
+        return int((self.correct / self.total_questions) * 100) if self.total_questions else 0
+
 class UserAttempt(models.Model):
     """
-    Records a user's attempt for a specific question in a test.
+    Records a user's attempt for a specific question in a test session.
+    ``test`` is a copy of ``question.test`` so per-test queries need no join
+    to Question; it is filled in on save and kept in step when a question
+    moves to another test.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempts')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='attempts')
+    session = models.ForeignKey(TestSession, on_delete=models.CASCADE, related_name='attempts')
     reviewed = models.BooleanField(default=False)
     selected_option = models.IntegerField(
-        choices=[(1, 'Option 1'), (2, 'Option 2'), (3, 'Option 3'), (4, 'Option 4')]
+        choices=[(1, 'Option 1'), (2, 'Option 2'), (3, 'Option 3'), (4, 'Option 4')],
+        blank=True, null=True # Empty when the question is only marked for review
     )
     is_correct = models.BooleanField(default=False)
     attempted_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        # A user can only attempt a specific question once per test session.
-        # For a full test history, we'd need a 'TestSession' model.
-        # For simplicity here, we assume one attempt per question per test.
-        unique_together = ('user', 'question')
+        # A question can be attempted once per test session; a new session
+        # is started for every retake of the test.
+        unique_together = ('session', 'question')
         ordering = ['attempted_at']
+        indexes = [
+            # Admin changelist: newest first and date drill-down ranges
+            models.Index(fields=['attempted_at', 'id'], name='attempt_time_idx'),
+            # A user's attempts on one test, and distinct tests per user
+            models.Index(fields=['user', 'test'], name='attempt_user_test_idx'),
+            # A user's latest activity
+            models.Index(fields=['user', 'attempted_at'], name='attempt_user_time_idx'),
+            # Per-test answer statistics
+            models.Index(fields=['test', 'is_correct'], name='attempt_test_correct_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s attempt on Q{self.question.id} ({'Correct' if self.is_correct else 'Incorrect'})"
 
+    def save(self, *args, **kwargs):
+        if self.test_id is None and self.question_id is not None:
+            self.test_id = self.question.test_id
+        super().save(*args, **kwargs)
+
+class TestResult(models.Model):
+    """
+    A user's best finished score on a test, the row the leaderboard is
+    built from. Kept in step with TestScoreBucket by rankings.record_result.
+    """
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='results')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_results')
+    score = models.PositiveIntegerField(help_text="Correct answers in the user's best finished session")
+    session = models.ForeignKey(TestSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    achieved_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('test', 'user')
+        indexes = [
+            # Leaderboard: best scores first, earlier achievers first on ties
+            models.Index(fields=['test', '-score', 'achieved_at'], name='result_leaderboard_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.test.name}: {self.score}"
+
+class TestScoreBucket(models.Model):
+    """
+    Histogram of best scores per test: how many users have ``score`` as
+    their best result. Ranks and percentiles are read from these buckets.
+    """
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='score_buckets')
+    score = models.PositiveIntegerField()
+    takers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('test', 'score')
+
+    def __str__(self):
+        return f"{self.test.name}: {self.takers} with score {self.score}"
+
+class QuestionStats(models.Model):
+    """
+    Item analysis of a question over the answers given in finished
+    sessions. Only running sums are stored, so new sessions are folded in
+    without rereading old ones (see Test_Interface/item_analysis.py).
+    ``rest`` is the score of the sitting without this question.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='item_stats')
+    responses = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    option1_count = models.PositiveIntegerField(default=0)
+    option2_count = models.PositiveIntegerField(default=0)
+    option3_count = models.PositiveIntegerField(default=0)
+    option4_count = models.PositiveIntegerField(default=0)
+    rest_sum = models.BigIntegerField(default=0)
+    rest_squares = models.BigIntegerField(default=0)
+    correct_rest_sum = models.BigIntegerField(default=0, help_text="Sum of rest scores of the correct answers")
+    difficulty = models.FloatField(blank=True, null=True, help_text="Share of correct answers (p-value)")
+    discrimination = models.FloatField(blank=True, null=True, help_text="Point-biserial correlation with the rest score")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNT_FIELDS = ['responses', 'correct', 'option1_count', 'option2_count', 'option3_count', 'option4_count',
+                    'rest_sum', 'rest_squares', 'correct_rest_sum']
+
+    class Meta:
+        verbose_name_plural = "Question stats"
+
+    def __str__(self):
+        return f"Stats of Q{self.question_id}"
+
+    @property
+    def option_counts(self):
+        return [self.option1_count, self.option2_count, self.option3_count, self.option4_count]
+
+class ItemAnalysisRun(models.Model):
+    """
+    One run of analyze_items. The next incremental run picks up the sessions
+    finished after ``finished_until``.
+    """
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_until = models.DateTimeField(help_text="Sessions finished up to this time are included")
+    is_full = models.BooleanField(default=False, help_text="Recomputed from every finished session")
+    sessions = models.PositiveIntegerField(default=0)
+    answers = models.PositiveBigIntegerField(default=0)
+    questions = models.PositiveIntegerField(default=0, help_text="Questions whose stats changed")
+    seconds = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Item analysis of {self.started_at:%Y-%m-%d %H:%M} ({self.answers} answers)"
+
+class UserStats(models.Model):
+    """
+    Per-user activity totals, kept up to date on every answer write so the
+    profile page never has to aggregate the user's attempts. Can be rebuilt
+    from scratch with the rebuild_user_stats management command.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    mocks_attempted = models.PositiveIntegerField(default=0, help_text="Number of distinct tests attempted")
+    total_attempted = models.PositiveIntegerField(default=0)
+    total_correct = models.PositiveIntegerField(default=0)
+    reviewed_count = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "User stats"
+
+    def __str__(self):
+        return f"{self.user.username}'s Stats"
+
+    @property
+    def average_score(self):
+        if not self.total_attempted:
+            return 0
+        return round((self.total_correct / self.total_attempted) * 100, 2)
+
+    @property
+    def completion_percentage(self):
+        if not self.total_attempted:
+            return 0
+        return round((self.reviewed_count / self.total_attempted) * 100, 1)
+
 class UserProfile(models.Model):
     """
     Extends Django's built-in User model to store additional information,
@@ -107,6 +318,8 @@ class UserProfile(models.Model):
     # New field to store the URL of the externally hosted profile picture
     profile_picture_url = models.URLField(max_length=500, blank=True, null=True,
                                         help_text="URL of the user's profile picture hosted externally.")
+    profile_picture_variants = models.JSONField(default=dict, blank=True,
+                                                help_text="URLs of the resized profile picture, keyed by size in pixels.")
     academic_year = models.CharField(max_length=10, blank=True, null=True,
                             help_text="The academic year of the user (e.g., 2023-2024).")
     mobile_number = models.CharField(max_length=15, blank=True, null=True,
@@ -115,9 +328,110 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    @property
+    def avatar_url(self):
+        """The smallest resized profile picture, falling back to the original URL."""
+        if self.profile_picture_variants:
+            return self.profile_picture_variants[min(self.profile_picture_variants, key=int)]
+        return self.profile_picture_url
+
+class UploadJob(models.Model):
+    """
+    A profile-picture upload waiting for (or done by) the background worker,
+    see Test_Interface/uploads.py and the run_upload_worker command.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_jobs')
+    # Kept in the database, not MEDIA_ROOT, so a worker on another host can read it
+    image_name = models.CharField(max_length=255, blank=True)
+    image_data = models.BinaryField(blank=True, default=b'', help_text="Uploaded file, kept until the worker has shipped it")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Earliest time the worker may (re)try the job")
+    last_error = models.TextField(blank=True)
+    result_url = models.URLField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker polls for due pending jobs
+            models.Index(fields=['status', 'run_after'], name='uploadjob_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload #{self.id} for {self.user.username} ({self.status})"
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of a question import, keyed by the SHA-256 of the file, so an
+    interrupted import can continue with --resume. ``position`` counts the
+    question records of the file already committed.
+    """
+    file_hash = models.CharField(max_length=64, unique=True)
+    file_name = models.CharField(max_length=255)
+    position = models.PositiveBigIntegerField(default=0)
+    counts = models.JSONField(default=dict, blank=True, help_text="Running totals of the import summary")
+    is_complete = models.BooleanField(default=False)
+    started_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        state = 'complete' if self.is_complete else f"at question {self.position}"
+        return f"Import of {self.file_name} ({state})"
+
 # Signal to create or update UserProfile whenever a User is created/saved
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
     instance.profile.save() # Ensure profile is always saved/updated
+
+# Signal to remember the test a question belonged to before it is saved, so a move invalidates both tests
+@receiver(pre_save, sender=Question)
+def remember_previous_test(sender, instance, update_fields=None, **kwargs):
+    instance._previous_test_id = None
+    if not instance._state.adding and (update_fields is None or 'test' in update_fields):
+        instance._previous_test_id = Question.objects.filter(pk=instance.pk).values_list('test_id', flat=True).first()
+
+# Signal to drop the cached question-ID manifest of a test whenever one of its questions changes.
+# Test.updated_at is bumped too, since cached test bundles and their ETags are keyed on it.
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_test_manifest(sender, instance, **kwargs):
+    from .manifest import invalidate_question_ids
+    test_ids = {instance.test_id, getattr(instance, '_previous_test_id', None)} - {None}
+    Test.objects.filter(pk__in=test_ids).update(updated_at=timezone.now())
+    for test_id in test_ids:
+        invalidate_question_ids(test_id)
+
+# Signal to bump the catalog cache version whenever branch, subject, test or question data changes
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_catalog(sender, instance, **kwargs):
+    from .catalog import bump_catalog_version
+    bump_catalog_version()
+
+# Signal to move the denormalized UserAttempt.test along when a question is moved to another test
+@receiver(post_save, sender=Question)
+def sync_attempt_tests(sender, instance, created, **kwargs):
+    if not created:
+        UserAttempt.objects.filter(question=instance).exclude(test_id=instance.test_id).update(test_id=instance.test_id)
@@ -0,0 +1,54 @@
+# Test_Interface/pagination.py
+
+import json
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+EXACT_COUNT_LIMIT = 10_000  # Below this, COUNT(*) is cheap enough and exact
+
+
+def estimate_count(queryset):
+    """
+    The database's own row estimate for ``queryset``, without counting:
+    table statistics for an unfiltered queryset, or the planner's estimate
+    (Postgres EXPLAIN) for a filtered one. None when there is no estimate.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    filtered = bool(queryset.query.where)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            if not filtered:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] >= 0 else None # -1 until the table is first analysed
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        if connection.vendor == 'sqlite' and not filtered:
+            # sqlite_stat1 only exists once ANALYZE has run; each row starts with the table's row count
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large admin changelists: counts above
+    EXACT_COUNT_LIMIT come from estimate_count instead of a COUNT(*) over
+    the whole table, so they are approximate.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_LIMIT:
+            return self.object_list.count()
+        return estimate
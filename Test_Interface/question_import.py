@@ -0,0 +1,463 @@
+# Test_Interface/question_import.py
+
+import json
+import time
+from django.db import transaction
+from django.utils import timezone
+from .models import Branch, Subject, Test, Question
+
+READ_SIZE = 64 * 1024
+IMPORT_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 5000
+QUESTION_FIELDS = Question.CONTENT_FIELDS + ['content_hash']
+REQUIRED_FIELDS = ['text', 'option1', 'option2', 'option3', 'option4', 'correct_option']
+
+# Nesting of the import file: each level's objects hold a list of the next level under this key
+LEVELS = [('branch', 'subjects'), ('subject', 'tests'), ('test', 'questions'), ('question', None)]
+
+
+class JSONStreamReader:
+    """
+    Pulls JSON values out of a text file a buffer at a time. Containers can
+    be walked key by key, so only one leaf object needs to be in memory.
+    """
+    decoder = json.JSONDecoder()
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.file.read(READ_SIZE)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON file")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end < len(self.buffer) or self.eof or not self._fill():
+                self.pos = end
+                return value
+
+    def items(self):
+        """Yields the keys of an object; the caller must consume each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def elements(self):
+        """Yields once per array element; the caller must consume each value."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def iter_nested_records(file):
+    """
+    Streams an import file (Branch -> Subject -> Test -> Questions) and
+    yields ``(level, data)`` tuples, each parent before its children.
+    Parent data holds the object's scalar fields only. A parent whose
+    ``name`` comes after its child list is decoded whole instead.
+    """
+    reader = JSONStreamReader(file)
+    for _ in reader.elements():
+        yield from _iter_object(reader, 0)
+
+
+def _iter_object(reader, depth):
+    level, child_key = LEVELS[depth]
+    if child_key is None:
+        yield level, reader.value()
+        return
+
+    data = {}
+    entered = False
+    for key in reader.items():
+        if key == child_key and 'name' in data and reader.peek() == '[':
+            if not entered:
+                entered = True
+                yield level, data
+            for _ in reader.elements():
+                yield from _iter_object(reader, depth + 1)
+        else:
+            data[key] = reader.value()
+    if not entered:
+        children = data.pop(child_key, None) or []
+        yield level, data
+        for child in children:
+            yield from _iter_decoded(child, depth + 1)
+
+
+def _iter_decoded(data, depth):
+    level, child_key = LEVELS[depth]
+    if child_key is None or not isinstance(data, dict):
+        yield level, data
+        return
+    children = data.pop(child_key, None) or []
+    yield level, data
+    for child in children:
+        yield from _iter_decoded(child, depth + 1)
+
+
+class QuestionImporter:
+    """
+    Imports a nested question file with a fixed number of queries per test:
+    the test's existing questions are indexed by text once, and new or
+    changed questions are written with batched bulk inserts and upserts.
+    Questions whose content hash matches the file are not written at all.
+
+    With ``dry_run`` everything is rolled back and ``diff`` is called with
+    one line per question that would be created (+), updated (~) or
+    deleted (-). Otherwise the import is committed every ``chunk_size``
+    questions, and ``checkpoint`` (an ImportCheckpoint) records how far it
+    got; an import started from a checkpoint skips the questions before its
+    position.
+    """
+    def __init__(self, update_existing=False, delete_missing=False, dry_run=False, batch_size=IMPORT_BATCH_SIZE,
+                 log=None, warn=None, diff=None):
+        self.update_existing = update_existing
+        self.delete_missing = delete_missing
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.log = log or (lambda message, verbosity=1: None)
+        self.warn = warn or (lambda message: None)
+        self.diff = (diff if dry_run else None) or (lambda message: None)
+        self.counts = {'processed': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'deleted': 0}
+        self.elapsed = 0.0
+
+    @property
+    def questions_per_second(self):
+        return self.counts['processed'] / self.elapsed if self.elapsed else 0.0
+
+    def run(self, records, chunk_size=IMPORT_CHUNK_SIZE, checkpoint=None):
+        started = time.perf_counter()
+        self.branch = self.subject = self.test = None
+        self.index = {}
+        self.to_create = []
+        self.to_update = []
+        self.pending_update_ids = set()
+        self.existing_ids = set()
+        self.seen_ids = set()
+        self.touched_test_ids = set()
+        self.position = 0
+        self.saved_counts = {}
+        self.resume_from = checkpoint.position if checkpoint else 0
+        records = iter(records)
+        try:
+            if self.dry_run:
+                with transaction.atomic():
+                    self._run_chunk(records, None)
+                    self._finish_test()
+                    transaction.set_rollback(True)
+            else:
+                finished = False
+                while not finished:
+                    # Short transactions: a failure loses one chunk, and locks are not held for the whole file
+                    with transaction.atomic():
+                        finished = self._run_chunk(records, chunk_size)
+                        if finished:
+                            self._finish_test()
+                        else:
+                            self._flush()
+                        if checkpoint is not None:
+                            self._save_checkpoint(checkpoint, finished)
+                    self._invalidate_caches()
+                    self.log(f'Committed {self.position} questions')
+        finally:
+            self.elapsed = time.perf_counter() - started
+        return self.counts
+
+    def _run_chunk(self, records, chunk_size):
+        """Handles records until ``chunk_size`` more questions were imported; returns True at the end of the file."""
+        stop = max(self.position, self.resume_from) + chunk_size if chunk_size else None
+        for level, data in records:
+            if level == 'question' and self.position < self.resume_from:
+                self._skip_question(data)
+                continue
+            getattr(self, f"_on_{level}")(data)
+            if level == 'question' and stop is not None and self.position >= stop:
+                return False
+        return True
+
+    def _skip_question(self, data):
+        # Committed before the checkpoint; only remembered so --delete-missing keeps it
+        self.position += 1
+        existing = self.index.get(data.get('text')) if self.test is not None and isinstance(data, dict) else None
+        if existing is not None:
+            self.seen_ids.add(existing.pk)
+
+    def _save_checkpoint(self, checkpoint, finished):
+        for key, value in self.counts.items():
+            checkpoint.counts[key] = checkpoint.counts.get(key, 0) + value - self.saved_counts.get(key, 0)
+        self.saved_counts = dict(self.counts)
+        checkpoint.position = self.position
+        checkpoint.is_complete = finished
+        checkpoint.save(update_fields=['counts', 'position', 'is_complete', 'updated_at'])
+
+    def _on_branch(self, data):
+        self._finish_test()
+        self.subject = self.test = None
+        name = data.get('name')
+        if not name:
+            self.branch = None
+            self.warn('Skipping branch with no name')
+            return
+        self.branch, _ = Branch.objects.get_or_create(name=name, defaults={'description': data.get('description', '')})
+        self.log(f'Processing branch: {self.branch.name}')
+
+    def _on_subject(self, data):
+        self._finish_test()
+        self.test = None
+        if self.branch is None:
+            self.subject = None
+            return
+        name = data.get('name')
+        if not name:
+            self.subject = None
+            self.warn(f'Skipping subject with no name in branch {self.branch.name}')
+            return
+        self.subject, _ = Subject.objects.get_or_create(
+            name=name, branch=self.branch, defaults={'description': data.get('description', '')}
+        )
+        self.log(f'  Processing subject: {self.subject.name}')
+
+    def _on_test(self, data):
+        self._finish_test()
+        if self.subject is None:
+            self.test = None
+            return
+        name = data.get('name')
+        if not name:
+            self.test = None
+            self.warn(f'Skipping test with no name in subject {self.subject.name}')
+            return
+        self.test, _ = Test.objects.get_or_create(
+            name=name,
+            subject=self.subject,
+            defaults={
+                'duration_minutes': data.get('duration_minutes', 60),
+                'total_marks': data.get('total_marks', 100),
+            },
+        )
+        self.log(f'    Processing test: {self.test.name}')
+        # One query per test instead of one lookup per question; a dry run also needs the old content for its diff
+        questions = Question.objects.filter(test=self.test).order_by('-id')
+        if not self.dry_run:
+            questions = questions.only('id', 'test_id', 'text', 'content_hash')
+        self.index = {}
+        self.existing_ids = set()
+        self.seen_ids = set()
+        for question in questions:
+            self.index[question.text] = question
+            self.existing_ids.add(question.id)
+
+    def _on_question(self, data):
+        self.position += 1
+        if self.test is None:
+            return
+        self.counts['processed'] += 1
+        if not isinstance(data, dict) or not all(data.get(field) for field in REQUIRED_FIELDS):
+            self.warn(f'Skipping question with missing required fields in test {self.test.name}')
+            return
+        try:
+            fields = question_fields(data)
+        except (TypeError, ValueError) as e:
+            self.warn(f'Error processing question in test {self.test.name}: {str(e)}')
+            return
+
+        fields['content_hash'] = Question.hash_content(**fields)
+        existing = self.index.get(fields['text'])
+        if existing is None:
+            question = Question(test=self.test, **fields)
+            self.index[fields['text']] = question
+            self.to_create.append(question)
+            self.counts['created'] += 1
+            self.diff(f'+ [{self.test.name}] {fields["text"][:60]}')
+            self.log(f'      Created new question: {fields["text"][:50]}...', 2)
+        else:
+            if existing.pk is not None:
+                self.seen_ids.add(existing.pk)
+            if existing.content_hash == fields['content_hash']:
+                self.counts['unchanged'] += 1
+                self.log(f'      Unchanged question: {fields["text"][:50]}...', 2)
+                return
+            if not self.update_existing:
+                self.counts['skipped'] += 1
+                self.log(f'      Skipping existing question: {fields["text"][:50]}...', 2)
+                return
+            if self.dry_run:
+                changed = [field for field in Question.CONTENT_FIELDS if getattr(existing, field) != fields[field]]
+                self.diff(f'~ [{self.test.name}] {fields["text"][:60]} ({", ".join(changed)})')
+            for key, value in fields.items():
+                setattr(existing, key, value)
+            if existing.pk is not None and existing.pk not in self.pending_update_ids:
+                self.pending_update_ids.add(existing.pk)
+                self.to_update.append(existing)
+            self.counts['updated'] += 1
+            self.log(f'      Updated question: {fields["text"][:50]}...', 2)
+
+        if len(self.to_create) + len(self.to_update) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.to_create:
+            Question.objects.bulk_create(self.to_create, batch_size=self.batch_size)
+        if self.to_update:
+            # An upsert on the primary key; bulk_update's CASE expressions grow too slow with large batches
+            Question.objects.bulk_create(
+                self.to_update,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=QUESTION_FIELDS,
+            )
+        if self.to_create or self.to_update:
+            self.touched_test_ids.add(self.test.id)
+        self.to_create = []
+        self.to_update = []
+        self.pending_update_ids = set()
+
+    def _finish_test(self):
+        self._flush()
+        if self.test is None or not self.delete_missing:
+            return
+        missing = sorted(self.existing_ids - self.seen_ids)
+        if missing and self.dry_run:
+            for question in Question.objects.filter(id__in=missing).only('text'):
+                self.diff(f'- [{self.test.name}] {question.text[:60]}')
+        for start in range(0, len(missing), self.batch_size):
+            # Goes through the ORM delete so attempts on these questions cascade as usual
+            Question.objects.filter(id__in=missing[start:start + self.batch_size]).delete()
+        self.counts['deleted'] += len(missing)
+        if missing:
+            self.touched_test_ids.add(self.test.id)
+
+    def _invalidate_caches(self):
+        """Bulk writes skip the Question signals, so do their work once here."""
+        from .catalog import bump_catalog_version
+        from .manifest import invalidate_question_ids
+        if self.touched_test_ids:
+            Test.objects.filter(pk__in=self.touched_test_ids).update(updated_at=timezone.now())
+            invalidate_question_ids(*self.touched_test_ids)
+            bump_catalog_version()
+            self.touched_test_ids = set()
+
+
+def validate_records(records):
+    """
+    Checks every record of an import file without writing anything and
+    yields one message per problem. A file that is not valid JSON ends the
+    check with a final message, since nothing after the error can be read.
+    """
+    branch = subject = test = None
+    question_number = 0
+    try:
+        for level, data in records:
+            if level != 'question':
+                if not isinstance(data, dict):
+                    yield f"{_location(branch, subject, test)}: {level} is not an object"
+                    data = {}
+                name = data.get('name') or None
+                if level == 'branch':
+                    branch, subject, test = name or '?', None, None
+                elif level == 'subject':
+                    subject, test = name or '?', None
+                else:
+                    test, question_number = name or '?', 0
+                    for field in ('duration_minutes', 'total_marks'):
+                        if field in data and not _is_int(data[field]):
+                            yield f"{_location(branch, subject, test)}: {field} must be a whole number"
+                if name is None:
+                    yield f"{_location(branch, subject, test)}: {level} has no name"
+                continue
+
+            question_number += 1
+            where = f"{_location(branch, subject, test)}, question {question_number}"
+            for problem in _question_problems(data):
+                yield f"{where}: {problem}"
+    except ValueError as e:
+        yield f"Malformed JSON: {e}"
+
+
+def _question_problems(data):
+    if not isinstance(data, dict):
+        return ['not an object']
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    problems = [f"missing {', '.join(missing)}"] if missing else []
+    for field in ('text', 'option1', 'option2', 'option3', 'option4', 'solution'):
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            problems.append(f"{field} must be a string")
+        elif field.startswith('option') and value and len(value) > Question._meta.get_field(field).max_length:
+            problems.append(f"{field} is longer than {Question._meta.get_field(field).max_length} characters")
+    correct_option = data.get('correct_option')
+    if correct_option and (not _is_int(correct_option) or int(correct_option) not in (1, 2, 3, 4)):
+        problems.append("correct_option must be 1, 2, 3 or 4")
+    return problems
+
+
+def _is_int(value):
+    try:
+        return not isinstance(value, bool) and int(value) == float(value)
+    except (TypeError, ValueError):
+        return False
+
+
+def _location(branch, subject, test):
+    return ' > '.join(part for part in (branch, subject, test) if part) or 'top level'
+
+
+def question_fields(data):
+    return {
+        'text': data['text'],
+        'option1': data['option1'],
+        'option2': data['option2'],
+        'option3': data['option3'],
+        'option4': data['option4'],
+        'correct_option': int(data['correct_option']),
+        'solution': data.get('solution', ''),
+    }
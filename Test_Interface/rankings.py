@@ -0,0 +1,230 @@
+# Test_Interface/rankings.py
+
+from collections import Counter, defaultdict
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from .models import TestResult, TestScoreBucket, TestSession
+
+RANKING_TIMEOUT = 60 * 60 * 24  # Dropped on every result change anyway
+REBUILD_BATCH_SIZE = 1000
+
+
+class Ranking:
+    """
+    Score distribution of one test, built from its TestScoreBucket rows.
+    ``above[s]`` is the number of takers whose best score is higher than
+    ``s``, so rank and percentile lookups are O(1).
+    """
+    def __init__(self, buckets):
+        top = max(buckets, default=0)
+        self.counts = [0] * (top + 1)
+        for score, takers in buckets.items():
+            self.counts[score] = takers
+        self.above = [0] * (top + 1)
+        running = 0
+        for score in range(top, -1, -1):
+            self.above[score] = running
+            running += self.counts[score]
+        self.takers = running
+
+    def _above(self, score):
+        if score < 0:
+            return self.takers
+        return self.above[score] if score < len(self.above) else 0
+
+    def rank(self, score):
+        """Competition rank ("1224") a taker with ``score`` would have."""
+        return self._above(score) + 1
+
+    def percentile(self, score):
+        """Percentile rank of ``score``: takers below it plus half of those tied, in percent."""
+        if not self.takers:
+            return None
+        tied = self.counts[score] if 0 <= score < len(self.counts) else 0
+        below = self.takers - self._above(score) - tied
+        return round(100 * (below + tied / 2) / self.takers, 1)
+
+
+def ranking_key(test_id):
+    return f"test_ranking:{test_id}"
+
+
+def get_ranking(test_id):
+    """Returns the cached Ranking of a test, rebuilt from its buckets (one small query) after a change."""
+    key = ranking_key(test_id)
+    ranking = cache.get(key)
+    if ranking is None:
+        ranking = Ranking(dict(
+            TestScoreBucket.objects.filter(test_id=test_id, takers__gt=0).values_list('score', 'takers')
+        ))
+        cache.set(key, ranking, RANKING_TIMEOUT)
+    return ranking
+
+
+aget_ranking = sync_to_async(get_ranking)
+
+
+def get_user_rank(test_id, user_id):
+    """Returns ``(result, rank, percentile)`` for the user's best score, or None if they have no result."""
+    result = TestResult.objects.filter(test_id=test_id, user_id=user_id).first()
+    if result is None:
+        return None
+    ranking = get_ranking(test_id)
+    return result, ranking.rank(result.score), ranking.percentile(result.score)
+
+
+def get_leaderboard(test_id, limit):
+    """The ``limit`` best results of a test, each with its rank set, read from the leaderboard index."""
+    ranking = get_ranking(test_id)
+    results = list(
+        TestResult.objects.filter(test_id=test_id).select_related('user').only(
+            'score', 'achieved_at', 'user__username'
+        ).order_by('-score', 'achieved_at')[:limit]
+    )
+    for result in results:
+        result.rank = ranking.rank(result.score)
+    return results
+
+
+def _move_bucket(test_id, score, delta):
+    updated = TestScoreBucket.objects.filter(test_id=test_id, score=score).update(takers=F('takers') + delta)
+    if not updated:
+        TestScoreBucket.objects.get_or_create(test_id=test_id, score=score, defaults={'takers': 0})
+        TestScoreBucket.objects.filter(test_id=test_id, score=score).update(takers=F('takers') + delta)
+
+
+def record_result(session):
+    """
+    Folds a just-finished session into the user's best result and the
+    test's score buckets. Only a new best moves the buckets: one bucket down
+    and one up, whatever the number of takers.
+    """
+    with transaction.atomic():
+        result = TestResult.objects.select_for_update().filter(test_id=session.test_id, user_id=session.user_id).first()
+        if result is None:
+            TestResult.objects.create(
+                test_id=session.test_id, user_id=session.user_id, score=session.correct,
+                session=session, achieved_at=session.finished_at,
+            )
+        elif session.correct > result.score:
+            _move_bucket(session.test_id, result.score, -1)
+            result.score = session.correct
+            result.session = session
+            result.achieved_at = session.finished_at
+            result.save(update_fields=['score', 'session', 'achieved_at'])
+        else:
+            return
+        _move_bucket(session.test_id, session.correct, 1)
+        # Callers may hold an outer transaction; dropping the Ranking before it commits would let it be rebuilt stale
+        key = ranking_key(session.test_id)
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def record_results(sessions):
+    """
+    record_result for a batch of sessions finished together, e.g. by
+    expire_sessions: one read of the users' current results, bulk writes
+    of the new bests and a few grouped bucket updates.
+    """
+    best = {}
+    for session in sessions:
+        key = (session.test_id, session.user_id)
+        if key not in best or session.correct > best[key].correct:
+            best[key] = session
+    if not best:
+        return 0
+
+    with transaction.atomic():
+        test_ids = {test_id for test_id, _ in best}
+        current = {
+            (result.test_id, result.user_id): result
+            for result in TestResult.objects.select_for_update().filter(
+                test_id__in=test_ids, user_id__in={user_id for _, user_id in best}
+            )
+        }
+        created, improved = [], []
+        moves = Counter()
+        for key, session in best.items():
+            result = current.get(key)
+            if result is None:
+                created.append(TestResult(
+                    test_id=session.test_id, user_id=session.user_id, score=session.correct,
+                    session=session, achieved_at=session.finished_at,
+                ))
+            elif session.correct > result.score:
+                moves[(session.test_id, result.score)] -= 1
+                result.score = session.correct
+                result.session = session
+                result.achieved_at = session.finished_at
+                improved.append(result)
+            else:
+                continue
+            moves[(session.test_id, session.correct)] += 1
+        TestResult.objects.bulk_create(created, batch_size=REBUILD_BATCH_SIZE)
+        TestResult.objects.bulk_update(improved, ['score', 'session', 'achieved_at'], batch_size=REBUILD_BATCH_SIZE)
+
+        # Buckets move with one UPDATE per test and distinct delta, not one per bucket
+        moves = {key: delta for key, delta in moves.items() if delta}
+        TestScoreBucket.objects.bulk_create(
+            [TestScoreBucket(test_id=test_id, score=score, takers=0) for test_id, score in moves],
+            ignore_conflicts=True, batch_size=REBUILD_BATCH_SIZE,
+        )
+        scores = defaultdict(list)
+        for (test_id, score), delta in moves.items():
+            scores[(test_id, delta)].append(score)
+        for (test_id, delta), bucket_scores in scores.items():
+            TestScoreBucket.objects.filter(test_id=test_id, score__in=bucket_scores).update(takers=F('takers') + delta)
+        keys = [ranking_key(test_id) for test_id in test_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    return len(created) + len(improved)
+
+
+def rebuild_rankings(test_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recomputes best results and score buckets from finished sessions in one
+    ordered pass, limited to ``test_ids`` when given. Returns the number of
+    results written.
+    """
+    sessions = TestSession.objects.filter(finished_at__isnull=False, answered__gt=0)
+    results = TestResult.objects.all()
+    buckets = TestScoreBucket.objects.all()
+    if test_ids is not None:
+        sessions = sessions.filter(test_id__in=test_ids)
+        results = results.filter(test_id__in=test_ids)
+        buckets = buckets.filter(test_id__in=test_ids)
+
+    # The first row of each (test, user) is their best score, reached earliest
+    rows = sessions.order_by('test_id', 'user_id', '-correct', 'finished_at') \
+        .values_list('test_id', 'user_id', 'correct', 'id', 'finished_at')
+    written = 0
+    with transaction.atomic():
+        results.delete()
+        buckets.delete()
+        batch = []
+        last = None
+        for test_id, user_id, correct, session_id, finished_at in rows.iterator(chunk_size=batch_size):
+            if (test_id, user_id) == last:
+                continue
+            last = (test_id, user_id)
+            batch.append(TestResult(
+                test_id=test_id, user_id=user_id, score=correct, session_id=session_id, achieved_at=finished_at
+            ))
+            if len(batch) >= batch_size:
+                TestResult.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            TestResult.objects.bulk_create(batch)
+            written += len(batch)
+
+        TestScoreBucket.objects.bulk_create([
+            TestScoreBucket(**row)
+            for row in results.values('test_id', 'score').annotate(takers=Count('id')).order_by()
+        ], batch_size=batch_size)
+
+    if test_ids is None:
+        test_ids = TestScoreBucket.objects.values_list('test_id', flat=True).distinct()
+    cache.delete_many([ranking_key(test_id) for test_id in test_ids])
+    return written
@@ -0,0 +1,154 @@
+# Test_Interface/search.py
+
+import re
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from .models import Question, Subject, Test
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+RANKED_MATCHES = 20_000 # Scoring costs a few µs per match; broader queries only rank their newest matches
+
+# The index is maintained by the database itself (see migration 0018): a
+# generated tsvector column with a GIN index on Postgres, an external-content
+# FTS5 table kept current by triggers on SQLite. Either way bulk imports and
+# queryset updates are indexed too, not just Question.save().
+FTS_TABLE = 'Test_Interface_question_fts'
+FTS_COLUMNS = ['text', 'option1', 'option2', 'option3', 'option4', 'solution']
+FTS_WEIGHTS = '10.0, 4.0, 4.0, 4.0, 4.0, 1.0' # text, option1-4, solution, like the tsvector's A/B/C weights
+SEARCH_CONFIG = 'english'
+
+
+def match_expression(query):
+    """
+    ``query`` as an FTS5 MATCH expression: every word must occur, each one
+    quoted so user input never reaches the FTS5 query syntax. None if the
+    query has no words.
+    """
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{word}"' for word in words) or None
+
+
+def _match(vendor, query):
+    """
+    (FROM, WHERE, ORDER BY, id column, params) selecting the questions
+    matching ``query`` as ``q``, or None when nothing can match. The id
+    column is the one the index can range-scan.
+    """
+    table = Question._meta.db_table
+    if vendor == 'postgresql':
+        if not query.strip():
+            return None
+        return (f'"{table}" q, websearch_to_tsquery(\'{SEARCH_CONFIG}\', %s) query', 'q.search_vector @@ query',
+                'ts_rank_cd(q.search_vector, query) DESC', 'q.id', [query])
+    expression = match_expression(query)
+    if expression is None:
+        return None
+    return (f'"{FTS_TABLE}" JOIN "{table}" q ON q.id = "{FTS_TABLE}".rowid', f'"{FTS_TABLE}" MATCH %s',
+            f'bm25("{FTS_TABLE}", {FTS_WEIGHTS})', f'"{FTS_TABLE}".rowid', [expression])
+
+
+def search_questions(query, branch_id=None, subject_id=None, limit=SEARCH_LIMIT, using='default'):
+    """
+    Questions matching every word of ``query`` in their text, options or
+    solution, best match first, optionally limited to one branch or
+    subject. When more than RANKED_MATCHES questions match, only the
+    newest RANKED_MATCHES of them are ranked.
+    """
+    match = _match(connections[using].vendor, query)
+    if match is None:
+        return []
+    source, where, rank, id_column, params = match
+    # Filters as test id lists, so the planner keeps driving the search from the index
+    tests = f'SELECT t.id FROM "{Test._meta.db_table}" t'
+    if subject_id:
+        where += f' AND q.test_id IN ({tests} WHERE t.subject_id = %s)'
+        params.append(subject_id)
+    if branch_id:
+        where += f' AND q.test_id IN ({tests} JOIN "{Subject._meta.db_table}" s ON s.id = t.subject_id WHERE s.branch_id = %s)'
+        params.append(branch_id)
+    with connections[using].cursor() as cursor:
+        # Id of the RANKED_MATCHES-th newest match, found in id order without scoring anything
+        cursor.execute(f'SELECT {id_column} FROM {source} WHERE {where} ORDER BY {id_column} DESC LIMIT 1 OFFSET %s',
+                       params + [RANKED_MATCHES - 1])
+        cutoff = cursor.fetchone()
+        if cutoff:
+            where += f' AND {id_column} >= %s'
+            params.append(cutoff[0])
+        cursor.execute(f'SELECT q.id FROM {source} WHERE {where} ORDER BY {rank}, q.id LIMIT %s', params + [limit])
+        ids = [row[0] for row in cursor.fetchall()]
+    questions = Question.objects.using(using).select_related('test__subject').in_bulk(ids)
+    return [questions[pk] for pk in ids if pk in questions]
+
+
+def filter_matching(queryset, query):
+    """
+    ``queryset`` of questions narrowed to those matching ``query`` through
+    the index, unranked. Empty when the query has no words.
+    """
+    match = _match(connections[queryset.db].vendor, query)
+    if match is None:
+        return queryset.none()
+    source, where, _, _, params = match
+    return queryset.filter(id__in=RawSQL(f'SELECT q.id FROM {source} WHERE {where}', params))
+
+
+def _sqlite_index_sql(table):
+    columns = ', '.join(FTS_COLUMNS)
+    new = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    delete = f"INSERT INTO \"{FTS_TABLE}\"(\"{FTS_TABLE}\", rowid, {columns}) VALUES ('delete', old.id, {old});"
+    insert = f'INSERT INTO "{FTS_TABLE}"(rowid, {columns}) VALUES (new.id, {new});'
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5({columns}, '
+        f"content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS question_fts_insert AFTER INSERT ON "{table}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS question_fts_delete AFTER DELETE ON "{table}" BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS question_fts_update AFTER UPDATE OF {columns} ON "{table}" '
+        f'BEGIN {delete} {insert} END',
+        f"INSERT INTO \"{FTS_TABLE}\"(\"{FTS_TABLE}\") VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_index_sql(table):
+    def vector(columns, weight):
+        text = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+        return f"setweight(to_tsvector('{SEARCH_CONFIG}', {text}), '{weight}')"
+    return [
+        f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ('
+        f"{vector(['text'], 'A')} || {vector(FTS_COLUMNS[1:5], 'B')} || {vector(['solution'], 'C')}) STORED",
+        f'CREATE INDEX IF NOT EXISTS question_search_idx ON "{table}" USING gin (search_vector)',
+    ]
+
+
+def create_search_index(connection):
+    """
+    Creates the question search index on ``connection`` and fills it from
+    the existing questions; safe to run again. SQLite loses the triggers
+    whenever a migration rebuilds the question table, run
+    rebuild_search_index afterwards.
+    """
+    table = Question._meta.db_table
+    if connection.vendor == 'postgresql':
+        statements = _postgresql_index_sql(table)
+    elif connection.vendor == 'sqlite':
+        statements = _sqlite_index_sql(table)
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_search_index(connection):
+    table = Question._meta.db_table
+    if connection.vendor == 'postgresql':
+        statements = [f'ALTER TABLE "{table}" DROP COLUMN IF EXISTS search_vector']
+    elif connection.vendor == 'sqlite':
+        statements = [f'DROP TRIGGER IF EXISTS question_fts_{event}' for event in ('insert', 'delete', 'update')]
+        statements.append(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -0,0 +1,248 @@
+# Test_Interface/sessions.py
+
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import TestSession, UserAttempt
+from .manifest import get_question_ids
+from .user_stats import apply_answer_deltas
+from .rankings import record_result, record_results
+
+DEADLINE_GRACE = timedelta(seconds=5) # Answers sent just before the deadline may arrive a little after it
+EXPIRE_BATCH_SIZE = 1000
+
+
+class SessionClosed(Exception):
+    """The session is finished or past its deadline; it takes no more answers."""
+
+
+def _check_open(finished_at, deadline, now):
+    if finished_at is not None or now > deadline + DEADLINE_GRACE:
+        raise SessionClosed()
+
+
+def start_session(user, test):
+    """
+    Starts a fresh sitting of ``test`` for ``user``. Any sitting the user left
+    open for the same test is finished first, and ranked like expire_sessions
+    does, so there is one active session.
+    """
+    now = timezone.now()
+    total_questions = len(get_question_ids(test.id))
+    with transaction.atomic():
+        ids = list(TestSession.objects.select_for_update().filter(
+            user=user, test=test, finished_at__isnull=True,
+        ).values_list('id', flat=True))
+        if ids:
+            TestSession.objects.filter(id__in=ids, finished_at__isnull=True).update(finished_at=now)
+            record_results(TestSession.objects.filter(id__in=ids, finished_at=now, answered__gt=0).only(
+                'test_id', 'user_id', 'correct', 'finished_at'
+            ).order_by())
+        return TestSession.objects.create(
+            user=user,
+            test=test,
+            started_at=now,
+            deadline=now + timedelta(minutes=test.duration_minutes),
+            updated_at=now,
+            total_questions=total_questions,
+        )
+
+
+def get_open_session(user, test):
+    """Returns the unfinished session of ``user`` for ``test``, or None."""
+    return TestSession.objects.filter(user=user, test=test, finished_at__isnull=True).first()
+
+
+def get_active_session(user, test):
+    """
+    Returns the open session of ``user`` for ``test``, starting one if the
+    user reached a question without going through start_test.
+    """
+    return get_open_session(user, test) or start_session(user, test)
+
+
+def get_latest_session(user, test):
+    return TestSession.objects.filter(user=user, test=test).first()
+
+
+async def aget_active_session(user, test):
+    """Async get_active_session(); only starting a new session leaves the async ORM."""
+    session = await TestSession.objects.filter(user=user, test=test, finished_at__isnull=True).afirst()
+    return session or await sync_to_async(start_session)(user, test)
+
+
+async def aget_latest_session(user, test):
+    return await TestSession.objects.filter(user=user, test=test).afirst()
+
+
+def finish_session(session):
+    """
+    Marks ``session`` finished and, the first time only, folds its score
+    into the test's rankings. Expired sessions are finished the same way,
+    here or by expire_sessions, whichever comes first.
+    """
+    if session.finished_at is None:
+        session.finished_at = timezone.now()
+        # One transaction, so a finished session is never left out of the rankings
+        with transaction.atomic():
+            finished = TestSession.objects.filter(pk=session.pk, finished_at__isnull=True) \
+                .update(finished_at=session.finished_at)
+            if finished and session.answered:
+                record_result(session)
+    return session
+
+
+def record_answer(session, question, selected_option=None, reviewed=False):
+    """
+    Saves the user's answer to ``question`` within ``session`` and moves the
+    session counters by the difference to any previous answer, all in one
+    transaction. Returns the saved UserAttempt; raises SessionClosed once
+    the session is finished or past its deadline.
+    """
+    is_correct = (not reviewed) and selected_option == question.correct_option
+
+    with transaction.atomic():
+        # Lock the session row so concurrent answers cannot double count; the
+        # deadline is checked on the locked row so expire_sessions cannot interleave
+        previously_answered, finished_at, deadline = TestSession.objects.select_for_update().filter(pk=session.pk) \
+            .values_list('answered', 'finished_at', 'deadline').first()
+        _check_open(finished_at, deadline, timezone.now())
+        previous = UserAttempt.objects.filter(session=session, question=question).first()
+
+        if previous:
+            answered_delta = 0
+            correct_delta = int(is_correct) - int(previous.is_correct)
+            reviewed_delta = int(reviewed) - int(previous.reviewed)
+            previous.selected_option = selected_option
+            previous.is_correct = is_correct
+            previous.reviewed = reviewed
+            previous.save(update_fields=['selected_option', 'is_correct', 'reviewed'])
+            attempt = previous
+        else:
+            answered_delta = 1
+            correct_delta = int(is_correct)
+            reviewed_delta = int(reviewed)
+            attempt = UserAttempt.objects.create(
+                user_id=session.user_id,
+                question=question,
+                test_id=question.test_id,
+                session=session,
+                selected_option=selected_option,
+                is_correct=is_correct,
+                reviewed=reviewed,
+            )
+
+        now = timezone.now()
+        TestSession.objects.filter(pk=session.pk).update(
+            answered=F('answered') + answered_delta,
+            correct=F('correct') + correct_delta,
+            reviewed=F('reviewed') + reviewed_delta,
+            updated_at=now,
+        )
+        apply_answer_deltas(session, previously_answered, answered_delta, correct_delta, reviewed_delta, now)
+
+    session.answered += answered_delta
+    session.correct += correct_delta
+    session.reviewed += reviewed_delta
+    session.updated_at = now
+    return attempt
+
+
+# The async ORM has no transactions, so async views run these writes in a thread
+afinish_session = sync_to_async(finish_session)
+arecord_answer = sync_to_async(record_answer)
+
+
+def record_answers(session, answers, answer_key):
+    """
+    Saves a batch of answers within ``session`` with a single bulk upsert.
+
+    ``answers`` maps question IDs to the selected option (None marks the
+    question for review) and ``answer_key`` maps the same IDs to their
+    correct option. Counters move by the difference to earlier answers, in
+    the same transaction. Returns a dict of question ID -> is_correct;
+    raises SessionClosed like record_answer.
+    """
+    results = {
+        question_id: selected_option is not None and selected_option == answer_key[question_id]
+        for question_id, selected_option in answers.items()
+    }
+    if not results:
+        return results
+
+    with transaction.atomic():
+        previously_answered, finished_at, deadline = TestSession.objects.select_for_update().filter(pk=session.pk) \
+            .values_list('answered', 'finished_at', 'deadline').first()
+        _check_open(finished_at, deadline, timezone.now())
+        previous = {
+            question_id: (is_correct, reviewed)
+            for question_id, is_correct, reviewed in UserAttempt.objects.filter(
+                session=session, question_id__in=list(answers)
+            ).values_list('question_id', 'is_correct', 'reviewed')
+        }
+
+        answered_delta = correct_delta = reviewed_delta = 0
+        attempts = []
+        for question_id, selected_option in answers.items():
+            is_correct = results[question_id]
+            reviewed = selected_option is None
+            was_correct, was_reviewed = previous.get(question_id, (False, False))
+            answered_delta += question_id not in previous
+            correct_delta += int(is_correct) - int(was_correct)
+            reviewed_delta += int(reviewed) - int(was_reviewed)
+            attempts.append(UserAttempt(
+                user_id=session.user_id,
+                question_id=question_id,
+                test_id=session.test_id, # Callers only pass questions of the session's test
+                session=session,
+                selected_option=selected_option,
+                is_correct=is_correct,
+                reviewed=reviewed,
+            ))
+
+        UserAttempt.objects.bulk_create(
+            attempts,
+            update_conflicts=True,
+            unique_fields=['session', 'question'],
+            update_fields=['selected_option', 'is_correct', 'reviewed'],
+        )
+        now = timezone.now()
+        TestSession.objects.filter(pk=session.pk).update(
+            answered=F('answered') + answered_delta,
+            correct=F('correct') + correct_delta,
+            reviewed=F('reviewed') + reviewed_delta,
+            updated_at=now,
+        )
+        apply_answer_deltas(session, previously_answered, answered_delta, correct_delta, reviewed_delta, now)
+
+    session.answered += answered_delta
+    session.correct += correct_delta
+    session.reviewed += reviewed_delta
+    session.updated_at = now
+    return results
+
+
+def expire_sessions(batch_size=EXPIRE_BATCH_SIZE):
+    """
+    Finishes every open session past its deadline (plus DEADLINE_GRACE) and
+    folds the answered ones into the rankings, ``batch_size`` sessions per
+    transaction with one UPDATE each. Returns the number of sessions finished.
+    """
+    now = timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            # Oldest deadlines first, read in order from session_finished_idx; skip_locked lets several sweepers share the work
+            ids = list(TestSession.objects.select_for_update(skip_locked=True).filter(
+                finished_at__isnull=True, deadline__lt=now - DEADLINE_GRACE,
+            ).order_by('deadline').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return expired
+            # finished_at is the sweep time, not the deadline, so item analysis' watermark still picks these up
+            TestSession.objects.filter(id__in=ids, finished_at__isnull=True).update(finished_at=now)
+            record_results(TestSession.objects.filter(id__in=ids, finished_at=now, answered__gt=0).only(
+                'test_id', 'user_id', 'correct', 'finished_at'
+            ).order_by())
+        expired += len(ids)
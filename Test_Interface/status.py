@@ -0,0 +1,97 @@
+# Test_Interface/status.py
+
+import asyncio
+from django.db.models import Count, OuterRef, Subquery
+from .models import Question, Test, TestSession
+
+
+def get_test_statuses(user, tests):
+    """
+    Works out the attempt status of every test in ``tests`` for ``user``.
+
+    Uses two queries (question totals per test and the user's sessions for
+    those tests) no matter how many tests are passed in. The status of a
+    test is taken from its latest session's counters. Returns a dict keyed
+    by test id.
+    """
+    test_ids = [test.id for test in tests]
+    if not test_ids:
+        return {}
+    return build_statuses(test_ids, question_totals(test_ids), user_sessions(user, test_ids))
+
+
+async def aget_test_statuses(user, tests):
+    """Async get_test_statuses(); its two queries are independent and run together."""
+    test_ids = [test.id for test in tests]
+    if not test_ids:
+        return {}
+    totals, sessions = await asyncio.gather(
+        alist(question_totals(test_ids)), alist(user_sessions(user, test_ids))
+    )
+    return build_statuses(test_ids, totals, sessions)
+
+
+async def alist(queryset):
+    return [row async for row in queryset]
+
+
+def question_totals(test_ids):
+    return Question.objects.filter(test_id__in=test_ids).values('test_id').annotate(total=Count('id')) \
+        .values_list('test_id', 'total')
+
+
+def user_sessions(user, test_ids):
+    """
+    The latest session of ``user`` for each test, skipping sittings with no
+    answers yet. Only those rows are read: a subquery picks one session id
+    per test from session_open_idx instead of loading the whole history.
+    """
+    latest = TestSession.objects.filter(user=user, test_id=OuterRef('pk')) \
+        .exclude(answered=0, finished_at__isnull=True).order_by('-started_at').values('id')[:1]
+    return TestSession.objects.filter(
+        id__in=Test.objects.filter(id__in=test_ids).values(latest_id=Subquery(latest))
+    ).order_by().values('test_id', 'total_questions', 'answered', 'correct', 'finished_at')
+
+
+def build_statuses(test_ids, question_totals, sessions):
+    """Statuses keyed by test id from the rows of question_totals() and user_sessions()."""
+    question_totals = dict(question_totals)
+    latest_sessions = {session['test_id']: session for session in sessions}
+
+    statuses = {}
+    for test_id in test_ids:
+        session = latest_sessions.get(test_id)
+        if session:
+            finished = session['finished_at'] is not None
+            statuses[test_id] = build_status(
+                session['total_questions'], session['answered'], session['correct'], finished, is_open=not finished
+            )
+        else:
+            statuses[test_id] = build_status(question_totals.get(test_id, 0), 0, 0)
+    return statuses
+
+
+def build_status(total_questions, attempted, correct, finished=False, is_open=False):
+    """
+    Turns raw counters into the status dict the templates expect.
+    A test is "completed" once its session is finished or every question
+    has an attempt record; ``is_open`` marks a sitting that can be resumed.
+    """
+    has_attempted = attempted > 0 or finished
+    is_completed = finished or (has_attempted and attempted >= total_questions)
+
+    latest_score = None
+    if is_completed:
+        latest_score = f"{int((correct / total_questions) * 100)}%" if total_questions else "0%"
+    elif has_attempted:
+        latest_score = "In Progress"
+
+    return {
+        'has_attempted': has_attempted,
+        'is_completed': is_completed,
+        'latest_score': latest_score,
+        'total_questions': total_questions,
+        'attempted': attempted,
+        'correct': correct,
+        'is_open': is_open,
+    }
@@ -1,8 +1,17 @@
 # Test_Interface/templatetags/custom_filters.py
 from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from Test_Interface.catalog import catalog_key
 
 register = template.Library()
 
+QUESTION_CARD_TIMEOUT = 60 * 60 * 24
+
 @register.filter
 def get_option(question, index):
     """
@@ -15,4 +24,31 @@ def get_option(question, index):
         '3': question.option3,
         '4': question.option4,
     }
-    return options.get(str(index), '')
\ No newline at end of file
+    return options.get(str(index), '')
+
+@register.simple_tag
+def question_card_static(question, test, q_index, total):
+    """
+    Returns the parts of a question card that do not depend on the user
+    (header, escaped question text and options, submit URL, navigation) as
+    ready-made HTML. Cached per question position under the catalog version
+    and test.updated_at, which every question and test save bumps (the test
+    passed in may be a cached copy), so only the per-user feedback state is
+    rendered per request.
+    Usage: {% question_card_static question test q_index total as static %}
+    """
+    key = catalog_key(f"question_card:{question.id}:{q_index}:{total}:{test.updated_at.timestamp()}")
+    use_cache = getattr(settings, 'QUESTION_CARD_CACHE', True)
+    static = cache.get(key) if use_cache else None
+    if static is None:
+        context = {'test': test, 'q_index': q_index, 'total': total}
+        static = {
+            'header': mark_safe(render_to_string('Test_Interface/partials/question_card_header.html', context)),
+            'text': conditional_escape(question.text),
+            'options': [conditional_escape(get_option(question, index)) for index in '1234'],
+            'submit_url': reverse('question_partial', args=[test.id, q_index]),
+            'navigation': mark_safe(render_to_string('Test_Interface/partials/question_card_navigation.html', context)),
+        }
+        if use_cache:
+            cache.set(key, static, QUESTION_CARD_TIMEOUT)
+    return static
@@ -1,9 +1,54 @@
+import re
 from django import template
-from Test_Interface.models import Subject
+from django.core.cache import cache
+from django.template.backends.utils import csrf_input
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from Test_Interface.cache_stats import record
+from Test_Interface.catalog import catalog_key, get_branch_tree, CATALOG_TIMEOUT
 
 register = template.Library()
 
-@register.inclusion_tag('Test_Interface/sidebar_left.html')
-def show_sidebar():
-    subjects = Subject.objects.all()
-    return {'subjects': subjects}
+BADGE_SLOT = re.compile(r'<!--badge:(\d+)-->')
+
+
+@register.simple_tag(takes_context=True)
+def show_sidebar(context):
+    """
+    Renders the left sidebar for the user's branch. The skeleton holds no
+    per-user data, so it is cached per branch under the catalog version and
+    only re-rendered after subjects, tests or branches change; the csrf
+    token and the user's score badges are added to it on every render.
+    """
+    branch = context.get('current_branch')
+    key = catalog_key(f"sidebar:{branch.id if branch else 0}")
+    html = cache.get(key)
+    record('sidebar', hit=html is not None)
+    if html is None:
+        subjects_with_tests = []
+        if branch:
+            subjects_with_tests = [
+                {'subject': node['subject'], 'tests': [{'test': test} for test in node['tests']]}
+                for node in get_branch_tree(branch.id)
+            ]
+        html = render_to_string('Test_Interface/sidebar_left.html', {
+            'current_branch': branch,
+            'subjects_with_tests': subjects_with_tests,
+        })
+        cache.set(key, html, CATALOG_TIMEOUT)
+
+    # Pages that already computed the user's test statuses (the dashboard) pass them in subjects_with_tests
+    scores = {
+        test_status['test'].id: test_status['latest_score']
+        for subject_data in context.get('subjects_with_tests') or ()
+        for test_status in subject_data['tests']
+        if test_status.get('has_attempted')
+    }
+    html = BADGE_SLOT.sub(
+        lambda slot: format_html(' <span class="badge bg-success ms-2">{}</span>', scores[int(slot[1])])
+        if int(slot[1]) in scores else '',
+        html,
+    )
+    request = context.get('request')
+    return mark_safe((csrf_input(request) if request else '') + html)
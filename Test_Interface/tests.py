@@ -1,3 +1,1319 @@
-from django.test import TestCase
+from io import BytesIO, StringIO
+import csv
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (Branch, Subject, Test, Question, ImportCheckpoint, QuestionStats, TestSession, UploadJob, UserAttempt,
+                     UserProfile, UserStats)
+from .status import get_test_statuses
+from .user_stats import rebuild_user_stats
+from .templatetags.custom_filters import question_card_static
+from .cache_stats import get_stats
+from .catalog import get_branch, get_branches, get_branch_tree, get_test
+from .manifest import get_question_ids
+from .item_analysis import analyze_items
+from .pagination import EstimatedCountPaginator, estimate_count
+from .views import HISTORY_PAGE_SIZE
+from . import question_import
+from .question_import import QuestionImporter, iter_nested_records, validate_records
+from .rankings import get_ranking, get_user_rank, rebuild_rankings
+from .search import search_questions
+from .uploads import UploadError, claim_jobs, run_job
+from .sessions import (SessionClosed, expire_sessions, start_session, get_active_session, finish_session, record_answer,
+                       record_answers)
+
+
+def load_script(name):
+    """Loads a module of the standalone "Automated Script" folder by its path."""
+    spec = importlib.util.spec_from_file_location(name, settings.BASE_DIR / 'Automated Script' / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_test(subject, name, num_questions):
+    test = Test.objects.create(name=name, subject=subject)
+    for i in range(num_questions):
+        Question.objects.create(
+            test=test, text=f"{name} Q{i}", option1='a', option2='b', option3='c', option4='d', correct_option=1
+        )
+    return test
+
+
+class TestStatusEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        cls.branch = Branch.objects.create(name='CSE')
+        cls.user.profile.branch = cls.branch
+        cls.user.profile.save()
+        cls.subject = Subject.objects.create(name='DBMS', branch=cls.branch)
+
+    def attempt(self, question, option):
+        record_answer(get_active_session(self.user, question.test), question, option)
+
+    def test_statuses(self):
+        completed = make_test(self.subject, 'Completed', 2)
+        in_progress = make_test(self.subject, 'In Progress', 3)
+        untouched = make_test(self.subject, 'Untouched', 1)
+        q1, q2 = completed.questions.all()
+        self.attempt(q1, 1)
+        self.attempt(q2, 2)
+        self.attempt(in_progress.questions.first(), 1)
+
+        with self.assertNumQueries(2):
+            statuses = get_test_statuses(self.user, [completed, in_progress, untouched])
+
+        self.assertEqual(statuses[completed.id]['latest_score'], '50%')
+        self.assertTrue(statuses[completed.id]['is_completed'])
+        self.assertEqual(statuses[in_progress.id]['latest_score'], 'In Progress')
+        self.assertFalse(statuses[untouched.id]['has_attempted'])
+        self.assertIsNone(statuses[untouched.id]['latest_score'])
+
+    def test_status_follows_latest_answered_session(self):
+        test = make_test(self.subject, 'Retaken', 2)
+        q1, q2 = test.questions.all()
+        for option in (1, 2):
+            session = start_session(self.user, test)
+            record_answer(session, q1, option)
+            record_answer(session, q2, 1)
+            finish_session(session)
+        start_session(self.user, test) # Not answered yet, so the finished sitting still counts
+
+        status = get_test_statuses(self.user, [test])[test.id]
+        self.assertEqual((status['latest_score'], status['is_open']), ('50%', False))
+
+        self.attempt(q1, 1)
+        status = get_test_statuses(self.user, [test])[test.id]
+        self.assertEqual((status['latest_score'], status['is_open']), ('In Progress', True))
+
+    def test_dashboard_query_count_is_independent_of_test_count(self):
+        self.client.force_login(self.user)
+        make_test(self.subject, 'First', 2)
+
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+        for i in range(20):
+            self.attempt(make_test(self.subject, f"Extra {i}", 2).questions.first(), 1)
+
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+        self.assertEqual(len(few), len(many))
+
+
+class BranchSelectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        cls.branch = Branch.objects.create(name='CSE')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_user_without_branch_picks_one(self):
+        self.assertRedirects(self.client.get(reverse('dashboard')), reverse('branch_selection'))
+        response = self.client.get(reverse('branch_selection'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'CSE')
+
+        response = self.client.post(reverse('branch_selection'), {'branch': self.branch.id})
+        self.assertRedirects(response, reverse('dashboard'))
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.branch_id, self.branch.id)
+        self.assertRedirects(self.client.get(reverse('branch_selection')), reverse('dashboard'))
+
+    def test_invalid_branch_is_rejected(self):
+        response = self.client.post(reverse('branch_selection'), {'branch': self.branch.id + 100})
+        self.assertEqual(response.status_code, 200)
+        self.user.profile.refresh_from_db()
+        self.assertIsNone(self.user.profile.branch_id)
+
+
+class QuestionManifestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        cls.subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(cls.subject, 'Manifest', 3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_manifest_is_cached_and_invalidated(self):
+        ids = list(self.test.questions.values_list('id', flat=True))
+        self.assertEqual(list(get_question_ids(self.test.id)), ids)
+        with self.assertNumQueries(0):
+            get_question_ids(self.test.id)
+
+        self.test.questions.first().delete()
+        self.assertEqual(list(get_question_ids(self.test.id)), ids[1:])
+
+    def test_moving_a_question_invalidates_both_tests(self):
+        other = make_test(self.subject, 'Other', 1)
+        ids, other_ids = list(get_question_ids(self.test.id)), list(get_question_ids(other.id))
+        question = self.test.questions.first()
+        question.test = other
+        question.save()
+        self.assertEqual(list(get_question_ids(self.test.id)), ids[1:])
+        self.assertEqual(sorted(get_question_ids(other.id)), sorted(other_ids + [question.id]))
+
+    def test_partial_view_serves_question_by_index(self):
+        self.client.force_login(self.user)
+        last = self.test.questions.last()
+        response = self.client.get(reverse('question_partial', args=[self.test.id, 2]))
+        self.assertContains(response, last.text)
+        self.assertEqual(response.context['total'], 3)
+
+    def test_card_render_cache_keeps_user_state_out(self):
+        self.client.force_login(self.user)
+        url = reverse('question_partial', args=[self.test.id, 0])
+        first = self.test.questions.first()
+        self.client.get(url)
+        self.client.post(url, {'option': '2'})
+        response = self.client.get(url)
+        self.assertContains(response, 'selected-wrong')
+        self.assertContains(response, first.text)
+
+        first.text = 'Rewritten question'
+        first.save()
+        self.assertContains(self.client.get(url), 'Rewritten question')
+
+
+class TestSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(subject, 'Sessions', 2)
+        cls.user.profile.branch = branch
+        cls.user.profile.save()
+
+    def test_counters_follow_answer_changes(self):
+        session = start_session(self.user, self.test)
+        q1, q2 = self.test.questions.all()
+        record_answer(session, q1, 1)
+        record_answer(session, q1, 2)
+        record_answer(session, q2, reviewed=True)
+
+        session.refresh_from_db()
+        self.assertEqual((session.answered, session.correct, session.reviewed), (2, 0, 1))
+        self.assertEqual(session.total_questions, 2)
+        self.assertEqual(session.attempts.count(), 2)
+
+    def test_retake_creates_new_session(self):
+        q1 = self.test.questions.first()
+        first = start_session(self.user, self.test)
+        record_answer(first, q1, 1)
+        finish_session(first)
+        second = start_session(self.user, self.test)
+        record_answer(second, q1, 2)
+
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(UserAttempt.objects.filter(user=self.user, question=q1).count(), 2)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('display_test_result', args=[self.test.id]))
+        self.assertEqual(response.context['correct'], 0)
+        self.assertTrue(response.context['in_progress'])
+        second.refresh_from_db()
+        self.assertFalse(second.is_finished) # Looking at the result does not end the sitting
+
+        response = self.client.post(reverse('finish_test', args=[self.test.id]))
+        self.assertRedirects(response, f"{reverse('display_test_result', args=[self.test.id])}?session={second.id}")
+        second.refresh_from_db()
+        self.assertTrue(second.is_finished)
+
+    def test_start_test_resumes_an_open_sitting(self):
+        session = start_session(self.user, self.test)
+        record_answer(session, self.test.questions.first(), 1)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, reverse('test_attempt', args=[self.test.id]))
+        self.assertContains(response, f"{reverse('start_test', args=[self.test.id])}?restart=1")
+
+        response = self.client.get(reverse('start_test', args=[self.test.id]))
+        self.assertRedirects(response, reverse('test_attempt', args=[self.test.id]))
+        session.refresh_from_db()
+        self.assertFalse(session.is_finished)
+
+        self.client.get(reverse('start_test', args=[self.test.id]), {'restart': '1'})
+        session.refresh_from_db()
+        self.assertTrue(session.is_finished)
+        self.assertEqual(TestSession.objects.filter(user=self.user, test=self.test, finished_at__isnull=True).count(), 1)
+
+    def test_attempt_needs_a_session(self):
+        question = self.test.questions.first()
+        with self.assertRaises(IntegrityError):
+            UserAttempt.objects.create(user=self.user, question=question, test=self.test, selected_option=1)
+
+    def test_attempt_test_follows_its_question(self):
+        q1, q2 = self.test.questions.all()
+        session = start_session(self.user, self.test)
+        record_answer(session, q1, 1)
+        record_answers(session, {q2.id: 2}, {q2.id: 1})
+        self.assertEqual(UserAttempt.objects.filter(test=self.test).count(), 2)
+
+        other = make_test(self.test.subject, 'Other', 0)
+        q1.test = other
+        q1.save()
+        self.assertEqual(UserAttempt.objects.get(question=q1).test_id, other.id)
+        self.assertEqual(UserAttempt.objects.get(question=q2).test_id, self.test.id)
+
+
+class SessionDeadlineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(subject, 'Timed', 3)
+        cls.users = [User.objects.create_user(username=f'student{i}', password='pass') for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+
+    def expire(self, *sessions):
+        TestSession.objects.filter(pk__in=[session.pk for session in sessions]) \
+            .update(deadline=timezone.now() - timedelta(minutes=1))
+        for session in sessions:
+            session.refresh_from_db()
+
+    def test_answers_after_the_deadline_are_refused(self):
+        q1, q2, q3 = self.test.questions.all()
+        session = start_session(self.users[0], self.test)
+        record_answer(session, q1, 1)
+        self.expire(session)
+        with self.assertRaises(SessionClosed):
+            record_answer(session, q2, 1)
+
+        self.client.force_login(self.users[0])
+        response = self.client.post(reverse('submit_answers', args=[self.test.id]), {'answers': {q2.id: 1}},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        session.refresh_from_db()
+        self.assertTrue(session.is_finished)
+        self.assertEqual(session.answered, 1)
+
+        self.expire(start_session(self.users[0], self.test))
+        response = self.client.get(reverse('question_partial', args=[self.test.id, 0]), headers={'HX-Request': 'true'})
+        self.assertIn(reverse('display_test_result', args=[self.test.id]), response['HX-Redirect'])
+        self.assertFalse(TestSession.objects.filter(user=self.users[0], finished_at__isnull=True).exists())
+
+    def test_expire_sessions_finishes_in_batches_and_ranks(self):
+        questions = list(self.test.questions.all())
+        earlier = start_session(self.users[0], self.test)
+        record_answer(earlier, questions[0], 1)
+        finish_session(earlier) # A best of 1 that the expired sitting improves on
+        sessions = [start_session(user, self.test) for user in self.users]
+        for session, correct in zip(sessions, [3, 2, 2, 0, 1]):
+            for question in questions[:max(correct, 1)]:
+                record_answer(session, question, 1 if correct else 2)
+        self.expire(*sessions[:4])
+
+        before = timezone.now()
+        self.assertEqual(expire_sessions(batch_size=2), 4)
+        self.assertEqual(expire_sessions(), 0)
+        finished = TestSession.objects.filter(pk__in=[session.pk for session in sessions[:4]])
+        self.assertTrue(all(session.finished_at >= before for session in finished))
+        self.assertIsNone(TestSession.objects.get(pk=sessions[4].pk).finished_at)
+
+        self.assertEqual(get_user_rank(self.test.id, self.users[0].id)[1], 1)
+        self.assertEqual(get_ranking(self.test.id).takers, 4)
+        incremental = sorted(self.test.score_buckets.filter(takers__gt=0).values_list('score', 'takers'))
+        rebuild_rankings()
+        self.assertEqual(sorted(self.test.score_buckets.values_list('score', 'takers')), incremental)
+
+
+class AsyncViewTests(TestCase):
+    """Runs the async views through the ASGI handler, where lazy database access in the event loop would raise."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        cls.user.profile.branch = branch
+        cls.user.profile.save()
+        cls.test = make_test(Subject.objects.create(name='DBMS', branch=branch), 'Async', 2)
+        cls.questions = list(cls.test.questions.all())
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_sitting_from_question_to_result(self):
+        await self.async_client.aforce_login(self.user)
+        q1, q2 = self.questions
+        partial_url = reverse('question_partial', args=[self.test.id, 0])
+        self.assertContains(await self.async_client.get(partial_url), q1.text)
+        response = await self.async_client.post(partial_url, {'option': '1'})
+        self.assertTrue(response.context['is_correct'])
+
+        session = await TestSession.objects.aget(user=self.user, test=self.test)
+        response = await self.async_client.get(reverse('display_test_result', args=[self.test.id]))
+        self.assertTrue(response.context['in_progress'])
+
+        # Answering the last question leads to the summary, which does not finish the sitting
+        response = await self.async_client.post(reverse('question_view', args=[self.test.id, 1]), {'option': '2'})
+        self.assertRedirects(response, reverse('question_view', args=[self.test.id, 2]), fetch_redirect_response=False)
+        self.assertEqual((await self.async_client.get(response.url)).status_code, 200)
+        response = await self.async_client.get(reverse('question_partial', args=[self.test.id, 2]))
+        self.assertEqual((response.context['answered'], response.context['unanswered']), (2, 0))
+        self.assertContains(response, reverse('finish_test', args=[self.test.id]))
+        self.assertFalse((await TestSession.objects.aget(pk=session.pk)).is_finished)
+
+        response = await self.async_client.post(reverse('finish_test', args=[self.test.id]), headers={'HX-Request': 'true'})
+        result_url = f"{reverse('display_test_result', args=[self.test.id])}?session={session.id}"
+        self.assertEqual(response['HX-Redirect'], result_url)
+        response = await self.async_client.get(result_url)
+        self.assertEqual((response.context['total_attempted'], response.context['correct']), (2, 1))
+        self.assertFalse(response.context['in_progress'])
+
+    async def test_dashboard_lists_tests_and_changes_branch(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.context['subjects_with_tests'][0]['tests'][0]['test'], self.test)
+        self.assertContains(response, 'Async')
+
+        other = await Branch.objects.acreate(name='ECE')
+        response = await self.async_client.post(reverse('dashboard'), {'branch': other.id})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual((await UserProfile.objects.aget(user=self.user)).branch_id, other.id)
+
+
+class SubmitAnswersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(subject, 'Bulk', 3)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def post_answers(self, answers):
+        return self.client.post(
+            reverse('submit_answers', args=[self.test.id]), {'answers': answers}, content_type='application/json'
+        )
+
+    def test_batch_is_scored_and_counted(self):
+        q1, q2, q3 = self.test.questions.all()
+        response = self.post_answers({q1.id: 1, q2.id: 3, q3.id: None})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertTrue(results[str(q1.id)]['is_correct'])
+        self.assertFalse(results[str(q2.id)]['is_correct'])
+        self.assertTrue(results[str(q3.id)]['reviewed'])
+
+        # Re-sending an answer updates the attempt instead of adding one
+        self.post_answers({q2.id: 1})
+        session = get_active_session(self.user, self.test)
+        self.assertEqual((session.answered, session.correct, session.reviewed), (3, 2, 1))
+        self.assertEqual(session.attempts.count(), 3)
+
+    def test_rejects_foreign_questions_and_bad_options(self):
+        q1 = self.test.questions.first()
+        response = self.post_answers({q1.id: 7, 999999: 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {str(q1.id), '999999'})
+        self.assertFalse(UserAttempt.objects.exists())
+
+
+class TestBundleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(subject, 'Bundle', 2)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_bundle_hides_answers_and_supports_etag(self):
+        url = reverse('test_bundle', args=[self.test.id])
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['questions']), 2)
+        self.assertNotIn('correct_option', response.content.decode())
+        self.assertNotIn('solution', response.content.decode())
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Editing a question bumps Test.updated_at and therefore the ETag
+        question = self.test.questions.first()
+        question.text = 'Edited'
+        question.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['questions'][0]['text'], 'Edited')
+
+    def test_attempt_page_renders(self):
+        response = self.client.get(reverse('start_test', args=[self.test.id]), follow=True)
+        self.assertTemplateUsed(response, 'Test_Interface/test_attempt.html')
+        self.assertContains(response, reverse('test_bundle', args=[self.test.id]))
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.first = make_test(subject, 'First', 2)
+        cls.second = make_test(subject, 'Second', 2)
+
+    def stats_tuple(self):
+        stats = UserStats.objects.get(user=self.user)
+        return (stats.mocks_attempted, stats.total_attempted, stats.total_correct, stats.reviewed_count)
+
+    def test_incremental_stats_match_rebuild(self):
+        q1, q2 = self.first.questions.all()
+        session = start_session(self.user, self.first)
+        record_answer(session, q1, 1)
+        record_answer(session, q2, reviewed=True)
+        record_answers(start_session(self.user, self.second), {self.second.questions.first().id: 2}, {
+            self.second.questions.first().id: 1
+        })
+        # A retake of the first test is not a new mock
+        record_answer(start_session(self.user, self.first), q1, 1)
+
+        incremental = self.stats_tuple()
+        self.assertEqual(incremental, (2, 4, 2, 1))
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertEqual(self.stats_tuple(), incremental)
+
+    def test_rebuild_zeroes_users_without_attempts(self):
+        other = User.objects.create_user(username='other', password='pass')
+        for user in (self.user, other):
+            record_answer(start_session(user, self.first), self.first.questions.first(), 1)
+        UserAttempt.objects.filter(user=self.user).delete()
+
+        self.assertEqual(rebuild_user_stats(user_ids=[self.user.id]), 0)
+        self.assertEqual(self.stats_tuple(), (0, 0, 0, 0))
+        self.assertIsNone(UserStats.objects.get(user=self.user).last_activity)
+        self.assertEqual(UserStats.objects.get(user=other).total_attempted, 1)
+
+        UserAttempt.objects.filter(user=other).delete()
+        self.assertEqual(rebuild_user_stats(), 0)
+        self.assertEqual(UserStats.objects.get(user=other).total_attempted, 0)
+
+    def test_profile_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        session = start_session(self.user, self.first)
+        record_answer(session, self.first.questions.first(), 1)
+        self.client.get(reverse('user_dashboard')) # Warm the catalog cache
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('user_dashboard'))
+
+        for question in self.second.questions.all():
+            record_answer(start_session(self.user, self.second), question, 1)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('user_dashboard'))
+
+        self.assertEqual(len(few), len(many))
+
+
+class UserHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        for i in range(HISTORY_PAGE_SIZE + 5):
+            test = make_test(subject, f"History {i}", 1)
+            record_answer(start_session(cls.user, test), test.questions.first(), 1)
+
+    def test_keyset_pages_cover_history_once(self):
+        self.client.force_login(self.user)
+        first = self.client.get(reverse('user_history'))
+        self.assertEqual(len(first.context['history_data']), HISTORY_PAGE_SIZE)
+        cursor = first.context['next_cursor']
+        self.assertTrue(cursor)
+
+        second = self.client.get(reverse('user_history'), {'cursor': cursor}, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(second, 'Test_Interface/partials/history_rows.html')
+        self.assertIsNone(second.context['next_cursor'])
+
+        seen = [row['session_id'] for row in first.context['history_data'] + second.context['history_data']]
+        self.assertEqual(len(set(seen)), HISTORY_PAGE_SIZE + 5)
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        cls.branch = Branch.objects.create(name='CSE')
+        cls.user.profile.branch = cls.branch
+        cls.user.profile.save()
+        cls.subject = Subject.objects.create(name='DBMS', branch=cls.branch)
+        make_test(cls.subject, 'Catalog', 1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_catalog_reads_run_no_queries(self):
+        get_branches()
+        get_branch_tree(self.branch.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_branch(self.branch.id), self.branch)
+            self.assertEqual(len(get_branch_tree(self.branch.id)[0]['tests']), 1)
+
+    def test_saves_invalidate_exactly(self):
+        get_branch_tree(self.branch.id)
+        Test.objects.create(name='Added', subject=self.subject)
+        self.assertEqual(len(get_branch_tree(self.branch.id)[0]['tests']), 2)
+
+        Branch.objects.create(name='ENTC')
+        self.assertEqual([branch.name for branch in get_branches()], ['CSE', 'ENTC'])
+
+    def test_question_card_follows_edits_through_a_cached_test(self):
+        test = get_test(Test.objects.get(name='Catalog').id)
+        question = test.questions.get()
+        self.assertEqual(question_card_static(question, test, 1, 1)['text'], 'Catalog Q0')
+
+        # The cached test copy keeps its old updated_at; the catalog version still moves on
+        question.text = 'Edited <b>'
+        question.save()
+        self.assertEqual(question_card_static(question, test, 1, 1)['text'], 'Edited &lt;b&gt;')
+
+    def test_warm_dashboard_runs_no_catalog_queries(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('dashboard'))
+        catalog_tables = ('"Test_Interface_branch"', '"Test_Interface_subject"', '"Test_Interface_test"')
+        self.assertFalse([q['sql'] for q in queries if q['sql'].split(' FROM ')[1].startswith(catalog_tables)])
+
+
+class SidebarCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        cls.branch = Branch.objects.create(name='CSE')
+        cls.user.profile.branch = cls.branch
+        cls.user.profile.save()
+        cls.subject = Subject.objects.create(name='DBMS', branch=cls.branch)
+        make_test(cls.subject, 'Sidebar', 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_sidebar_is_cached_until_catalog_changes(self):
+        self.assertContains(self.client.get(reverse('user_history')), 'Sidebar')
+        self.assertContains(self.client.get(reverse('user_history')), 'Sidebar')
+        self.assertEqual(get_stats('sidebar'), {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+        Test.objects.create(name='Freshly added', subject=self.subject)
+        self.assertContains(self.client.get(reverse('user_history')), 'Freshly added')
+        self.assertEqual(get_stats('sidebar')['misses'], 2)
+
+    def test_score_badges_are_rendered_per_user(self):
+        other = User.objects.create_user(username='other', password='pass')
+        other.profile.branch = self.branch
+        other.profile.save()
+        test = Test.objects.get(name='Sidebar')
+        record_answer(get_active_session(self.user, test), test.questions.first(), 1)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, '<span class="badge bg-success ms-2">100%</span>', html=True)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+        self.client.force_login(other)
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotContains(response, 'badge bg-success ms-2')
+        self.assertEqual(get_stats('sidebar'), {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+
+
+class FailingBackend:
+    def upload(self, file, name):
+        raise UploadError("service unavailable")
+
+
+class UploadJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, PROFILE_UPLOAD_BACKEND='Test_Interface.uploads.LocalStubBackend'
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.client.force_login(self.user)
+
+    def upload(self, content=None):
+        if content is None:
+            # A landscape photo whose EXIF orientation says "rotate 90 degrees"
+            buffer = BytesIO()
+            exif = Image.Exif()
+            exif[0x0112] = 6
+            Image.new('RGB', (1600, 1200), 'red').save(buffer, format='JPEG', exif=exif)
+            content = buffer.getvalue()
+        image = SimpleUploadedFile('me.jpg', content, content_type='image/jpeg')
+        return self.client.post(reverse('user_dashboard'), {'profile_picture_upload': image})
+
+    def test_upload_is_queued_and_processed_by_worker(self):
+        self.assertRedirects(self.upload(), reverse('user_dashboard'))
+        job = UploadJob.objects.get(user=self.user)
+        self.assertEqual(job.status, UploadJob.STATUS_PENDING)
+        self.assertEqual(os.listdir(self.media_root), []) # Queued in the database, where any worker host can read it
+
+        status_url = reverse('upload_status', args=[job.id])
+        self.assertEqual(self.client.get(status_url).json(), {'status': 'pending', 'url': None})
+
+        call_command('run_upload_worker', '--once', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, UploadJob.STATUS_DONE)
+        profile = self.user.profile
+        profile.refresh_from_db()
+        self.assertEqual(profile.avatar_url, job.result_url)
+        self.assertEqual(self.client.get(status_url).json()['status'], 'done')
+
+        # Oriented upright, scaled into each bounding box and re-encoded
+        for size, url in profile.profile_picture_variants.items():
+            with Image.open(self.media_root + url.removeprefix('/media')) as variant:
+                self.assertEqual(variant.format, 'WEBP')
+                self.assertEqual(variant.size, (int(size) * 3 // 4, int(size)))
+        self.assertEqual(bytes(job.image_data), b'')
+
+    def test_invalid_image_fails_without_retry(self):
+        self.upload(b'not an image')
+        call_command('run_upload_worker', '--once', stdout=StringIO())
+        job = UploadJob.objects.get(user=self.user)
+        self.assertEqual(job.status, UploadJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_failed_upload_backs_off_then_gives_up(self):
+        self.upload()
+        job = UploadJob.objects.get(user=self.user)
+        UploadJob.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        [job] = claim_jobs(10)
+        self.assertFalse(run_job(job, FailingBackend()))
+        self.assertEqual(job.status, UploadJob.STATUS_PENDING)
+        self.assertGreater(job.run_after, job.updated_at)
+        self.assertEqual(claim_jobs(10), []) # Not due yet
+
+        UploadJob.objects.filter(pk=job.pk).update(run_after=job.updated_at)
+        [job] = claim_jobs(10)
+        run_job(job, FailingBackend())
+        self.assertEqual(job.status, UploadJob.STATUS_FAILED)
+        self.assertEqual(job.last_error, 'service unavailable')
+
+
+IMPORT_DATA = [{
+    'name': 'CSE',
+    'subjects': [{
+        'name': 'DBMS',
+        'tests': [{
+            'name': 'Normalization',
+            'duration_minutes': 30,
+            'questions': [
+                {'text': f"Q{i}", 'option1': 'a', 'option2': 'b', 'option3': 'c', 'option4': 'd',
+                 'correct_option': 1 + i % 4, 'solution': 'because'}
+                for i in range(5)
+            ],
+        }],
+    }],
+}]
+
+
+class QuestionImportTests(TestCase):
+    def write_file(self, data):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump(data, file, indent=2)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def import_file(self, data, *args, path=None):
+        out = StringIO()
+        call_command('import_nested_questions', path or self.write_file(data), *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_stream_matches_full_parse_across_buffer_boundaries(self):
+        # The test name comes after its questions, so that test is decoded whole
+        data = IMPORT_DATA + [{'subjects': [{'tests': [{'questions': [{'text': 'late', 'n': 12345}], 'name': 'T'}],
+                                            'name': 'S'}], 'name': 'B'}]
+        text = json.dumps(data, indent=1)
+        with mock.patch.object(question_import, 'READ_SIZE', 7):
+            records = list(iter_nested_records(StringIO(text)))
+
+        self.assertEqual([level for level, _ in records[:3]], ['branch', 'subject', 'test'])
+        self.assertEqual(records[2][1], {'name': 'Normalization', 'duration_minutes': 30})
+        self.assertEqual([record for level, record in records if level == 'question'],
+                         IMPORT_DATA[0]['subjects'][0]['tests'][0]['questions'] + [{'text': 'late', 'n': 12345}])
+        self.assertEqual(records[-2], ('test', {'name': 'T'}))
+
+    def test_import_creates_then_updates_in_bulk(self):
+        output = self.import_file(IMPORT_DATA)
+        self.assertIn('New questions added: 5', output)
+        self.assertIn('questions/sec', output)
+        test = Test.objects.get(name='Normalization')
+        self.assertEqual(list(get_question_ids(test.id)), list(test.questions.values_list('id', flat=True)))
+
+        IMPORT_DATA[0]['subjects'][0]['tests'][0]['questions'][0]['solution'] = 'changed'
+        self.addCleanup(IMPORT_DATA[0]['subjects'][0]['tests'][0]['questions'][0].update, solution='because')
+        output = self.import_file(IMPORT_DATA)
+        self.assertIn('Questions unchanged: 4', output)
+        self.assertIn('Existing questions skipped: 1', output)
+        with self.assertNumQueries(11): # Checkpoint, branch, subject, test, question index, one upsert and updated_at
+            output = self.import_file(IMPORT_DATA, '--update-existing')
+        self.assertIn('Questions updated: 1', output)
+        self.assertEqual(test.questions.count(), 5)
+        question = test.questions.get(text='Q0')
+        self.assertEqual(question.solution, 'changed')
+        self.assertEqual(question.content_hash, question.compute_content_hash())
+
+    def test_resync_of_unchanged_file_writes_nothing(self):
+        self.import_file(IMPORT_DATA)
+        with self.assertNumQueries(9): # Checkpoint, branch, subject, test, question index and savepoints only
+            output = self.import_file(IMPORT_DATA, '--update-existing')
+        self.assertIn('Questions unchanged: 5', output)
+
+    def test_dry_run_diff_with_deletions(self):
+        self.import_file(IMPORT_DATA)
+        data = json.loads(json.dumps(IMPORT_DATA))
+        questions = data[0]['subjects'][0]['tests'][0]['questions']
+        questions[1]['correct_option'] = 4
+        del questions[2]
+        questions.append(dict(questions[0], text='Brand new'))
+
+        output = self.import_file(data, '--update-existing', '--delete-missing', '--dry-run')
+        self.assertIn('+ [Normalization] Brand new', output)
+        self.assertIn('~ [Normalization] Q1 (correct_option)', output)
+        self.assertIn('- [Normalization] Q2', output)
+        self.assertIn('Questions deleted: 1', output)
+        self.assertEqual(sorted(Question.objects.values_list('text', flat=True)), ['Q0', 'Q1', 'Q2', 'Q3', 'Q4'])
+
+        self.import_file(data, '--update-existing', '--delete-missing')
+        self.assertEqual(sorted(Question.objects.values_list('text', flat=True)), ['Brand new', 'Q0', 'Q1', 'Q3', 'Q4'])
+
+    def test_validation_reports_every_problem_before_writing(self):
+        data = json.loads(json.dumps(IMPORT_DATA))
+        questions = data[0]['subjects'][0]['tests'][0]['questions']
+        questions[0]['correct_option'] = 7
+        questions[3]['option2'] = 'x' * 501
+        questions.append({'text': 'Missing options', 'correct_option': 1})
+        data[0]['subjects'].append({'tests': [{'name': 'Orphan', 'questions': []}]})
+
+        err = StringIO()
+        call_command('import_nested_questions', self.write_file(data), stdout=StringIO(), stderr=err)
+        errors = err.getvalue()
+        self.assertIn('CSE > DBMS > Normalization, question 1: correct_option must be 1, 2, 3 or 4', errors)
+        self.assertIn('question 4: option2 is longer than 500 characters', errors)
+        self.assertIn('question 6: missing option1, option2, option3, option4', errors)
+        self.assertIn('CSE > ?: subject has no name', errors)
+        self.assertIn('4 problem(s) found', errors)
+        self.assertFalse(Branch.objects.exists())
+
+    def test_resume_continues_after_last_committed_chunk(self):
+        path = self.write_file(IMPORT_DATA)
+        save_checkpoint = QuestionImporter._save_checkpoint
+
+        def crash_on_second_chunk(importer, checkpoint, finished):
+            if importer.position > 2:
+                raise RuntimeError('connection lost')
+            save_checkpoint(importer, checkpoint, finished)
+
+        with mock.patch.object(QuestionImporter, '_save_checkpoint', crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                self.import_file(None, '--chunk-size', '2', path=path)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.position, checkpoint.is_complete), (2, False))
+        self.assertEqual(Question.objects.count(), 2) # The failed chunk was rolled back
+
+        output = self.import_file(None, '--chunk-size', '2', '--resume', '--delete-missing', path=path)
+        self.assertIn('Resumed after question 2', output)
+        self.assertIn('New questions added: 3', output)
+        self.assertIn('Questions deleted: 0', output)
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.position, checkpoint.is_complete, checkpoint.counts['created']), (5, True, 5))
+        self.assertIn('Nothing to resume', self.import_file(None, '--resume', path=path))
+
+
+def authoring_row(branch, subject, test, text, correct_option=1, **extra):
+    return {'branch': branch, 'subject': subject, 'test': test, 'text': text, 'option1': 'a', 'option2': 'b',
+            'option3': 'c', 'option4': 'd', 'correct_option': correct_option, 'solution': f"why {text}", **extra}
+
+
+class AuthoringScriptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authoring = load_script('authoring')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.skipped = []
+
+    def write_jsonl(self, lines):
+        path = os.path.join(self.directory, 'rows.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines((line if isinstance(line, str) else json.dumps(line, ensure_ascii=False)) + '\n'
+                            for line in lines)
+        return path
+
+    def convert(self, input_path, **options):
+        output_path = os.path.join(self.directory, 'nested.json')
+        counts = self.authoring.convert(input_path, output_path, on_skip=lambda *skip: self.skipped.append(skip),
+                                        **options)
+        with open(output_path, encoding='utf-8') as file:
+            self.assertEqual(list(validate_records(iter_nested_records(file))), [])
+        with open(output_path, encoding='utf-8') as file:
+            return counts, json.load(file)
+
+    def outline(self, data):
+        return [(branch['name'], subject['name'], test['name'], [question['text'] for question in test['questions']])
+                for branch in data for subject in branch['subjects'] for test in subject['tests']]
+
+    def test_unsorted_rows_are_grouped_by_first_appearance(self):
+        rows = [authoring_row('CSE', 'DBMS', 'T1', 'q1'), authoring_row('ECE', 'Signals', 'T1', 'q2'),
+                authoring_row('CSE', 'OS', 'T1', 'q3'), authoring_row('CSE', 'DBMS', 'T2', 'q4', duration_minutes=45),
+                authoring_row('CSE', 'DBMS', 'T1', 'q5', correct_option='4')]
+        counts, data = self.convert(self.write_jsonl(rows))
+
+        self.assertEqual(counts, {'branches': 2, 'subjects': 3, 'tests': 4, 'questions': 5})
+        self.assertEqual(self.outline(data), [('CSE', 'DBMS', 'T1', ['q1', 'q5']), ('CSE', 'DBMS', 'T2', ['q4']),
+                                              ('CSE', 'OS', 'T1', ['q3']), ('ECE', 'Signals', 'T1', ['q2'])])
+        self.assertEqual(data[0]['subjects'][0]['tests'][1]['duration_minutes'], 45)
+        self.assertEqual(data[0]['subjects'][0]['tests'][0]['questions'][1],
+                         {'text': 'q5', 'option1': 'a', 'option2': 'b', 'option3': 'c', 'option4': 'd',
+                          'correct_option': 4, 'solution': 'why q5'})
+        self.assertEqual(self.skipped, [])
+
+    def test_presorted_csv_streams_to_the_same_file(self):
+        rows = [authoring_row('CSE', 'DBMS', 'T1', f"q{i}") for i in range(3)] + [authoring_row('CSE', 'OS', 'T1', 'q3')]
+        path = os.path.join(self.directory, 'rows.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        counts, data = self.convert(path, presorted=True)
+        self.assertEqual(counts, {'branches': 1, 'subjects': 2, 'tests': 2, 'questions': 4})
+        self.assertEqual(self.outline(data), [('CSE', 'DBMS', 'T1', ['q0', 'q1', 'q2']), ('CSE', 'OS', 'T1', ['q3'])])
+        self.assertEqual(self.convert(path), (counts, data))
+
+    def test_empty_input_writes_an_empty_list(self):
+        path = self.write_jsonl([])
+        for presorted in (False, True):
+            counts, data = self.convert(path, presorted=presorted)
+            self.assertEqual(counts, {'branches': 0, 'subjects': 0, 'tests': 0, 'questions': 0})
+            self.assertEqual(data, [])
+
+    def test_bad_rows_are_reported_and_left_out(self):
+        path = self.write_jsonl([authoring_row('CSE', 'DBMS', 'T1', 'kept'), '{not json', authoring_row('CSE', 'DBMS', 'T1', ''),
+                                 authoring_row('CSE', 'DBMS', 'T1', 'bad', correct_option=5), '["a list"]'])
+        for presorted in (False, True):
+            self.skipped = []
+            counts, data = self.convert(path, presorted=presorted)
+            self.assertEqual(counts['questions'], 1)
+            self.assertEqual(self.outline(data), [('CSE', 'DBMS', 'T1', ['kept'])])
+            self.assertEqual(self.skipped, [(2, 'not a JSON object'), (3, 'missing text'),
+                                            (4, 'correct_option must be 1, 2, 3 or 4'), (5, 'not a JSON object')])
+
+    def test_non_ascii_text_round_trips(self):
+        rows = [authoring_row('विज्ञान', 'Física', 'Прогон 1', 'ऊर्जा का मात्रक क्या है? “é” ✓', branch_description='शाखा'),
+                authoring_row('विज्ञान', 'Física', 'Прогон 1', '日本語の質問')]
+        path = self.write_jsonl(rows)
+        for presorted in (False, True):
+            counts, data = self.convert(path, presorted=presorted)
+            self.assertEqual(self.outline(data), [('विज्ञान', 'Física', 'Прогон 1', [rows[0]['text'], rows[1]['text']])])
+            self.assertEqual(data[0]['description'], 'शाखा')
+
+
+class GenerationScriptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.generation = load_script('generation')
+
+        class CountingBackend(cls.generation.StubBackend):
+            """Fails the first ``failures[prompt]`` calls for a prompt, then answers like the stub."""
+
+            def __init__(self, failures=None, retryable=True, delays=None):
+                self.failures, self.retryable, self.delays = dict(failures or {}), retryable, delays or {}
+                self.calls = []
+
+            def generate(self, prompt):
+                self.calls.append(prompt)
+                if self.failures.get(prompt, 0):
+                    self.failures[prompt] -= 1
+                    raise cls.generation.GenerationError(f"{prompt} failed", retryable=self.retryable)
+                threading.Event().wait(self.delays.get(prompt, 0)) # time.sleep is patched out for the backoff
+                return super().generate(prompt)
+
+        cls.Backend = CountingBackend
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache = self.generation.ResponseCache(os.path.join(directory, 'cache.sqlite3'))
+        self.addCleanup(self.cache.close)
+        patcher = mock.patch.object(self.generation.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_until_the_backend_answers(self):
+        backend = self.Backend(failures={'p': 2})
+        self.assertEqual(self.generation.generate_with_retry(backend, 'p', retries=2, base_delay=1.0), '[stub] p')
+        self.assertEqual(backend.calls, ['p', 'p', 'p'])
+        delays = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(0.5 <= delays[0] <= 1.0 and 1.0 <= delays[1] <= 2.0)
+
+    def test_gives_up_after_the_last_retry(self):
+        backend = self.Backend(failures={'p': 5})
+        with self.assertRaisesMessage(self.generation.GenerationError, 'p failed'):
+            self.generation.generate_with_retry(backend, 'p', retries=2)
+        self.assertEqual(len(backend.calls), 3)
+
+        backend = self.Backend(failures={'p': 5}, retryable=False)
+        with self.assertRaises(self.generation.GenerationError):
+            self.generation.generate_with_retry(backend, 'p', retries=2)
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertIsNone(self.cache.get(backend, 'p'))
+
+    def test_cache_hit_skips_the_backend(self):
+        backend = self.Backend()
+        self.assertEqual(self.generation.generate(backend, self.cache, 'p'), '[stub] p')
+        self.assertEqual(self.generation.generate(backend, self.cache, 'p'), '[stub] p')
+        self.assertEqual(backend.calls, ['p'])
+
+        self.generation.generate(backend, self.cache, 'p', refresh=True)
+        self.assertEqual(backend.calls, ['p', 'p'])
+
+        backend.calls = []
+        responses, errors = self.generation.generate_many(backend, self.cache, ['p', 'q'])
+        self.assertEqual(backend.calls, ['q'])
+        self.assertEqual((responses, errors), ({'p': '[stub] p', 'q': '[stub] q'}, {}))
+
+    def test_generate_many_keeps_the_prompt_order(self):
+        # Earlier prompts finish later, one is cached, one fails and one is repeated
+        prompts = ['slow', 'cached', 'broken', 'medium', 'fast', 'slow']
+        backend = self.Backend(failures={'broken': 5}, delays={'slow': 0.2, 'medium': 0.1})
+        self.cache.set(backend, 'cached', 'from cache')
+        results = []
+
+        responses, errors = self.generation.generate_many(
+            backend, self.cache, prompts, concurrency=4, retries=1, on_result=lambda *result: results.append(result)
+        )
+        self.assertEqual(list(responses.items()), [('slow', '[stub] slow'), ('cached', 'from cache'),
+                                                   ('medium', '[stub] medium'), ('fast', '[stub] fast')])
+        self.assertEqual(errors, {'broken': 'broken failed'})
+        self.assertEqual(sorted(backend.calls), ['broken', 'broken', 'fast', 'medium', 'slow'])
+        self.assertEqual(results[0], ('cached', 'from cache', True))
+        self.assertEqual([prompt for prompt, _, _ in results[1:]], ['fast', 'medium', 'slow'])
+        self.assertEqual(self.cache.get(backend, 'slow'), '[stub] slow')
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(subject, 'Ranked', 4)
+        cls.users = [User.objects.create_user(username=f'student{i}', password='pass') for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def finish(self, user, correct):
+        session = start_session(user, self.test)
+        for question in list(self.test.questions.all())[:4]:
+            record_answer(session, question, 1 if correct > 0 else 2)
+            correct -= 1
+        with self.captureOnCommitCallbacks(execute=True): # The cached Ranking is dropped once the result commits
+            return finish_session(session)
+
+    def test_rank_and_percentile_follow_best_scores(self):
+        for user, score in zip(self.users, [4, 2, 2, 1]):
+            self.finish(user, score)
+        ranking = get_ranking(self.test.id)
+        self.assertEqual([ranking.rank(score) for score in (4, 3, 2, 1, 0)], [1, 2, 2, 4, 5])
+        self.assertEqual((ranking.percentile(4), ranking.percentile(2), ranking.percentile(1)), (87.5, 50.0, 12.5))
+
+        self.finish(self.users[3], 0) # A worse retake changes nothing
+        self.assertEqual(get_user_rank(self.test.id, self.users[3].id)[1:], (4, 12.5))
+        self.finish(self.users[3], 3)
+        self.assertEqual(get_user_rank(self.test.id, self.users[3].id)[1:], (2, 62.5))
+
+        incremental = sorted(self.test.score_buckets.filter(takers__gt=0).values_list('score', 'takers'))
+        rebuild_rankings()
+        self.assertEqual(sorted(self.test.score_buckets.values_list('score', 'takers')), incremental)
+
+    def test_restart_ranks_the_sitting_it_closes(self):
+        session = start_session(self.users[0], self.test)
+        record_answer(session, self.test.questions.first(), 1)
+        start_session(self.users[0], self.test)
+        self.assertEqual(get_user_rank(self.test.id, self.users[0].id)[0].score, 1)
+        self.assertEqual(get_ranking(self.test.id).takers, 1)
+
+    def test_result_and_leaderboard_pages(self):
+        self.finish(self.users[0], 3)
+        self.client.force_login(self.users[1])
+        session = start_session(self.users[1], self.test)
+        record_answer(session, self.test.questions.first(), 1)
+        self.assertIsNone(self.client.get(reverse('display_test_result', args=[self.test.id])).context['rank'])
+
+        self.client.post(reverse('finish_test', args=[self.test.id]))
+        response = self.client.get(reverse('display_test_result', args=[self.test.id]))
+        self.assertEqual((response.context['rank'], response.context['takers']), (2, 2))
+        self.client.get(reverse('display_test_result', args=[self.test.id])) # Viewing again does not count twice
+        self.assertEqual(get_ranking(self.test.id).takers, 2)
+
+        response = self.client.get(reverse('leaderboard', args=[self.test.id]), {'top': 1})
+        self.assertEqual([(r.rank, r.user.username) for r in response.context['results']], [(1, 'student0')])
+        self.assertEqual(response.context['own_rank'], 2)
+
+
+class ItemAnalysisTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.test = make_test(subject, 'Analysed', 3)
+        cls.questions = list(cls.test.questions.all())
+        cls.users = [User.objects.create_user(username=f'student{i}', password='pass') for i in range(5)]
+
+    def sit(self, user, options):
+        session = start_session(user, self.test)
+        for question, option in zip(self.questions, options):
+            record_answer(session, question, option)
+        finish_session(session)
+
+    def stats(self):
+        return {
+            row.question_id: (row.responses, row.correct, row.option_counts, row.difficulty, row.discrimination)
+            for row in QuestionStats.objects.all()
+        }
+
+    def test_incremental_runs_match_full_recompute(self):
+        # Option 1 is correct everywhere; the first question separates strong from weak takers
+        for user, options in zip(self.users[:3], [(1, 1, 1), (1, 1, 2), (2, 2, 1)]):
+            self.sit(user, options)
+        first = analyze_items(until=timezone.now())
+        self.assertEqual((first.is_full, first.sessions, first.answers, first.questions), (True, 3, 9, 3))
+
+        for user, options in zip(self.users[3:], [(1, 1, 2), (3, 1, 4)]):
+            self.sit(user, options)
+        second = analyze_items(until=timezone.now())
+        self.assertEqual((second.is_full, second.sessions, second.answers), (False, 2, 6))
+        self.assertEqual(analyze_items(until=timezone.now()).answers, 0)
+
+        incremental = self.stats()
+        analyze_items(full=True, until=timezone.now())
+        self.assertEqual(self.stats(), incremental)
+
+        responses, correct, option_counts, difficulty, discrimination = incremental[self.questions[0].id]
+        self.assertEqual((responses, correct, option_counts, difficulty), (5, 3, [3, 1, 1, 0], 0.6))
+        # Rest scores 2, 1, 1 for the correct answers and 1, 1 for the wrong ones
+        self.assertAlmostEqual(discrimination, 0.4082, places=4)
+
+    def test_admin_report_filters(self):
+        for user, options in zip(self.users, [(1, 1, 2), (1, 2, 2), (2, 1, 2), (1, 1, 2), (1, 2, 2)]):
+            self.sit(user, options)
+        analyze_items(until=timezone.now())
+        admin_user = User.objects.create_superuser(username='admin', password='pass')
+        self.client.force_login(admin_user)
+
+        url = reverse('admin:Test_Interface_questionstats_changelist')
+        with mock.patch('Test_Interface.item_analysis.MIN_RESPONSES', 1):
+            flagged = {
+                quality: [row.question_id for row in self.client.get(url, {'quality': quality}).context['cl'].result_list]
+                for quality in ('hard', 'weak_distractor')
+            }
+        self.assertEqual(flagged['hard'], [self.questions[2].id])
+        self.assertEqual(len(flagged['weak_distractor']), 3) # Nobody picked options 3 and 4
+        self.assertContains(self.client.get(url), '80%* / 20% / 0% / 0%')
+
+
+class AttemptExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name='CSE')
+        other_branch = Branch.objects.create(name='ENTC')
+        cls.test = make_test(Subject.objects.create(name='DBMS', branch=branch), 'Exported', 2)
+        other_test = make_test(Subject.objects.create(name='Signals', branch=other_branch), 'Other', 1)
+        cls.user = User.objects.create_user(username='student', password='pass')
+        session = start_session(cls.user, cls.test)
+        for question in cls.test.questions.all():
+            record_answer(session, question, 1)
+        record_answer(start_session(cls.user, other_test), other_test.questions.first(), 2)
+        cls.branch = branch
+        cls.staff = User.objects.create_superuser(username='admin', password='pass')
+
+    def test_streams_filtered_csv_and_ndjson(self):
+        url = reverse('export_attempts')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'branch': self.branch.id})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:5], ['attempt_id', 'attempted_at', 'session_id', 'user_id', 'username'])
+        self.assertEqual(len(lines), 3)
+
+        today = timezone.localdate().isoformat()
+        response = self.client.get(url, {'format': 'ndjson', 'since': today, 'until': today})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['test'], row['is_correct']) for row in rows], [('Exported', True), ('Exported', True), ('Other', False)])
+
+        self.assertEqual(self.client.get(url, {'since': '2000-01-02', 'until': '2000-01-01'}).status_code, 400)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('export_attempts'), {'test': self.test.id})
+        self.assertTrue(response.is_async) # Sent piece by piece, not collected into a list by the handler
+        content = b''.join([piece async for piece in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 3)
+
+    def test_command_writes_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'attempts.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        err = StringIO()
+        call_command('export_attempts', '--test', str(self.test.id), '--output', path, '--chunk-size', '1', stderr=err)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(len(f.read().splitlines()), 3)
+        self.assertIn('Exported 2 attempt(s)', err.getvalue())
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name='CSE')
+        subject = Subject.objects.create(name='DBMS', branch=branch)
+        cls.tests = [make_test(subject, f'Admin {i}', 3) for i in range(2)]
+        cls.users = [User.objects.create_user(username=f'student{i}', password='pass') for i in range(3)]
+        for user in cls.users:
+            for test in cls.tests:
+                session = start_session(user, test)
+                for question in test.questions.all():
+                    record_answer(session, question, 1)
+        cls.admin_user = User.objects.create_superuser(username='admin', password='pass')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def test_attempt_changelist_queries_do_not_grow_with_users_or_rows(self):
+        url = reverse('admin:Test_Interface_userattempt_changelist')
+        self.client.get(url) # Warm the session and content type caches
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 18)
+        self.assertNotContains(response, 'user__id__exact=') # Users are picked through autocomplete, not listed
+
+        for i in range(3, 8):
+            user = User.objects.create_user(username=f'student{i}', password='pass')
+            session = start_session(user, self.tests[0])
+            for question in self.tests[0].questions.all():
+                record_answer(session, question, 2)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+        response = self.client.get(url, {'user': self.users[0].id, 'test': self.tests[1].id})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response, f'<option value="{self.users[0].id}" selected>student0</option>', html=True)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'Test_Interface', 'model_name': 'question', 'field_name': 'test', 'term': 'Admin 1',
+        })
+        self.assertEqual([row['id'] for row in response.json()['results']], [str(self.tests[1].id)])
+
+        today = timezone.localdate()
+        response = self.client.get(url, {'attempted_at__year': today.year, 'attempted_at__month': today.month})
+        self.assertContains(response, f'attempted_at__day={today.day}')
+
+    def test_estimated_count_for_large_unfiltered_tables(self):
+        attempts = UserAttempt.objects.all()
+        self.assertIsNone(estimate_count(attempts)) # No statistics before ANALYZE
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimate_count(attempts), 18)
+        self.assertIsNone(estimate_count(attempts.filter(is_correct=True)))
+
+        with mock.patch('Test_Interface.pagination.estimate_count', return_value=2_000_000):
+            self.assertEqual(EstimatedCountPaginator(attempts, 100).count, 2_000_000)
+        with mock.patch('Test_Interface.pagination.estimate_count', return_value=500):
+            self.assertEqual(EstimatedCountPaginator(attempts, 100).count, 18)
+
+
+class QuestionSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cse = Branch.objects.create(name='CSE')
+        cls.dbms = Subject.objects.create(name='DBMS', branch=cse)
+        signals = Subject.objects.create(name='Signals', branch=Branch.objects.create(name='ENTC'))
+        test = Test.objects.create(name='Normalization', subject=cls.dbms)
+        other = Test.objects.create(name='Transforms', subject=signals)
+        options = dict(option1='a', option2='b', option3='c', option4='d', correct_option=1)
+        cls.in_text = Question.objects.create(test=test, text='Which normal form removes transitive dependencies?', **options)
+        cls.in_solution = Question.objects.create(
+            test=test, text='Pick the right form.', solution='Third normal form removes transitive dependencies.', **options
+        )
+        cls.other_branch = Question.objects.create(test=other, text='Transitive dependencies of a filter?', **options)
+        cls.student = User.objects.create_user(username='student', password='pass')
+
+    def ids(self, query, **filters):
+        return [question.id for question in search_questions(query, **filters)]
+
+    def test_ranked_filtered_and_kept_current(self):
+        self.assertEqual(self.ids('transitive dependencies', branch_id=self.dbms.branch_id),
+                         [self.in_text.id, self.in_solution.id]) # A match in the text outranks one in the solution
+        self.assertCountEqual(self.ids('Dependency'), [self.in_text.id, self.in_solution.id, self.other_branch.id]) # Stemmed
+        self.assertEqual(self.ids('transitive', subject_id=self.dbms.id, limit=1), [self.in_text.id])
+        self.assertEqual(self.ids('"* OR NEAR('), [])
+
+        self.in_text.text = 'Which key is minimal?'
+        self.in_text.save()
+        Question.objects.filter(pk=self.other_branch.pk).update(option2='candidate key')
+        self.assertEqual(self.ids('dependencies', branch_id=self.dbms.branch_id), [self.in_solution.id])
+        self.assertEqual(self.ids('key'), [self.in_text.id, self.other_branch.id]) # Text before options
+        self.in_solution.delete()
+        self.assertEqual(self.ids('transitive'), [self.other_branch.id])
+
+    def test_student_endpoint_and_admin_search(self):
+        url = reverse('search_questions')
+        self.client.force_login(self.student)
+        response = self.client.get(url, {'q': 'transitive', 'subject': self.dbms.id})
+        results = response.json()['results']
+        self.assertEqual([row['id'] for row in results], [self.in_text.id, self.in_solution.id])
+        self.assertEqual(results[1]['subject'], 'DBMS')
+        self.assertNotIn('solution', results[1])
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+        self.client.force_login(User.objects.create_superuser(username='admin', password='pass'))
+        response = self.client.get(reverse('admin:Test_Interface_question_changelist'), {'q': 'filter transitive'})
+        self.assertEqual([question.id for question in response.context['cl'].result_list], [self.other_branch.id])
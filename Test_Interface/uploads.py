@@ -0,0 +1,150 @@
+# Test_Interface/uploads.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import io
+import os
+import requests
+from .images import InvalidImage, iter_variants, variant_name
+from .models import UploadJob, UserProfile
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+STALE_RUNNING_AFTER = timedelta(minutes=10)  # A worker died mid-job; hand it out again
+
+
+class UploadError(Exception):
+    """Raised by upload backends when a file could not be hosted."""
+
+
+class ImgbbBackend:
+    """
+    Hosts images on imgbb.com. The file is sent as multipart data instead of
+    a base64 string, and every request has a timeout.
+    """
+    url = "https://api.imgbb.com/1/upload"
+
+    def upload(self, file, name):
+        api_key = getattr(settings, 'IMGBB_API_KEY', os.getenv('IMGBB_API_KEY'))
+        if not api_key:
+            raise UploadError("IMGBB_API_KEY not found in settings or environment variables")
+
+        try:
+            response = requests.post(
+                self.url,
+                data={"key": api_key},
+                files={"image": (name, file)},
+                timeout=settings.PROFILE_UPLOAD_TIMEOUT,
+            )
+            response.raise_for_status()  # Raise if error (4xx/5xx)
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise UploadError(str(e)) from e
+
+        if not data.get('success'):
+            raise UploadError(f"Image upload failed: {data.get('error', 'Unknown error')}")
+        return data['data']['url']
+
+
+class LocalStubBackend:
+    """
+    Keeps the image in the default storage and returns its URL. Used by the
+    tests and for local development without network access.
+    """
+    def upload(self, file, name):
+        stored_name = default_storage.save(f"profile_pictures/{os.path.basename(name)}", file)
+        return default_storage.url(stored_name)
+
+
+def get_upload_backend():
+    return import_string(settings.PROFILE_UPLOAD_BACKEND)()
+
+
+def enqueue_profile_picture(user, image_file):
+    """
+    Stores the uploaded file on the job row and queues it for the worker.
+    Returns the job right away; the request never waits on the external
+    service.
+    """
+    return UploadJob.objects.create(
+        user=user, image_name=os.path.basename(image_file.name), image_data=image_file.read()
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 60s, 120s, ... capped at an hour."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def claim_jobs(limit):
+    """
+    Marks up to ``limit`` due jobs as running and returns them. Rows locked
+    by another worker are skipped where the database supports it.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            UploadJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=UploadJob.STATUS_PENDING, run_after__lte=now)
+                | Q(status=UploadJob.STATUS_RUNNING, updated_at__lt=now - STALE_RUNNING_AFTER)
+            )
+            .order_by('run_after')[:limit]
+        )
+        UploadJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=UploadJob.STATUS_RUNNING, attempts=F('attempts') + 1, updated_at=now
+        )
+    for job in jobs:
+        job.status = UploadJob.STATUS_RUNNING
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job, backend=None):
+    """
+    Resizes the job's image to PROFILE_PICTURE_SIZES, uploads each variant
+    and stores their URLs on the user's profile. Failures are retried with
+    backoff until max_attempts is reached; files that are not images fail
+    right away. Returns True when the upload succeeded.
+    """
+    backend = backend or get_upload_backend()
+    image_format = settings.PROFILE_PICTURE_FORMAT
+    variants = {}
+    try:
+        with io.BytesIO(job.image_data) as image_file:
+            for size, variant in iter_variants(image_file, settings.PROFILE_PICTURE_SIZES, image_format):
+                with variant:
+                    variants[str(size)] = backend.upload(variant, variant_name(job.image_name, size, image_format))
+    except InvalidImage as e:
+        return _fail(job, f"Invalid image: {e}", retry=False)
+    except (UploadError, OSError) as e:
+        return _fail(job, str(e))
+
+    smallest = str(min(settings.PROFILE_PICTURE_SIZES))
+    largest = str(max(settings.PROFILE_PICTURE_SIZES))
+    UserProfile.objects.filter(user_id=job.user_id).update(
+        profile_picture_url=variants[largest], profile_picture_variants=variants
+    )
+    job.image_data = b''  # Hosted elsewhere now
+    job.status = UploadJob.STATUS_DONE
+    job.result_url = variants[smallest]
+    job.last_error = ''
+    job.save(update_fields=['status', 'result_url', 'image_data', 'last_error', 'updated_at'])
+    return True
+
+
+def _fail(job, error, retry=True):
+    job.last_error = error
+    if not retry or job.attempts >= job.max_attempts:
+        job.status = UploadJob.STATUS_FAILED
+        job.image_data = b''
+    else:
+        job.status = UploadJob.STATUS_PENDING
+        job.run_after = timezone.now() + retry_delay(job.attempts)
+    job.save(update_fields=['status', 'run_after', 'image_data', 'last_error', 'updated_at'])
+    return False
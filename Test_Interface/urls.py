@@ -10,14 +10,23 @@ urlpatterns = [
 
     # Test related URLs
     path('test/start/<int:test_id>/', views.start_test, name='start_test'),
+    path('test/<int:test_id>/attempt/', views.test_attempt_view, name='test_attempt'),
+    path('test/<int:test_id>/bundle/', views.test_bundle_view, name='test_bundle'),
     path('test/<int:test_id>/question/<int:q_index>/', views.question_partial_view, name='question_partial'),
     path('test/<int:test_id>/q/<int:q_index>/', views.question_view, name='question_view'),
+    path('test/<int:test_id>/answers/', views.submit_answers_view, name='submit_answers'),
+    path('test/<int:test_id>/finish/', views.finish_test_view, name='finish_test'),
     path('test/<int:test_id>/result/', views.display_test_result, name='display_test_result'),
+    path('test/<int:test_id>/leaderboard/', views.leaderboard_view, name='leaderboard'),
+
+    path('attempts/export/', views.export_attempts_view, name='export_attempts'),
+    path('search/', views.search_questions_view, name='search_questions'),
 
     # User History URL
     path('history/', views.user_history_view, name='user_history'),
 
     path('dashboard/', views.user_profile_view, name='user_dashboard'),
+    path('dashboard/upload/<int:job_id>/', views.upload_status_view, name='upload_status'),
 
     path('about/', views.about_view, name='about'),
     path('terms-and-conditions/', views.terms_and_conditions_view, name='terms_and_conditions'),
@@ -0,0 +1,88 @@
+# Test_Interface/user_stats.py
+
+from django.db.models import Count, Exists, F, Max, OuterRef, Q
+from .models import TestSession, UserAttempt, UserStats
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def apply_answer_deltas(session, previously_answered, answered_delta, correct_delta, reviewed_delta, now):
+    """
+    Moves the user's stats row by the same deltas just applied to one of
+    their sessions. Called inside the answer-writing transaction, with
+    ``previously_answered`` read from the locked session row.
+    """
+    mocks_delta = 0
+    if answered_delta and previously_answered == 0:
+        # First answer of this sitting: a new mock only if no earlier sitting of the test was answered
+        mocks_delta = int(not TestSession.objects.filter(
+            user_id=session.user_id, test_id=session.test_id, answered__gt=0
+        ).exclude(pk=session.pk).exists())
+
+    updated = UserStats.objects.filter(user_id=session.user_id).update(
+        mocks_attempted=F('mocks_attempted') + mocks_delta,
+        total_attempted=F('total_attempted') + answered_delta,
+        total_correct=F('total_correct') + correct_delta,
+        reviewed_count=F('reviewed_count') + reviewed_delta,
+        last_activity=now,
+    )
+    if not updated:
+        # No row yet: build it from the attempts, which already include this write
+        rebuild_user_stats(user_ids=[session.user_id])
+
+
+def get_user_stats(user):
+    """
+    Returns the stats row of ``user``, building it from their attempts the
+    first time it is needed.
+    """
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        rebuild_user_stats(user_ids=[user.id])
+        stats, _ = UserStats.objects.get_or_create(user=user)
+    return stats
+
+
+def rebuild_user_stats(user_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recomputes stats rows from UserAttempt with one grouped query, writing
+    them back in batched upserts. Limited to ``user_ids`` when given.
+    Rows of users left without any attempt are zeroed rather than kept with
+    their old totals. Returns the number of rows written.
+    """
+    attempts = UserAttempt.objects.all()
+    if user_ids is not None:
+        attempts = attempts.filter(user_id__in=user_ids)
+    totals = attempts.values('user_id').annotate(
+        mocks_attempted=Count('test', distinct=True),
+        total_attempted=Count('id'),
+        total_correct=Count('id', filter=Q(is_correct=True)),
+        reviewed_count=Count('id', filter=Q(reviewed=True)),
+        last_activity=Max('attempted_at'),
+    ).order_by('user_id')
+
+    written = 0
+    batch = []
+    for row in totals.iterator(chunk_size=batch_size):
+        batch.append(UserStats(**row))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+
+    stale = UserStats.objects.exclude(Exists(UserAttempt.objects.filter(user_id=OuterRef('user_id'))))
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    stale.update(mocks_attempted=0, total_attempted=0, total_correct=0, reviewed_count=0, last_activity=None)
+    return written
+
+
+def _upsert(batch):
+    UserStats.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['mocks_attempted', 'total_attempted', 'total_correct', 'reviewed_count', 'last_activity'],
+    )
+    return len(batch)
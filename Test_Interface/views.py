@@ -1,82 +1,44 @@
 # Test_Interface/views.py
 
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
-from django.db.models import Sum, Avg, Count, F, Case, When, Value, CharField, IntegerField, Max
+from django.db.models import Sum, Avg, Count, F, Q, Case, When, Value, CharField, IntegerField, Max
 from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.conf import settings
 import io
 import base64
 import requests
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST, condition
+from django.views.decorators.cache import cache_control
+import json
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
-from .models import Branch, Subject, Test, Question, UserAttempt, UserProfile
-from .forms import BranchSelectionForm, UserProfileForm, AccountSettingsForm
+from .models import Branch, Subject, Test, Question, TestSession, UploadJob, UserAttempt, UserProfile
+from .forms import BranchSelectionForm, UserProfileForm, AccountSettingsForm, AttemptExportForm, QuestionSearchForm
+from .status import aget_test_statuses
+from .catalog import aget_branch, aget_branches, aget_branch_tree, aget_test, get_branch, get_branches, get_test
+from .manifest import aget_question_ids, get_answer_key, get_test_bundle
+from .user_stats import get_user_stats
+from .uploads import enqueue_profile_picture
+from .rankings import aget_ranking, get_leaderboard, get_ranking, get_user_rank
+from .exports import EXPORT_FORMATS, aiter_export, export_attempts, export_file_name, iter_export
+from .search import SEARCH_LIMIT, search_questions
+from .sessions import (SessionClosed, start_session, get_open_session, get_active_session, aget_active_session,
+                       aget_latest_session, finish_session, arecord_answer, record_answers)
 import certifi
 
 load_dotenv()  # Load environment variables from .env file
 
-def upload_image_to_external_api(image_file):
-    """
-    Uploads an image to imgbb.com and returns the hosted image URL.
-    """
-    if not image_file:
-        return None
-
-    try:
-        import base64
-        import requests
-        import os
-        from django.conf import settings
-        
-        # Get API key from settings or environment
-        api_key = getattr(settings, 'IMGBB_API_KEY', os.getenv('IMGBB_API_KEY'))
-        if not api_key:
-            print("Warning: IMGBB_API_KEY not found in settings or environment variables")
-            return None
-
-        # Read and encode image as base64
-        encoded_image = base64.b64encode(image_file.read()).decode('utf-8')
-
-        # Prepare API endpoint and payload
-        url = "https://api.imgbb.com/1/upload"
-        payload = {
-            "key": api_key,
-            "image": encoded_image
-        }
-
-        # Send POST request
-        response = requests.post(url, data=payload)
-        response.raise_for_status()  # Raise if error (4xx/5xx)
-        
-        # Parse response
-        data = response.json()
-        if data.get('success'):
-            return data['data']['url']
-        else:
-            print(f"Image upload failed: {data.get('error', 'Unknown error')}")
-            return None
-
-    except Exception as e:
-        print(f"Error uploading image: {str(e)}")
-        return None
-
-        # Extract image URL from response JSON
-        data = response.json()
-        print(f"Image uploaded successfully: {data['data']['url']}")
-        return data['data']['url']
-
-    except Exception as e:
-        print(f"Image upload failed: {e}")
-        return None
-
 @login_required(login_url='/login/')
 def branch_selection_view(request):
     """
@@ -84,8 +46,9 @@ def branch_selection_view(request):
     Redirects to dashboard if branch is already selected.
     """
     user_profile = request.user.profile
-    if user_profile.branch and request.method == 'GET':
-        messages.info(request, f"Your current branch is {user_profile.branch.name}.")
+    user_branch = get_branch(user_profile.branch_id)
+    if user_branch and request.method == 'GET':
+        messages.info(request, f"Your current branch is {user_branch.name}.")
         return redirect('dashboard') # Already has a branch, go to dashboard
 
     if request.method == 'POST':
@@ -93,7 +56,7 @@ def branch_selection_view(request):
     else:
         # Pre-fill with current user branch if exists
         form = BranchSelectionForm(initial={
-        'branch': user_profile.branch if user_profile.branch else None
+        'branch': user_branch
     })
 
     if request.method == 'POST':
@@ -106,18 +69,19 @@ def branch_selection_view(request):
         else:
             messages.error(request, "Please select a valid branch.")
 
-    branches = Branch.objects.all().order_by('name') # For displaying options if form fails or for initial GET
+    branches = get_branches() # For displaying options if form fails or for initial GET
     return render(request, 'Test_Interface/branch_selection.html', {'form': form, 'branches': branches,'is_mobile': request.user_agent.is_mobile})
 
 @login_required(login_url='/login/')
-def dashboard_view(request):
+async def dashboard_view(request):
     """
     Main dashboard showing subjects and tests relevant to the user's branch.
     If no branch is selected, redirects to branch selection.
     """
-
-    user_profile = request.user.profile
-    if not user_profile.branch:
+    request.user = user = await request.auser() # Loaded once; templates and context processors reuse it
+    user_profile = user.profile = await UserProfile.objects.aget(user=user) # Also cached on the user for the header
+    user_branch = await aget_branch(user_profile.branch_id)
+    if not user_branch:
         messages.warning(request, "Please select your engineering branch to view subjects and tests.")
         return redirect('branch_selection')
 
@@ -126,14 +90,14 @@ def dashboard_view(request):
     else:
         # Pre-fill with current user branch if exists
         form = BranchSelectionForm(initial={
-        'branch': user_profile.branch if user_profile.branch else None
+        'branch': user_branch
     })
 
     if request.method == 'POST':
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             selected_branch = form.cleaned_data['branch']
             user_profile.branch = selected_branch
-            user_profile.save()
+            await user_profile.asave()
             messages.success(request, f"Your branch has been set to {selected_branch.name}.")
             return redirect('dashboard')
         else:
@@ -141,54 +105,29 @@ def dashboard_view(request):
 
 
 
-    # Fetch subjects for the user's selected branch
-    subjects = Subject.objects.filter(branch=user_profile.branch).prefetch_related('tests').order_by('name')
+    # Fetch subjects and tests for the user's selected branch, and the branch list, from the catalog cache
+    branch_tree, branches = await asyncio.gather(aget_branch_tree(user_branch.id), aget_branches())
+
+    # Attempt status for every test in the branch, computed with grouped queries
+    all_tests = [test for node in branch_tree for test in node['tests']]
+    statuses = await aget_test_statuses(user, all_tests)
 
-    # Prepare tests with attempt status
-    tests_with_status = []
-    for subject in subjects:
-        for test in subject.tests.all():
-            # Check if user has any attempt for this test
-            has_attempted = UserAttempt.objects.filter(user=request.user, question__test=test).exists()
-            
-            # Get the latest score if attempted
-            latest_score = None
-            if has_attempted:
-                # Calculate score for the latest completed attempt of this test
-                # This assumes a test is "completed" if all questions have an attempt record
-                total_questions_in_test = test.questions.count()
-                user_attempts_for_test = UserAttempt.objects.filter(user=request.user, question__test=test)
-                
-                if user_attempts_for_test.count() == total_questions_in_test:
-                    correct_attempts = user_attempts_for_test.filter(is_correct=True).count()
-                    latest_score = f"{int((correct_attempts / total_questions_in_test) * 100)}%" if total_questions_in_test else "0%"
-                else:
-                    # If not all questions attempted, consider it "In Progress" or partial
-                    latest_score = "In Progress"
-
-            tests_with_status.append({
-                'test': test,
-                'has_attempted': has_attempted,
-                'latest_score': latest_score,
-            })
-    
     # Group tests by subject for display in the template
     subjects_with_tests = []
-    for subject in subjects:
-        subject_tests = [ts for ts in tests_with_status if ts['test'].subject == subject]
+    for node in branch_tree:
+        subject_tests = [{'test': test, **statuses[test.id]} for test in node['tests']]
         subjects_with_tests.append({
-            'subject': subject,
+            'subject': node['subject'],
             'tests': subject_tests
         })
     
     
-    branches = Branch.objects.all().order_by('name')
     form = BranchSelectionForm(request.POST or None)
 
-    return render(request, 'Test_Interface/test_dashboard.html', {
+    return await arender(request, 'Test_Interface/test_dashboard.html', {
         'form': form,
         'branches': branches,
-        'user_branch': user_profile.branch,
+        'user_branch': user_branch,
         'subjects_with_tests': subjects_with_tests,
         'is_mobile': request.user_agent.is_mobile,
     })
@@ -198,57 +137,158 @@ def start_test(request, test_id):
     """
     Initializes a new test attempt for the user.
     Instead of deleting previous attempts, it creates a new attempt session,
-    allowing the user to attempt the same test multiple times.
+    allowing the user to attempt the same test multiple times. A sitting
+    still in progress is resumed unless the user confirmed a restart
+    (?restart=1).
     """
-    test = get_object_or_404(Test, id=test_id)
+    test = get_test(test_id)
 
-    # Optionally, you can create a TestAttempt model to track each session.
-    # For now, we just keep all UserAttempt records and start a new run.
-    # The question_view logic should be able to distinguish between attempts if you add a session key.
+    session = get_open_session(request.user, test)
+    if session and not session.is_expired and request.GET.get('restart') != '1':
+        messages.info(request, f"Resuming your sitting of {test.name}.")
+        return redirect('test_attempt', test_id=test.id)
+
+    # Every start is a new TestSession; earlier sessions and their attempts are kept
+    start_session(request.user, test)
 
     messages.info(request, f"Starting new test: {test.name} in {test.subject.name}. (Multiple attempts allowed)")
-    return redirect('question_view', test_id=test.id, q_index=0)
+    return redirect('test_attempt', test_id=test.id)
+
+@login_required(login_url='/login/')
+def test_attempt_view(request, test_id):
+    """
+    Renders the test-taking page. Questions are loaded once from the test
+    bundle and navigated client-side; answers already given in the open
+    session are embedded so a reload resumes where the user left off.
+    """
+    test = get_test(test_id)
+    session = get_active_session(request.user, test)
+    if session.is_expired:
+        return time_up(request, session)
+    saved_answers = {
+        str(attempt['question_id']): {
+            'selected': attempt['selected_option'],
+            'is_correct': attempt['is_correct'],
+            'reviewed': attempt['reviewed'],
+            'correct_option': attempt['question__correct_option'],
+            'solution': attempt['question__solution'],
+        }
+        for attempt in session.attempts.values(
+            'question_id', 'selected_option', 'is_correct', 'reviewed', 'question__correct_option', 'question__solution'
+        )
+    }
+
+    return render(request, 'Test_Interface/test_attempt.html', {
+        'test': test,
+        'deadline': session.deadline,
+        'saved_answers': saved_answers,
+        'is_mobile': request.user_agent.is_mobile,
+    })
+
+def test_bundle_etag(request, test_id):
+    try:
+        return f"{test_id}-{get_test(test_id).updated_at.timestamp()}"
+    except Http404:
+        return None
+
+@login_required(login_url='/login/')
+@cache_control(private=True, no_cache=True) # Always revalidate; unchanged bundles come back as 304
+@condition(etag_func=test_bundle_etag)
+def test_bundle_view(request, test_id):
+    """
+    Returns the whole test (questions and options, no answers or solutions)
+    as one JSON payload so the client can navigate without round trips.
+    The ETag follows Test.updated_at, so repeat loads are answered with 304.
+    """
+    test = get_test(test_id)
+    return JsonResponse(get_test_bundle(test))
+
+def session_result_url(session):
+    return f"{reverse('display_test_result', args=[session.test_id])}?session={session.id}"
+
+def redirect_page(request, url):
+    """Redirects the whole page; HTMX requests are told to through the HX-Redirect header."""
+    if request.htmx:
+        response = HttpResponse(status=204)
+        response['HX-Redirect'] = url
+        return response
+    return redirect(url)
+
+def time_up(request, session):
+    """Finishes a session that ran out of time and sends the user to its result."""
+    finish_session(session)
+    messages.warning(request, "Time is up! Your answers have been submitted.")
+    return redirect_page(request, session_result_url(session))
+
+atime_up = sync_to_async(time_up)
 
 @login_required(login_url='/login/')
-def question_view(request, test_id, q_index=0):
-    test = get_object_or_404(Test, id=test_id)
+@require_POST
+def finish_test_view(request, test_id):
+    """
+    Submits the user's open sitting of a test and shows its result. Only
+    this or running out of time finishes a sitting; going past the last
+    question shows a summary and the result page is read-only.
+    """
+    test = get_test(test_id)
+    session = get_open_session(request.user, test)
+    if not session:
+        return redirect_page(request, reverse('display_test_result', args=[test.id]))
+    finish_session(session)
+    messages.success(request, "Your answers have been submitted.")
+    return redirect_page(request, session_result_url(session))
+
+# Async views render in a thread: templates and context processors follow lazy relations (user.profile)
+arender = sync_to_async(render)
+
+@login_required(login_url='/login/')
+async def question_view(request, test_id, q_index=0):
+    request.user = await request.auser() # Loaded once; templates and context processors reuse it
+    test, question_ids = await asyncio.gather(aget_test(test_id), aget_question_ids(test_id))
     subject = test.subject
-    questions = list(test.questions.all().order_by('id'))
 
-    total_questions = len(questions)
-    answered_questions = UserAttempt.objects.filter(
-        user=request.user,
-        question__test=test
-    ).count()
+    total_questions = len(question_ids)
+    session = await aget_active_session(request.user, test)
+    answered_questions = session.answered
     all_questions_answered = (answered_questions == total_questions)
 
-    # Compute test end time and remaining duration
-    end_time = test.created_at + timedelta(minutes=test.duration_minutes)
-    now = timezone.now()
-    time_remaining = end_time - now
-    test_active = (time_remaining.total_seconds() > 0) and (q_index < total_questions)
+    # The clock is the session's own deadline, set server-side when it started
+    time_remaining = session.deadline - timezone.now()
+    if time_remaining.total_seconds() <= 0:
+        return await atime_up(request, session)
+    test_active = q_index < total_questions
 
     if q_index >= total_questions:
-        messages.info(request, "Test completed! Calculating your results...")
-        return redirect('display_test_result', test_id=test.id)
+        # Past the last question: the page loads the summary, whose Finish button submits the sitting
+        return await arender(request, 'Test_Interface/question.html', {
+            'subject': subject,
+            'test': test,
+            'q_index': total_questions,
+            'total': total_questions,
+            'test_active': False,
+            'time_remaining': time_remaining,
+            'deadline': session.deadline,
+            'is_mobile': request.user_agent.is_mobile,
+        })
 
-    question = questions[q_index]
+    question_id = question_ids[q_index]
     submitted = False
     is_correct = None
     selected_option_value = None
 
     if request.method == 'POST':
+        question = await aget_object_or_404(Question, pk=question_id)
         is_review = request.POST.get('is_review') == '1'
         selected_option_value = request.POST.get('option')
 
         if not is_review and selected_option_value is None:
             messages.error(request, "Please select an option before submitting.")
-            current_attempt = UserAttempt.objects.filter(user=request.user, question=question).first()
+            current_attempt = await UserAttempt.objects.filter(session=session, question=question).afirst()
             if current_attempt:
                 submitted = True
                 is_correct = current_attempt.is_correct
                 selected_option_value = current_attempt.selected_option
-            return render(request, 'Test_Interface/question.html', {
+            return await arender(request, 'Test_Interface/question.html', {
                 'subject': subject,
                 'test': test,
                 'question': question,
@@ -261,6 +301,7 @@ def question_view(request, test_id, q_index=0):
                 'all_questions_answered': all_questions_answered,
                 'test_active': test_active,
                 'time_remaining': time_remaining,
+                'deadline': session.deadline,
                 'is_mobile': request.user_agent.is_mobile,
             })
 
@@ -269,12 +310,12 @@ def question_view(request, test_id, q_index=0):
                 selected_option_value = int(selected_option_value)
             except ValueError:
                 messages.error(request, "Invalid option selected.")
-                current_attempt = UserAttempt.objects.filter(user=request.user, question=question).first()
+                current_attempt = await UserAttempt.objects.filter(session=session, question=question).afirst()
                 if current_attempt:
                     submitted = True
                     is_correct = current_attempt.is_correct
                     selected_option_value = current_attempt.selected_option
-                return render(request, 'Test_Interface/question.html', {
+                return await arender(request, 'Test_Interface/question.html', {
                     'subject': subject,
                     'test': test,
                     'question': question,
@@ -287,20 +328,15 @@ def question_view(request, test_id, q_index=0):
                     'all_questions_answered': all_questions_answered,
                     'test_active': test_active,
                     'time_remaining': time_remaining,
+                    'deadline': session.deadline,
                     'is_mobile': request.user_agent.is_mobile,
                 })
 
-            is_correct = (selected_option_value == question.correct_option)
-
-            UserAttempt.objects.update_or_create(
-                user=request.user,
-                question=question,
-                defaults={
-                    'selected_option': selected_option_value,
-                    'is_correct': is_correct,
-                    'reviewed': False
-                }
-            )
+            try:
+                attempt = await arecord_answer(session, question, selected_option_value)
+            except SessionClosed:
+                return await atime_up(request, session)
+            is_correct = attempt.is_correct
             submitted = True
 
             if is_correct:
@@ -308,33 +344,27 @@ def question_view(request, test_id, q_index=0):
             else:
                 messages.error(request, f"Incorrect. The correct answer was option {question.correct_option}.")
         else:
-            UserAttempt.objects.update_or_create(
-                user=request.user,
-                question=question,
-                defaults={
-                    'selected_option': None,
-                    'is_correct': False,
-                    'reviewed': True
-                }
-            )
+            try:
+                await arecord_answer(session, question, reviewed=True)
+            except SessionClosed:
+                return await atime_up(request, session)
             messages.info(request, "Question marked for review.")
 
-        if q_index + 1 < total_questions:
-            return redirect('question_view', test_id=test.id, q_index=q_index + 1)
-        else:
-            return redirect('display_test_result', test_id=test.id)
+        # After the last question this lands on the summary
+        return redirect('question_view', test_id=test.id, q_index=q_index + 1)
 
-    current_attempt = UserAttempt.objects.filter(
-        user=request.user,
-        question=question
-    ).first()
+    # The question and the user's answer to it in this session are independent lookups
+    question, current_attempt = await asyncio.gather(
+        aget_object_or_404(Question, pk=question_id),
+        UserAttempt.objects.filter(session=session, question_id=question_id).afirst(),
+    )
 
     if current_attempt:
         submitted = True
         is_correct = current_attempt.is_correct
         selected_option_value = current_attempt.selected_option
 
-    return render(request, 'Test_Interface/question.html', {
+    return await arender(request, 'Test_Interface/question.html', {
         'subject': subject,
         'test': test,
         'question': question,
@@ -347,82 +377,190 @@ def question_view(request, test_id, q_index=0):
         'all_questions_answered': all_questions_answered,
         'test_active': test_active,
         'time_remaining': time_remaining,
+        'deadline': session.deadline,
         'is_mobile': request.user_agent.is_mobile,
     })
 
 @login_required(login_url='/login/')
-def display_test_result(request, test_id):
+async def display_test_result(request, test_id):
     """
-    Calculates and displays the results for a completed test.
+    Displays the result of a sitting (?session=, else the latest one). Read
+    only: a sitting still in progress is shown as such, with a link back.
     """
-    test = get_object_or_404(Test, id=test_id)
-    subject = test.subject
+    request.user = await request.auser() # Loaded once; templates and context processors reuse it
 
-    user_attempts = UserAttempt.objects.filter(user=request.user, question__test=test)
-    total_questions_in_test = test.questions.count()
-    total_questions_attempted = user_attempts.count()
-    correct_answers = user_attempts.filter(is_correct=True).count()
-
-    percent_correct = int((correct_answers / total_questions_in_test) * 100) if total_questions_in_test else 0
+    # Scores come from the session's counters
+    session_id = request.GET.get('session')
+    if session_id and session_id.isdigit():
+        session_lookup = aget_object_or_404(TestSession, id=session_id, user=request.user, test_id=test_id)
+    else:
+        session_lookup = aget_latest_session(request.user, test_id)
+    # The session lookup does not need the test object, so both run together
+    test, session = await asyncio.gather(aget_test(test_id), session_lookup)
+    subject = test.subject
+    rank = percentile = takers = None
+    in_progress = session is not None and not session.is_finished
+    if session:
+        total_questions_in_test = session.total_questions
+        total_questions_attempted = session.answered
+        correct_answers = session.correct
+        percent_correct = session.score_percent
+        if session.is_finished and session.answered:
+            # Where this sitting's score places among every taker's best, from the precomputed buckets
+            ranking = await aget_ranking(test.id)
+            rank, percentile, takers = ranking.rank(correct_answers), ranking.percentile(correct_answers), ranking.takers
+    else:
+        total_questions_in_test = len(await aget_question_ids(test.id))
+        total_questions_attempted = correct_answers = percent_correct = 0
 
-    return render(request, 'Test_Interface/result.html', {
+    return await arender(request, 'Test_Interface/result.html', {
         'subject': subject,
         'test': test,
         'total_in_test': total_questions_in_test,
         'total_attempted': total_questions_attempted,
         'correct': correct_answers,
         'percent': percent_correct,
+        'rank': rank,
+        'percentile': percentile,
+        'takers': takers,
+        'in_progress': in_progress,
         'is_mobile': request.user_agent.is_mobile,
     })
 
+LEADERBOARD_SIZE = 50
+LEADERBOARD_MAX_SIZE = 500
+
 @login_required(login_url='/login/')
-def user_history_view(request):
+def leaderboard_view(request, test_id):
     """
-    Displays the user's test history, including scores for completed tests.
+    Shows the top results of a test (?top=N, default 50) and the user's own
+    rank and percentile, all read from the precomputed rankings.
     """
-    # Get all distinct tests the user has attempted questions for
-    # Annotate with total questions in test and correct answers for that test
-    # This query aggregates results for each test
-    user_test_results = UserAttempt.objects.filter(user=request.user) \
-        .values('question__test__id', 'question__test__name', 'question__test__subject__name', 'question__test__total_marks') \
-        .annotate(
-            total_attempted_questions=Count('question__id'),
-            correct_answers=Count(Case(When(is_correct=True, then=1), output_field=IntegerField())),
+    test = get_test(test_id)
+    try:
+        top = min(max(int(request.GET.get('top', LEADERBOARD_SIZE)), 1), LEADERBOARD_MAX_SIZE)
+    except ValueError:
+        top = LEADERBOARD_SIZE
 
-            latest_attempt_date= Max('attempted_at')
-        ) \
-        .order_by('-latest_attempt_date') # Order by most recent attempt
+    own = get_user_rank(test.id, request.user.id)
+    return render(request, 'Test_Interface/leaderboard.html', {
+        'test': test,
+        'subject': test.subject,
+        'results': get_leaderboard(test.id, top),
+        'takers': get_ranking(test.id).takers,
+        'own_result': own[0] if own else None,
+        'own_rank': own[1] if own else None,
+        'own_percentile': own[2] if own else None,
+        'is_mobile': request.user_agent.is_mobile,
+    })
 
-    # Further process to get total questions for each test and calculate percentage
-    history_data = []
-    for result in user_test_results:
-        test_id = result['question__test__id']
-        test_name = result['question__test__name']
-        subject_name = result['question__test__subject__name']
-        total_test_questions = Test.objects.get(id=test_id).questions.count() # Get total questions for this test
-        total_marks = result['question__test__total_marks']
+@login_required(login_url='/login/')
+@permission_required('Test_Interface.view_userattempt', raise_exception=True)
+def export_attempts_view(request):
+    """
+    Streams the attempts matching ?branch=, ?subject=, ?test=, ?since= and
+    ?until= as CSV (default) or NDJSON (?format=ndjson), without holding
+    the rows in memory.
+    """
+    form = AttemptExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    filters = form.cleaned_data
+    export_format = filters.pop('format') or 'csv'
+    rows = export_attempts(
+        branch_id=filters['branch'], subject_id=filters['subject'], test_id=filters['test'],
+        since=filters['since'], until=filters['until'],
+    )
+    # Under ASGI a sync iterator would be read to the end before the first byte is sent
+    pieces = aiter_export(rows, export_format) if isinstance(request, ASGIRequest) else iter_export(rows, export_format)
+    response = StreamingHttpResponse(pieces, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{export_file_name(export_format)}"'
+    return response
 
-        score_percent = 0
-        if total_test_questions > 0:
-            score_percent = int((result['correct_answers'] / total_test_questions) * 100)
+@login_required(login_url='/login/')
+def search_questions_view(request):
+    """
+    Ranked full-text search over the question bank as JSON: ?q= (every
+    word must occur), optional ?branch=, ?subject= and ?limit=. Answers and
+    solutions are searched but never returned.
+    """
+    form = QuestionSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    filters = form.cleaned_data
+    questions = search_questions(
+        filters['q'], branch_id=filters['branch'], subject_id=filters['subject'], limit=filters['limit'] or SEARCH_LIMIT,
+    )
+    return JsonResponse({'results': [
+        {
+            'id': question.id,
+            'text': question.text,
+            'test_id': question.test_id,
+            'test': question.test.name,
+            'subject': question.test.subject.name,
+            'url': reverse('start_test', args=[question.test_id]),
+        }
+        for question in questions
+    ]})
+
+HISTORY_PAGE_SIZE = 20
 
-        # Determine if test is "completed" (all questions attempted)
-        status = "Completed" if result['total_attempted_questions'] == total_test_questions else "In Progress"
+def encode_history_cursor(session):
+    """
+    Encodes the sort key of the last row on a history page, so the next
+    page can start right after it.
+    """
+    raw = f"{session.updated_at.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
+def decode_history_cursor(cursor):
+    try:
+        updated_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(updated_at), int(session_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+@login_required(login_url='/login/')
+def user_history_view(request):
+    """
+    Displays the user's test history, including scores for completed tests.
+    Pages are fetched by keyset (cursor) on (updated_at, id), so each page
+    costs the same however long the history is. HTMX "load more" requests
+    get only the next rows.
+    """
+    # One row per test session; scores and question totals are read from the session row
+    sessions = TestSession.objects.filter(user=request.user, answered__gt=0) \
+        .select_related('test__subject') \
+        .order_by('-updated_at', '-id') # Order by most recent attempt
+
+    cursor = decode_history_cursor(request.GET.get('cursor', ''))
+    if cursor:
+        updated_at, session_id = cursor
+        sessions = sessions.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=session_id))
+
+    page = list(sessions[:HISTORY_PAGE_SIZE + 1])
+    next_cursor = encode_history_cursor(page[HISTORY_PAGE_SIZE - 1]) if len(page) > HISTORY_PAGE_SIZE else None
+
+    history_data = []
+    for session in page[:HISTORY_PAGE_SIZE]:
         history_data.append({
-            'test_name': test_name,
-            'subject_name': subject_name,
-            'total_questions': total_test_questions,
-            'total_attempted': result['total_attempted_questions'],
-            'correct_answers': result['correct_answers'],
-            'score_percent': score_percent,
-            'status': status,
-            'attempt_date': result['latest_attempt_date'],
-            'test_id': test_id, # Add test_id for linking to results page
-            'total_marks': total_marks,
+            'test_name': session.test.name,
+            'subject_name': session.test.subject.name,
+            'total_questions': session.total_questions,
+            'total_attempted': session.answered,
+            'correct_answers': session.correct,
+            'score_percent': session.score_percent,
+            'status': "Completed" if session.is_completed else "In Progress",
+            'attempt_date': session.updated_at,
+            'test_id': session.test_id, # Add test_id for linking to results page
+            'session_id': session.id,
+            'total_marks': session.test.total_marks,
         })
 
-    return render(request, 'Test_Interface/history.html', {'history_data': history_data, 'is_mobile': request.user_agent.is_mobile})
+    context = {'history_data': history_data, 'next_cursor': next_cursor, 'is_mobile': request.user_agent.is_mobile}
+    if request.htmx:
+        return render(request, 'Test_Interface/partials/history_rows.html', context)
+    return render(request, 'Test_Interface/history.html', context)
 
 @login_required(login_url='/login/')
 def user_profile_view(request):
@@ -445,17 +583,9 @@ def user_profile_view(request):
                 messages.error(request, "File size too large. Please upload an image less than 5MB.")
                 return redirect('user_dashboard')
                 
-            # Upload to external service
-            image_url = upload_image_to_external_api(profile_picture_file)
-            if image_url:
-                try:
-                    user_profile.profile_picture_url = image_url
-                    user_profile.save()
-                    messages.success(request, "Profile picture updated successfully!")
-                except Exception as e:
-                    messages.error(request, f"Error saving profile picture: {str(e)}")
-            else:
-                messages.error(request, "Failed to upload profile picture. Please try again.")
+            # Hosted by the upload worker; the page polls upload_status for the result
+            enqueue_profile_picture(user, profile_picture_file)
+            messages.info(request, "Your profile picture is being uploaded. It will appear here shortly.")
             return redirect('user_dashboard')
             
         elif 'update_profile' in request.POST:
@@ -485,24 +615,15 @@ def user_profile_view(request):
     account_form = AccountSettingsForm(instance=user)
 
     # --- Fetch History Summary and Stats ---
-    recent_history = UserAttempt.objects.filter(user=user).order_by('-attempted_at')[:5]
+    recent_history = UserAttempt.objects.filter(user=user).select_related('test').order_by('-attempted_at')[:5]
     for item in recent_history:
-        item.action_description = f"Attempted Q{item.question.id} ({item.question.test.name})"
+        item.action_description = f"Attempted Q{item.question_id} ({item.test.name})"
 
-    # Calculate Mock Test / Activity Stats
-    total_mocks_attempted = UserAttempt.objects.filter(user=user).values('question__test').distinct().count()
-    all_user_attempts = UserAttempt.objects.filter(user=user)
-    total_correct_answers = all_user_attempts.filter(is_correct=True).count()
-    total_questions_attempted_overall = all_user_attempts.count()
-
-    # Calculate average score
-    average_score = 0
-    if total_questions_attempted_overall > 0:
-        average_score = round((total_correct_answers / total_questions_attempted_overall) * 100, 2)
-
-    # Calculate completion percentage
-    # You can customize this calculation based on your specific requirements
-    completion_percentage = calculate_completion_percentage(user)
+    # Mock Test / Activity Stats are read from the materialized per-user row
+    stats = get_user_stats(user)
+    total_mocks_attempted = stats.mocks_attempted
+    average_score = stats.average_score
+    completion_percentage = stats.completion_percentage
 
     context = {
         'form': profile_form,
@@ -512,36 +633,60 @@ def user_profile_view(request):
         'total_mocks_attempted': total_mocks_attempted,
         'average_score': average_score,
         'completion_percentage': completion_percentage,
+        'pending_upload': user.upload_jobs.filter(
+            status__in=[UploadJob.STATUS_PENDING, UploadJob.STATUS_RUNNING]
+        ).only('id').first(),
         'is_mobile': request.user_agent.is_mobile,
     }
     
     return render(request, 'User/dashboard.html', context)
 
 @login_required(login_url='/login/')
-def question_partial_view(request, test_id, q_index=0):
+def upload_status_view(request, job_id):
+    """
+    Reports the state of one of the user's profile picture uploads as JSON,
+    polled by the profile page until the job is done or failed.
+    """
+    job = get_object_or_404(UploadJob.objects.only('status', 'result_url', 'user_id'), id=job_id, user=request.user)
+    return JsonResponse({'status': job.status, 'url': job.result_url or None})
+
+@login_required(login_url='/login/')
+async def question_partial_view(request, test_id, q_index=0):
     """
     Handles fetching and submitting individual questions via HTMX.
     This view returns only the 'question_card.html' partial.
     """
-    test = get_object_or_404(Test, id=test_id)
-    subject = test.subject
-    questions = list(test.questions.all().order_by('id'))
-
-    # Check if q_index is out of bounds (test finished or invalid index)
-    if q_index >= len(questions) or q_index < 0:
-        # If test is finished, HTMX will redirect to result page.
-        # If invalid index, redirect to dashboard or an error page.
-        # For HTMX, we can return an empty response or a redirect header.
-        response = HttpResponse(status=204) # 204 No Content
-        response['HX-Redirect'] = reverse('display_test_result', args=[test.id])
-        return response
+    request.user = await request.auser() # Loaded once; templates and context processors reuse it
+    test, question_ids = await asyncio.gather(aget_test(test_id), aget_question_ids(test_id))
+    total_questions = len(question_ids)
+    session = await aget_active_session(request.user, test)
+    if session.is_expired:
+        return await atime_up(request, session)
+
+    # Past the last question: a summary of the sitting to review before finishing it
+    if q_index >= total_questions:
+        states = {
+            question_id: 'review' if reviewed else 'answered'
+            async for question_id, reviewed in UserAttempt.objects.filter(session=session)
+            .values_list('question_id', 'reviewed')
+        }
+        questions = [{'index': index, 'state': states.get(question_id)} for index, question_id in enumerate(question_ids)]
+        return await arender(request, 'Test_Interface/partials/test_summary.html', {
+            'test': test,
+            'total': total_questions,
+            'questions': questions,
+            'answered': sum(state == 'answered' for state in states.values()),
+            'reviewed': sum(state == 'review' for state in states.values()),
+            'unanswered': sum(question['state'] is None for question in questions),
+        })
 
-    question = questions[q_index]
+    question_id = question_ids[q_index]
     submitted = False
     is_correct = None
     selected_option_value = None
 
     if request.method == 'POST':
+        question = await aget_object_or_404(Question, pk=question_id)
         selected_option_value = request.POST.get('option') # HTMX sends form data
         
         # Validate selection
@@ -549,16 +694,16 @@ def question_partial_view(request, test_id, q_index=0):
             messages.error(request, "Please select an option before submitting.")
             # Re-render the current question with an error
             # We need to fetch previous attempt data if any
-            current_attempt = UserAttempt.objects.filter(user=request.user, question=question).first()
+            current_attempt = await UserAttempt.objects.filter(session=session, question=question).afirst()
             if current_attempt:
                 submitted = True
                 is_correct = current_attempt.is_correct
                 selected_option_value = current_attempt.selected_option
-            return render(request, 'Test_Interface/partials/question_card.html', {
+            return await arender(request, 'Test_Interface/partials/question_card.html', {
                 'test': test,
                 'question': question,
                 'q_index': q_index,
-                'total': len(questions),
+                'total': total_questions,
                 'submitted': submitted,
                 'is_correct': is_correct,
                 'solution': question.solution,
@@ -570,16 +715,16 @@ def question_partial_view(request, test_id, q_index=0):
             selected_option_value = int(selected_option_value)
         except ValueError:
             messages.error(request, "Invalid option selected.")
-            current_attempt = UserAttempt.objects.filter(user=request.user, question=question).first()
+            current_attempt = await UserAttempt.objects.filter(session=session, question=question).afirst()
             if current_attempt:
                 submitted = True
                 is_correct = current_attempt.is_correct
                 selected_option_value = current_attempt.selected_option
-            return render(request, 'Test_Interface/partials/question_card.html', {
+            return await arender(request, 'Test_Interface/partials/question_card.html', {
                 'test': test,
                 'question': question,
                 'q_index': q_index,
-                'total': len(questions),
+                'total': total_questions,
                 'submitted': submitted,
                 'is_correct': is_correct,
                 'solution': question.solution,
@@ -587,17 +732,12 @@ def question_partial_view(request, test_id, q_index=0):
                 'is_mobile': request.user_agent.is_mobile,
             })
 
-        is_correct = (selected_option_value == question.correct_option)
-
-        # Create or update UserAttempt
-        UserAttempt.objects.update_or_create(
-            user=request.user,
-            question=question,
-            defaults={
-                'selected_option': selected_option_value,
-                'is_correct': is_correct
-            }
-        )
+        # Create or update the UserAttempt and the session counters
+        try:
+            attempt = await arecord_answer(session, question, selected_option_value)
+        except SessionClosed:
+            return await atime_up(request, session)
+        is_correct = attempt.is_correct
         submitted = True # Mark as submitted for immediate feedback display
 
         if is_correct:
@@ -607,11 +747,11 @@ def question_partial_view(request, test_id, q_index=0):
 
         # After submission, re-render the same question partial to show feedback
         # HTMX will swap this back into the container
-        return render(request, 'Test_Interface/partials/question_card.html', {
+        return await arender(request, 'Test_Interface/partials/question_card.html', {
             'test': test,
             'question': question,
             'q_index': q_index,
-            'total': len(questions),
+            'total': total_questions,
             'submitted': submitted, # Now True
             'is_correct': is_correct,
             'solution': question.solution,
@@ -619,22 +759,23 @@ def question_partial_view(request, test_id, q_index=0):
             'is_mobile': request.user_agent.is_mobile,
         })
 
-    # GET request: Render the current question partial
-    current_attempt = UserAttempt.objects.filter(
-        user=request.user,
-        question=question
-    ).first()
+    # GET request: Render the current question partial. The question and the
+    # user's answer to it in this session are independent lookups
+    question, current_attempt = await asyncio.gather(
+        aget_object_or_404(Question, pk=question_id),
+        UserAttempt.objects.filter(session=session, question_id=question_id).afirst(),
+    )
 
     if current_attempt:
         submitted = True
         is_correct = current_attempt.is_correct
         selected_option_value = current_attempt.selected_option
 
-    return render(request, 'Test_Interface/partials/question_card.html', {
+    return await arender(request, 'Test_Interface/partials/question_card.html', {
         'test': test,
         'question': question,
         'q_index': q_index,
-        'total': len(questions),
+        'total': total_questions,
         'submitted': submitted,
         'is_correct': is_correct,
         'solution': question.solution,
@@ -642,6 +783,83 @@ def question_partial_view(request, test_id, q_index=0):
         'is_mobile': request.user_agent.is_mobile,
     })
 
+@login_required(login_url='/login/')
+@require_POST
+def submit_answers_view(request, test_id):
+    """
+    Accepts a batch of answers for a test in one request and returns the
+    correctness of each. Answers are checked against the cached answer key
+    and written with a single bulk upsert.
+
+    Accepts either a JSON body ``{"answers": {"<question_id>": <option>}}``
+    or form fields ``q_<question_id>=<option>``. A null/empty option marks
+    the question for review.
+    """
+    test = get_test(test_id)
+
+    if request.content_type == 'application/json':
+        try:
+            raw_answers = json.loads(request.body or b'{}').get('answers', {})
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': "Invalid JSON body."}, status=400)
+    else:
+        raw_answers = {key[2:]: value for key, value in request.POST.items() if key.startswith('q_')}
+
+    if not isinstance(raw_answers, dict):
+        return JsonResponse({'error': "'answers' must be an object of question_id: option."}, status=400)
+
+    answer_key = get_answer_key(test.id)
+    answers = {}
+    errors = {}
+    for raw_question_id, raw_option in raw_answers.items():
+        try:
+            question_id = int(raw_question_id)
+        except (TypeError, ValueError):
+            errors[raw_question_id] = "Invalid question id."
+            continue
+        if question_id not in answer_key:
+            errors[raw_question_id] = "Question does not belong to this test."
+            continue
+        if raw_option in (None, ''):
+            answers[question_id] = None # Marked for review
+            continue
+        try:
+            option = int(raw_option)
+        except (TypeError, ValueError):
+            option = None
+        if option not in (1, 2, 3, 4):
+            errors[raw_question_id] = "Invalid option selected."
+            continue
+        answers[question_id] = option
+
+    if errors:
+        return JsonResponse({'errors': errors}, status=400)
+
+    session = get_active_session(request.user, test)
+    try:
+        results = record_answers(session, answers, answer_key)
+    except SessionClosed:
+        finish_session(session)
+        return JsonResponse({
+            'error': "Time is up; this session no longer accepts answers.",
+            'result_url': session_result_url(session),
+        }, status=409)
+    solutions = dict(Question.objects.filter(id__in=list(results)).values_list('id', 'solution'))
+
+    return JsonResponse({
+        'results': {
+            str(question_id): {
+                'is_correct': is_correct,
+                'reviewed': answers[question_id] is None,
+                'correct_option': answer_key[question_id],
+                'solution': solutions.get(question_id) or '',
+            }
+            for question_id, is_correct in results.items()
+        },
+        'answered': session.answered,
+        'total': session.total_questions,
+    })
+
 def about_view(request):
     """
     Renders the About Us page with details about the application and its creators.
@@ -673,11 +891,4 @@ def calculate_average_score(user):
     if not attempts:
         return 0
     total_score = sum(attempt.score for attempt in attempts if attempt.score is not None)
-    return round(total_score / attempts.count(), 1)
-
-def calculate_completion_percentage(user):
-    attempts = UserAttempt.objects.filter(user=user)
-    if not attempts:
-        return 0
-    completed = attempts.filter(reviewed=True).count()
-    return round((completed / attempts.count()) * 100, 1)
\ No newline at end of file
+    return round(total_score / attempts.count(), 1)
\ No newline at end of file